@@ -0,0 +1,66 @@
+"""On-disk record/replay cache for Slack API responses.
+
+In record mode every successful response of a cached method is saved under
+<directory>/<method>/, keyed by a hash of the method and its parameters. In
+replay mode responses are served from there and Slack is never called, so an
+archive can be rebuilt at disk speed, or a run reproduced exactly in tests.
+Replay only finds calls made with the same parameters (including cursors), so
+it reproduces runs shaped like the recorded one, e.g. a full export into an
+empty directory.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+
+RECORD = 'record'
+REPLAY = 'replay'
+CACHED_METHODS = ('conversations_history', 'conversations_list', 'users_conversations', 'users_list')
+
+
+class ApiCache:
+    def __init__(self, directory, mode, methods=CACHED_METHODS):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f'Unknown cache mode: {mode}')
+        self.directory = directory
+        self.mode = mode
+        self.methods = set(methods)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @property
+    def replaying(self):
+        return self.mode == REPLAY
+
+    def path(self, method, params):
+        key = hashlib.sha1(json.dumps([method, params], sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, method, key[:2], f'{key}.json')
+
+    def lookup(self, method, params):
+        """The recorded response data for this call, or None (always None when recording)."""
+        if not self.replaying:
+            return None
+        path = self.path(method, params)
+        if not os.path.exists(path):
+            with self.lock:
+                self.misses += 1
+            logging.warning(f'No recorded response for {method} {params}')
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)['data']
+        with self.lock:
+            self.hits += 1
+        return data
+
+    def store(self, method, params, response):
+        if self.mode != RECORD or method not in self.methods:
+            return
+        path = self.path(method, params)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = response.data if hasattr(response, 'data') else response
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'method': method, 'params': params, 'data': data}, f, separators=(',', ':'), default=str)
+        os.replace(tmp_path, path)
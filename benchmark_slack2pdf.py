@@ -0,0 +1,168 @@
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from PIL import Image
+
+logging.basicConfig(level=logging.INFO)
+
+SLACK2PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'slack2pdf.py')
+WORDS = ('lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore '
+         'et dolore magna aliqua deploy build release sprint review merge branch bug fix ticket prototype').split()
+FILE_TYPES = ('png', 'jpg', 'pdf', 'mov', 'key', 'zip')
+
+
+def write_users(bench_dir, user_count, rng):
+    """Write users.json and a small square avatar for every synthetic user."""
+    avatars_dir = os.path.join(bench_dir, 'avatars')
+    os.makedirs(avatars_dir, exist_ok=True)
+    users = []
+    for i in range(user_count):
+        user_id = f'U{i:06d}'
+        users.append({'id': user_id, 'name': f'user{i}', 'real_name': f'Synthetic User {i}'})
+        color = tuple(rng.randrange(256) for _ in range(3))
+        Image.new('RGB', (168, 168), color).save(os.path.join(avatars_dir, f'{user_id}.jpg'))
+    with open(os.path.join(bench_dir, 'users.json'), 'w', encoding='utf-8') as f:
+        json.dump(users, f, indent=2)
+    return [user['id'] for user in users]
+
+
+def synthetic_text(rng, user_ids, url_ratio, long_text_ratio):
+    word_count = rng.randint(150, 600) if rng.random() < long_text_ratio else rng.randint(3, 40)
+    words = [rng.choice(WORDS) for _ in range(word_count)]
+    if rng.random() < 0.1:
+        words.insert(rng.randrange(len(words) + 1), f'<@{rng.choice(user_ids)}>')
+    if rng.random() < 0.1:
+        words.insert(rng.randrange(len(words) + 1), f'*{rng.choice(WORDS)}*')
+    if rng.random() < url_ratio:
+        path = '/'.join(rng.choice(WORDS) for _ in range(rng.randint(1, 6)))
+        words.insert(rng.randrange(len(words) + 1), f'<https://example.com/{path}?id={rng.randrange(10**9)}>')
+    return ' '.join(words)
+
+
+def write_messages(messages_path, count, user_ids, rng, url_ratio, file_ratio, long_text_ratio, start_ts=1500000000):
+    """Stream count synthetic messages to messages_path without holding them all in memory."""
+    ts = float(start_ts)
+    with open(messages_path, 'w', encoding='utf-8') as f:
+        f.write('[\n')
+        for i in range(count):
+            ts += rng.expovariate(1 / 600)
+            msg = {
+                'type': 'message',
+                'user': rng.choice(user_ids),
+                'text': synthetic_text(rng, user_ids, url_ratio, long_text_ratio),
+                'ts': f'{ts:.6f}',
+                'ts_human': datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S'),
+            }
+            if rng.random() < file_ratio:
+                msg['files'] = [{'id': f'F{i:08d}', 'name': f'{rng.choice(WORDS)}_{i}.{rng.choice(FILE_TYPES)}'}]
+            if i:
+                f.write(',\n')
+            json.dump(msg, f)
+        f.write('\n]\n')
+
+
+def generate_dataset(bench_dir, count, users, seed, url_ratio, file_ratio, long_text_ratio):
+    """Create <bench_dir>/bench_<count>/messages.json (reused if already generated) and return its path."""
+    channel_dir = os.path.join(bench_dir, f'bench_{count}')
+    messages_path = os.path.join(channel_dir, 'messages.json')
+    params_path = os.path.join(channel_dir, 'params.json')
+    params = {'count': count, 'users': users, 'seed': seed, 'url_ratio': url_ratio, 'file_ratio': file_ratio, 'long_text_ratio': long_text_ratio}
+    if os.path.exists(params_path):
+        with open(params_path, 'r', encoding='utf-8') as f:
+            if json.load(f) == params and os.path.exists(messages_path):
+                logging.info(f'Reusing {messages_path}')
+                return messages_path
+    os.makedirs(channel_dir, exist_ok=True)
+    rng = random.Random(seed)
+    user_ids = write_users(bench_dir, users, rng)
+    logging.info(f'Generating {count} messages into {messages_path}')
+    write_messages(messages_path, count, user_ids, rng, url_ratio, file_ratio, long_text_ratio)
+    with open(params_path, 'w', encoding='utf-8') as f:
+        json.dump(params, f, indent=2)
+    return messages_path
+
+
+def run_slack2pdf(bench_dir, messages_path, page_size, extra_args):
+    """Render messages_path with --profile and return the profile report plus wall time and output size."""
+    count_dir = os.path.dirname(messages_path)
+    profile_path = os.path.join(count_dir, 'profile.json')
+    output_dir = os.path.join(count_dir, 'out')
+    # A fresh output directory, so output_bytes counts only this run's PDF
+    shutil.rmtree(output_dir, ignore_errors=True)
+    cmd = [sys.executable, SLACK2PDF, messages_path, '--page-size', page_size, '--output-dir', output_dir,
+           '--profile', '--profile-output', profile_path] + extra_args
+    started = time.perf_counter()
+    # slack2pdf reads users.json and avatars/ from the working directory
+    subprocess.run(cmd, cwd=bench_dir, check=True)
+    wall = time.perf_counter() - started
+    with open(profile_path, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    report['wall_seconds'] = wall
+    report['output_bytes'] = sum(os.path.getsize(os.path.join(output_dir, name)) for name in os.listdir(output_dir) if name.endswith('.pdf'))
+    return report
+
+
+def print_table(results):
+    print(f'{"messages":>10} {"wall s":>9} {"peak MB":>9} {"PDF MB":>9}  slowest phases')
+    for count, report in sorted(results.items(), key=lambda item: int(item[0])):
+        phases = sorted(report['phases'].items(), key=lambda item: -item[1]['seconds'])[:3]
+        slowest = ', '.join(f'{name} {stats["seconds"]:.1f}s' for name, stats in phases)
+        print(f'{int(count):>10} {report["wall_seconds"]:>9.2f} {report["peak_bytes"] / 1e6:>9.1f} {report["output_bytes"] / 1e6:>9.1f}  {slowest}')
+
+
+def compare(results, baseline, tolerance):
+    """Return regressions where wall time or peak memory grew more than tolerance over the baseline."""
+    regressions = []
+    for count, report in results.items():
+        base = baseline.get(count)
+        if not base:
+            continue
+        for key in ('wall_seconds', 'peak_bytes'):
+            if base[key] and report[key] > base[key] * (1 + tolerance):
+                regressions.append(f'{count} messages: {key} {base[key]:.4g} -> {report[key]:.4g}')
+    return regressions
+
+
+def cli(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Benchmark slack2pdf.py on synthetic messages.json files of chosen sizes.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000], help='Message counts to benchmark (e.g. 10000 100000 1000000)')
+    parser.add_argument('--bench-dir', default='bench', help='Directory for generated data and outputs (reused between runs)')
+    parser.add_argument('--users', type=int, default=50, help='Number of synthetic users')
+    parser.add_argument('--url-ratio', type=float, default=0.2, help='Fraction of messages containing a URL (drawn as QR codes)')
+    parser.add_argument('--file-ratio', type=float, default=0.1, help='Fraction of messages with a file attachment')
+    parser.add_argument('--long-text-ratio', type=float, default=0.05, help='Fraction of messages with several hundred words')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the generated data')
+    parser.add_argument('--page-size', default='A4', help='Page size passed to slack2pdf.py')
+    parser.add_argument('--results', help='Write the results to this JSON file')
+    parser.add_argument('--compare', metavar='BASELINE', help='Results JSON from an earlier run; exit non-zero on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed slowdown or memory growth against --compare (default 0.15)')
+    args, extra_args = parser.parse_known_args(argv)
+
+    bench_dir = os.path.abspath(args.bench_dir)
+    os.makedirs(bench_dir, exist_ok=True)
+    results = {}
+    for count in args.sizes:
+        messages_path = generate_dataset(bench_dir, count, args.users, args.seed, args.url_ratio, args.file_ratio, args.long_text_ratio)
+        results[str(count)] = run_slack2pdf(bench_dir, messages_path, args.page_size, extra_args)
+    print_table(results)
+    if args.results:
+        with open(args.results, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            logging.error(f'Regression: {line}')
+        return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(cli())
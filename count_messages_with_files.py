@@ -10,5 +10,12 @@ def count_messages_with_files(messages_path="./omata-developers/messages.json"):
     count = sum(1 for msg in messages if msg.get('files'))
     print(f"Messages with file attachments: {count} out of {len(messages)} total messages.")
 
+def cli(argv=None, prog=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog=prog, description="Count the messages in a messages.json file that have file attachments.")
+    parser.add_argument("messages_json", nargs="?", default="./omata-developers/messages.json", help="Path to messages.json")
+    args = parser.parse_args(argv)
+    count_messages_with_files(args.messages_json)
+
 if __name__ == "__main__":
-    count_messages_with_files()
+    cli()
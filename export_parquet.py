@@ -0,0 +1,180 @@
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from slack2pdf import find_messages_files, load_json
+
+# Bump when the columns or how they are derived change, so every partition is rewritten
+SCHEMA_VERSION = 1
+STATE_FILE = '.export_parquet_state.json'
+EXTENSIONS = {'parquet': 'parquet', 'feather': 'arrow'}
+
+SCHEMA = pa.schema([
+    ('ts', pa.string()),
+    ('time', pa.timestamp('us', tz='UTC')),
+    ('user', pa.string()),
+    ('subtype', pa.string()),
+    ('text_length', pa.int32()),
+    ('thread_ts', pa.string()),
+    ('reply_count', pa.int32()),
+    ('file_count', pa.int32()),
+    ('file_bytes', pa.int64()),
+    ('reaction_count', pa.int32()),
+    ('reactions', pa.list_(pa.struct([('name', pa.string()), ('count', pa.int32())]))),
+])
+
+
+def message_row(msg):
+    """Flatten one message into a row of SCHEMA (as a tuple, in column order)."""
+    files = [f for f in msg.get('files') or [] if isinstance(f, dict)]
+    reactions = [{'name': r.get('name'), 'count': int(r.get('count', 0))} for r in msg.get('reactions') or []]
+    return (
+        msg['ts'],
+        int(round(float(msg['ts']) * 1e6)),
+        msg.get('user') or msg.get('bot_id'),
+        msg.get('subtype'),
+        len(msg.get('text') or ''),
+        msg.get('thread_ts'),
+        int(msg.get('reply_count', 0)),
+        len(files),
+        sum(int(f.get('size') or 0) for f in files),
+        sum(r['count'] for r in reactions),
+        reactions,
+    )
+
+
+def group_rows_by_month(messages):
+    """Return {YYYY-MM (UTC): [row, ...]} with rows sorted by ts."""
+    months = {}
+    for msg in messages:
+        if 'ts' not in msg:
+            continue
+        month = datetime.fromtimestamp(float(msg['ts']), tz=timezone.utc).strftime('%Y-%m')
+        months.setdefault(month, []).append(message_row(msg))
+    for rows in months.values():
+        rows.sort(key=lambda row: row[1])
+    return months
+
+
+def rows_table(rows):
+    columns = list(zip(*rows)) if rows else [[] for _ in SCHEMA]
+    return pa.Table.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, SCHEMA)], schema=SCHEMA)
+
+
+def write_table(table, path, fmt):
+    tmp_path = path + '.tmp'
+    if fmt == 'parquet':
+        pq.write_table(table, tmp_path, compression='zstd')
+    else:
+        feather.write_feather(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, path)
+
+
+def export_channel(messages_json_path, output_dir, fmt='parquet', force=False):
+    """Write a channel's messages as <output_dir>/channel=<name>/month=<YYYY-MM>/part-0.<ext>.
+
+    The channel is skipped when messages.json hasn't changed since the last
+    run; otherwise only months whose rows changed are rewritten.
+    Returns (channel_name, month_count, written_count, message_count).
+    """
+    channel_name = os.path.basename(os.path.dirname(os.path.abspath(messages_json_path)))
+    channel_dir = os.path.join(output_dir, f'channel={channel_name}')
+    os.makedirs(channel_dir, exist_ok=True)
+    state_path = os.path.join(channel_dir, STATE_FILE)
+    state = load_json(state_path) if os.path.exists(state_path) and not force else {}
+    if state.get('version') != SCHEMA_VERSION or state.get('format') != fmt:
+        state = {}
+    stat = os.stat(messages_json_path)
+    source = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if state.get('source') == source:
+        return channel_name, len(state['months']), 0, state.get('messages', 0)
+
+    months = group_rows_by_month(load_json(messages_json_path))
+    previous = state.get('months', {})
+    if not previous:
+        # No usable state (first run, --force, or a schema or format change): partitions
+        # already on disk aren't tracked, so drop them rather than leave stale rows behind
+        for name in os.listdir(channel_dir):
+            if name.startswith('month='):
+                shutil.rmtree(os.path.join(channel_dir, name), ignore_errors=True)
+    new_months = {}
+    written = 0
+    for month, rows in months.items():
+        digest = hashlib.sha1(json.dumps(rows).encode('utf-8')).hexdigest()
+        new_months[month] = digest
+        path = os.path.join(channel_dir, f'month={month}', f'part-0.{EXTENSIONS[fmt]}')
+        if previous.get(month) == digest and os.path.exists(path):
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_table(rows_table(rows), path, fmt)
+        written += 1
+    # Months that no longer have messages (e.g. after reconciliation deleted them)
+    for month in set(previous) - set(new_months):
+        shutil.rmtree(os.path.join(channel_dir, f'month={month}'), ignore_errors=True)
+
+    message_count = sum(len(rows) for rows in months.values())
+    with open(state_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': SCHEMA_VERSION, 'format': fmt, 'source': source, 'messages': message_count, 'months': new_months}, f, indent=2)
+    logging.info(f'#{channel_name}: {written} of {len(new_months)} month partitions written')
+    return channel_name, len(new_months), written, message_count
+
+
+def _export_channel_job(args):
+    return export_channel(*args)
+
+
+def main(export_root, output_dir, fmt='parquet', jobs=None, force=False):
+    """Convert every channel under export_root into a partitioned dataset in output_dir, in parallel.
+
+    Returns the list of messages.json files that failed.
+    """
+    export_root = os.path.abspath(export_root)
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    paths = [path for path in find_messages_files(export_root) if not os.path.abspath(path).startswith(output_dir + os.sep)]
+    if not paths:
+        logging.warning(f'No messages.json files found under {export_root}')
+        return []
+
+    jobs = min(jobs or os.cpu_count() or 1, len(paths))
+    logging.info(f'Converting {len(paths)} channels with {jobs} worker processes')
+    channels = []
+    failed = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(_export_channel_job, (path, output_dir, fmt, force)): path for path in paths}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                channels.append(future.result())
+            except Exception as e:
+                logging.error(f'Failed to convert {futures[future]}: {e}')
+                failed.append(futures[future])
+    written = sum(channel[2] for channel in channels)
+    messages = sum(channel[3] for channel in channels)
+    logging.info(f'Dataset written to {output_dir}: {messages} messages, {written} partitions rewritten, {len(failed)} channels failed')
+    return failed
+
+
+def cli(argv=None, prog=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog=prog, description='Convert Slack channel exports into a columnar dataset partitioned by channel and month.')
+    parser.add_argument('export_root', help='Export root containing one directory per channel with messages.json')
+    parser.add_argument('--output-dir', default='messages_dataset', help='Directory to write the dataset to (default: messages_dataset)')
+    parser.add_argument('--format', choices=['parquet', 'feather'], default='parquet', help='Parquet files, or Arrow IPC (Feather v2) files')
+    parser.add_argument('--jobs', type=int, help='Worker processes (default: number of cores)')
+    parser.add_argument('--force', action='store_true', help='Rewrite every partition, ignoring the saved state')
+    args = parser.parse_args(argv)
+    failed = main(args.export_root, args.output_dir, args.format, args.jobs, args.force)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(cli())
@@ -1,27 +1,24 @@
 import os
 import json
 import requests
-import time
 from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
 from dotenv import load_dotenv
+from retry_policy import RetryPolicy
 
-load_dotenv()
-SLACK_BOT_TOKEN = os.getenv('SLACK_BOT_TOKEN')
-client = WebClient(token=SLACK_BOT_TOKEN)
+SLACK_BOT_TOKEN = None
+client = None
+
+RETRY_POLICY = RetryPolicy()
+
+def configure():
+    """Load .env and create the Slack client."""
+    global SLACK_BOT_TOKEN, client
+    load_dotenv()
+    SLACK_BOT_TOKEN = os.getenv('SLACK_BOT_TOKEN')
+    client = WebClient(token=SLACK_BOT_TOKEN)
 
 def robust_api_call(api_func, *args, **kwargs):
-    while True:
-        try:
-            return api_func(*args, **kwargs)
-        except SlackApiError as e:
-            if e.response['error'] == 'ratelimited':
-                retry_after = int(e.response.headers.get('Retry-After', 30))
-                print(f"Rate limited. Sleeping for {retry_after} seconds...")
-                time.sleep(retry_after)
-            else:
-                print(f"Slack API error: {e}")
-                return None
+    return RETRY_POLICY.call(api_func, *args, **kwargs)
 
 def fetch_all_users():
     users = []
@@ -59,5 +56,12 @@ def main():
     save_users_and_avatars(users)
     print("User metadata saved to users.json and avatars downloaded.")
 
-if __name__ == "__main__":
+def cli(argv=None, prog=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog=prog, description="Export workspace users to users.json and download their avatars.")
+    parser.parse_args(argv)
+    configure()
     main()
+
+if __name__ == "__main__":
+    cli()
@@ -19,5 +19,12 @@ def inspect_messages(messages_path="./omata-developers/messages.json"):
     print(f"Earliest timestamp: {earliest} ({datetime.fromtimestamp(earliest, timezone.utc)})")
     print(f"Latest timestamp: {latest} ({datetime.fromtimestamp(latest, timezone.utc)})")
 
+def cli(argv=None, prog=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog=prog, description="Print the message count and time range of a messages.json file.")
+    parser.add_argument("messages_json", nargs="?", default="./omata-developers/messages.json", help="Path to messages.json")
+    args = parser.parse_args(argv)
+    inspect_messages(args.messages_json)
+
 if __name__ == "__main__":
-    inspect_messages()
+    cli()
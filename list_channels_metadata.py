@@ -1,24 +1,22 @@
 import os
 from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
 from dotenv import load_dotenv
+from retry_policy import RetryPolicy
 
-load_dotenv()
-SLACK_BOT_TOKEN = os.getenv('SLACK_BOT_TOKEN')
-client = WebClient(token=SLACK_BOT_TOKEN)
+SLACK_BOT_TOKEN = None
+client = None
+
+RETRY_POLICY = RetryPolicy()
+
+def configure():
+    """Load .env and create the Slack client."""
+    global SLACK_BOT_TOKEN, client
+    load_dotenv()
+    SLACK_BOT_TOKEN = os.getenv('SLACK_BOT_TOKEN')
+    client = WebClient(token=SLACK_BOT_TOKEN)
 
 def robust_api_call(api_func, *args, **kwargs):
-    while True:
-        try:
-            return api_func(*args, **kwargs)
-        except SlackApiError as e:
-            if e.response['error'] == 'ratelimited':
-                retry_after = int(e.response.headers.get('Retry-After', 30))
-                print(f"Rate limited. Sleeping for {retry_after} seconds...")
-                time.sleep(retry_after)
-            else:
-                print(f"Slack API error: {e}")
-                return None
+    return RETRY_POLICY.call(api_func, *args, **kwargs)
 
 def list_channels():
     channels = []
@@ -42,5 +40,12 @@ def main():
         is_member = channel.get('is_member', False)
         print(f"Channel: {name} | ID: {cid} | Bot is member: {is_member}")
 
-if __name__ == "__main__":
+def cli(argv=None, prog=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog=prog, description="List channels and whether the bot is a member of each.")
+    parser.parse_args(argv)
+    configure()
     main()
+
+if __name__ == "__main__":
+    cli()
@@ -4,17 +4,34 @@ from PIL import Image
 INPUT_DIR = 'avatars'
 OUTPUT_DIR = 'avatars_40x40'
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-for filename in os.listdir(INPUT_DIR):
-    if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-        input_path = os.path.join(INPUT_DIR, filename)
-        output_path = os.path.join(OUTPUT_DIR, filename)
+def resize_avatars(input_dir=INPUT_DIR, output_dir=OUTPUT_DIR, size=168, dpi=300):
+    os.makedirs(output_dir, exist_ok=True)
 
-        with Image.open(input_path) as img:
-            img = img.convert('RGB')  # Convert to RGB to avoid mode issues
-            img = img.resize((168, 168), Image.LANCZOS)
-            img.save(output_path, dpi=(300, 300))
-            print(f'Resized and saved {output_path} with 300 DPI')
+    for filename in os.listdir(input_dir):
+        if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
+            input_path = os.path.join(input_dir, filename)
+            output_path = os.path.join(output_dir, filename)
 
-print('All images resized to 168x168 pixels at 300 DPI and saved in', OUTPUT_DIR)
+            with Image.open(input_path) as img:
+                img = img.convert('RGB')  # Convert to RGB to avoid mode issues
+                img = img.resize((size, size), Image.LANCZOS)
+                img.save(output_path, dpi=(dpi, dpi))
+                print(f'Resized and saved {output_path} with {dpi} DPI')
+
+    print(f'All images resized to {size}x{size} pixels at {dpi} DPI and saved in', output_dir)
+
+
+def cli(argv=None, prog=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog=prog, description='Resize avatar images to a fixed square size for the PDF renderer.')
+    parser.add_argument('--input-dir', default=INPUT_DIR, help=f'Directory of downloaded avatars (default: {INPUT_DIR})')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help=f'Directory for the resized avatars (default: {OUTPUT_DIR})')
+    parser.add_argument('--size', type=int, default=168, help='Width and height in pixels (default 168)')
+    parser.add_argument('--dpi', type=int, default=300, help='DPI stored in the output files (default 300)')
+    args = parser.parse_args(argv)
+    resize_avatars(args.input_dir, args.output_dir, args.size, args.dpi)
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,264 @@
+"""Retry policy shared by the exporter and the metadata scripts.
+
+Slack calls are retried with jittered exponential backoff inside a per-call
+deadline and an optional per-channel retry budget. Rate limits honour Retry-After.
+Network failures and Slack 5xx errors are transient and retried; anything
+else is permanent and recorded instead of retried. A circuit breaker shared
+by every thread pauses all callers while Slack looks to be down.
+"""
+import contextlib
+import json
+import logging
+import os
+import random
+import socket
+import ssl
+import threading
+import time
+import urllib.error
+
+import requests
+from slack_sdk.errors import SlackApiError
+
+RATE_LIMITED = 'rate_limited'
+TRANSIENT = 'transient'
+PERMANENT = 'permanent'
+
+# Slack error codes that mean "try again later" rather than "this request is wrong"
+TRANSIENT_SLACK_ERRORS = {'internal_error', 'fatal_error', 'service_unavailable', 'request_timeout', 'ekm_access_denied'}
+NETWORK_ERRORS = (ssl.SSLError, urllib.error.URLError, requests.exceptions.RequestException, ConnectionError, TimeoutError, socket.timeout)
+
+
+def classify_error(exc):
+    """Return RATE_LIMITED, TRANSIENT or PERMANENT for an exception raised by a Slack call."""
+    if isinstance(exc, SlackApiError):
+        error = exc.response.get('error') if exc.response is not None else None
+        if error == 'ratelimited' or getattr(exc.response, 'status_code', None) == 429:
+            return RATE_LIMITED
+        if error in TRANSIENT_SLACK_ERRORS or (getattr(exc.response, 'status_code', None) or 0) >= 500:
+            return TRANSIENT
+        return PERMANENT
+    if isinstance(exc, NETWORK_ERRORS):
+        return TRANSIENT
+    return PERMANENT
+
+
+def retry_after_seconds(exc, default=30):
+    try:
+        return float(exc.response.headers.get('Retry-After', default))
+    except (AttributeError, TypeError, ValueError):
+        return default
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive transient failures and makes every caller wait.
+
+    While open, callers block until the reset timeout has passed; then one
+    trial call is let through. Success closes the breaker, failure re-opens
+    it with a doubled timeout (up to max_reset_timeout).
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, max_reset_timeout=600.0):
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.failures = 0
+        self.open_until = 0.0
+        self.trial_running = False
+        self.condition = threading.Condition()
+
+    def wait(self, deadline=None):
+        """Block while the breaker is open. Returns False if deadline passes first."""
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                if now >= self.open_until and not self.trial_running:
+                    if self.open_until:
+                        # Half-open: this caller makes the trial request
+                        self.trial_running = True
+                    return True
+                if deadline is not None and now >= deadline:
+                    return False
+                wake_at = self.open_until if now < self.open_until else now + 1.0
+                if deadline is not None:
+                    wake_at = min(wake_at, deadline)
+                self.condition.wait(max(0.01, wake_at - now))
+
+    def record_success(self):
+        with self.condition:
+            if self.open_until:
+                logging.info('Circuit breaker closed; Slack is responding again')
+            self.failures = 0
+            self.open_until = 0.0
+            self.trial_running = False
+            self.reset_timeout = self.base_reset_timeout
+            self.condition.notify_all()
+
+    def record_failure(self):
+        with self.condition:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.failure_threshold:
+                if self.trial_running:
+                    self.reset_timeout = min(self.max_reset_timeout, self.reset_timeout * 2)
+                self.open_until = time.monotonic() + self.reset_timeout
+                self.trial_running = False
+                logging.warning(f'Circuit breaker open after {self.failures} consecutive failures; pausing all Slack calls for {self.reset_timeout:g}s')
+            self.condition.notify_all()
+
+    def release_trial(self):
+        """Let another caller make the trial request (used when the trial ended without a verdict)."""
+        with self.condition:
+            self.trial_running = False
+            self.condition.notify_all()
+
+
+class ApiBudget:
+    """Token bucket shared by every thread, capping Slack calls per minute."""
+
+    def __init__(self, calls_per_minute, burst=5):
+        self.rate = calls_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take one call from the budget, sleeping until one is available."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RetryPolicy:
+    """Calls Slack API functions with classified retries, backoff, deadlines and a circuit breaker.
+
+    call() returns the response, or None once the error is permanent, the
+    attempts are used up or a deadline has passed. Failures that give up are
+    appended to errors_path (if set) so they can be reviewed or retried.
+    Every attempt, retries included, is drawn from budget if one is set.
+    With an api_cache.ApiCache, successful responses are recorded, or in
+    replay mode served from disk without calling Slack at all.
+    """
+
+    def __init__(self, base_delay=2.0, max_delay=120.0, max_attempts=10, call_deadline=900.0, channel_deadline=None,
+                 breaker=None, errors_path=None, budget=None, cache=None):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.call_deadline = call_deadline
+        self.channel_deadline = channel_deadline
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.errors_path = errors_path
+        self.budget = budget
+        self.cache = cache
+        self._local = threading.local()
+        self._errors_lock = threading.Lock()
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff for the given (1-based) retry attempt."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    @contextlib.contextmanager
+    def channel(self, channel_id, deadline_seconds=None):
+        """Share one retry budget between every call made on this thread inside the block.
+
+        Only time spent backing off from transient errors or waiting on the
+        circuit breaker is charged, so a slow but healthy channel never runs out.
+        """
+        seconds = deadline_seconds if deadline_seconds is not None else self.channel_deadline
+        previous = getattr(self._local, 'budget', None)
+        self._local.budget = [seconds] if seconds else None
+        try:
+            yield
+        finally:
+            self._local.budget = previous
+
+    def _budget_deadline(self, deadline):
+        """The earlier of deadline and the end of the channel's remaining retry budget."""
+        budget = getattr(self._local, 'budget', None)
+        if not budget:
+            return deadline
+        budget_end = time.monotonic() + budget[0]
+        return budget_end if deadline is None else min(deadline, budget_end)
+
+    def _charge(self, seconds):
+        budget = getattr(self._local, 'budget', None)
+        if budget:
+            budget[0] -= seconds
+
+    def call(self, api_func, *args, **kwargs):
+        method_name = getattr(api_func, '__name__', str(api_func))
+        channel_id = kwargs.get('channel') or (args[0] if args else None) or ''
+        if self.cache is not None and self.cache.replaying:
+            return self.cache.lookup(method_name, kwargs)
+        deadline = time.monotonic() + self.call_deadline if self.call_deadline else None
+        attempt = 0
+        while True:
+            waited_from = time.monotonic()
+            ready = self.breaker.wait(self._budget_deadline(deadline))
+            self._charge(time.monotonic() - waited_from)
+            if not ready:
+                return self._give_up(method_name, kwargs, 'deadline exceeded while circuit breaker was open', TRANSIENT)
+            if self.budget:
+                self.budget.acquire()
+            try:
+                result = api_func(*args, **kwargs)
+            except Exception as e:
+                kind = classify_error(e)
+                if kind == PERMANENT:
+                    self.breaker.release_trial()
+                    return self._give_up(method_name, kwargs, e, kind)
+                if kind == TRANSIENT:
+                    self.breaker.record_failure()
+                    attempt += 1
+                    if self.max_attempts and attempt >= self.max_attempts:
+                        return self._give_up(method_name, kwargs, f'{e} (gave up after {attempt} attempts)', kind)
+                    delay = self.backoff(attempt)
+                else:
+                    self.breaker.release_trial()
+                    delay = retry_after_seconds(e) + random.uniform(0, 1)
+                # Rate limits are expected during big exports and don't use up the channel's budget
+                limit = deadline if kind == RATE_LIMITED else self._budget_deadline(deadline)
+                if limit is not None and time.monotonic() + delay > limit:
+                    return self._give_up(method_name, kwargs, f'{e} (deadline exceeded)', kind)
+                logging.warning(f"{kind.replace('_', ' ').capitalize()} error in {method_name} for channel: {channel_id}: {e}. Retrying in {delay:.1f} seconds...")
+                time.sleep(delay)
+                if kind == TRANSIENT:
+                    self._charge(delay)
+                continue
+            self.breaker.record_success()
+            if self.cache is not None:
+                self.cache.store(method_name, kwargs, result)
+            return result
+
+    def _give_up(self, method_name, kwargs, error, kind):
+        logging.error(f"Giving up on {method_name} for channel: {kwargs.get('channel', '')}: {error}")
+        if not self.errors_path:
+            return None
+        entry = {
+            'method': method_name,
+            'params': {key: value for key, value in kwargs.items() if key in ('channel', 'cursor', 'oldest', 'latest', 'user', 'types')},
+            'error': str(error),
+            'kind': kind,
+            'at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        }
+        with self._errors_lock:
+            errors = []
+            if os.path.exists(self.errors_path):
+                try:
+                    with open(self.errors_path, 'r') as f:
+                        errors = json.load(f)
+                except (OSError, ValueError):
+                    errors = []
+            errors.append(entry)
+            with open(self.errors_path, 'w') as f:
+                json.dump(errors, f, indent=2)
+        return None
@@ -25,5 +25,13 @@ def print_sample_messages(messages_path="omata-developers/messages.json", sample
     for msg in messages[-sample_size:]:
         print(fmt(msg))
 
+def cli(argv=None, prog=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog=prog, description="Print the first and last messages of a messages.json file.")
+    parser.add_argument("messages_json", nargs="?", default="omata-developers/messages.json", help="Path to messages.json")
+    parser.add_argument("--sample-size", type=int, default=5, help="Messages to print from each end (default 5)")
+    args = parser.parse_args(argv)
+    print_sample_messages(args.messages_json, args.sample_size)
+
 if __name__ == "__main__":
-    print_sample_messages()
+    cli()
@@ -0,0 +1,300 @@
+import concurrent.futures
+import hashlib
+import html
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+
+from slack2pdf import (AvatarRegistry, BOLD, CHANNEL, CODE, ITALIC, LINK, MENTION, STRIKE, URL,
+                       date_label, find_messages_files, load_json, tokenize_mrkdwn)
+
+logging.basicConfig(level=logging.INFO)
+
+# Bump when the page markup changes so every page is rendered again
+RENDER_VERSION = 3
+STATE_FILE = '.slack2html_state.json'
+
+STYLE = '''body { font-family: -apple-system, Helvetica, Arial, sans-serif; max-width: 52em; margin: 2em auto; padding: 0 1em; color: #1d1c1d; }
+nav { margin: 1em 0; font-size: 0.9em; }
+nav a { margin-right: 1em; }
+.msg { display: flex; gap: 0.75em; margin: 0 0 1em; }
+.avatar { width: 36px; height: 36px; border-radius: 4px; flex: none; background: #ddd; }
+.name { font-weight: bold; }
+.time { color: #616061; font-size: 0.8em; margin-left: 0.5em; }
+.time a { color: inherit; text-decoration: none; }
+.text { white-space: pre-wrap; overflow-wrap: anywhere; }
+.mention, .channel { background: #e8f5fa; color: #1264a3; }
+code { background: #f6f6f6; padding: 0 0.2em; }
+.files { margin: 0.25em 0 0; padding-left: 1.2em; font-size: 0.9em; }
+.missing { color: #999; }
+ul.periods { columns: 3; }
+'''
+
+RUN_TAGS = {BOLD: 'strong', ITALIC: 'em', STRIKE: 'del', CODE: 'code'}
+# Link targets rendered as anchors; anything else (javascript:, data:, ...) is shown as text
+LINK_PREFIXES = ('http://', 'https://', 'mailto:')
+
+
+def text_html(text, user_map):
+    """Render Slack message markup as HTML using the same tokenizer as the PDF transcripts."""
+    parts = []
+    for run in tokenize_mrkdwn(text, user_map):
+        escaped = html.escape(run.text)
+        if run.kind in RUN_TAGS:
+            tag = RUN_TAGS[run.kind]
+            parts.append(f'<{tag}>{escaped}</{tag}>')
+        elif run.kind == MENTION:
+            parts.append(f'<span class="mention">{escaped}</span>')
+        elif run.kind == CHANNEL:
+            parts.append(f'<span class="channel">{escaped}</span>')
+        elif run.kind in (LINK, URL):
+            label = escaped if run.kind == LINK else html.escape(run.target)
+            if run.target.lower().startswith(LINK_PREFIXES):
+                parts.append(f'<a href="{html.escape(run.target)}">{label}</a>')
+            else:
+                parts.append(label)
+        else:
+            parts.append(escaped)
+    return ''.join(parts)
+
+
+class FileLinks:
+    """Local paths and permalinks of a channel's downloaded files, from manifest.json and downloaded_files.json."""
+
+    def __init__(self, channel_dir, export_root):
+        self.files_dir = os.path.join(channel_dir, 'files')
+        self.by_id = {}
+        manifest_path = os.path.join(channel_dir, 'manifest.json')
+        if os.path.exists(manifest_path):
+            for file_id, entry in load_json(manifest_path).items():
+                if entry.get('saved_path'):
+                    self.by_id[file_id] = os.path.normpath(os.path.join(self.files_dir, entry['saved_path']))
+        # downloaded_files.json paths are relative to the export root
+        self.permalinks = {}
+        index_path = os.path.join(channel_dir, 'downloaded_files.json')
+        if os.path.exists(index_path):
+            for entry in load_json(index_path):
+                if entry.get('filepath') and entry.get('permalink'):
+                    self.permalinks[os.path.normpath(os.path.join(export_root, entry['filepath']))] = entry['permalink']
+
+    def resolve(self, file_info):
+        """Return (local_path, permalink) for a message's file; either may be None."""
+        local_path = self.by_id.get(file_info.get('id'))
+        permalink = self.permalinks.get(local_path) if local_path else None
+        return local_path, permalink or file_info.get('permalink')
+
+
+def message_html(msg, user_map, avatars, file_links, page_dir):
+    """Return the HTML for one message, or None if it has nothing to show (as in the PDF transcripts)."""
+    if msg.get('type') != 'message':
+        return None
+    text = msg.get('text') or ''
+    files = [f for f in msg.get('files') or [] if isinstance(f, dict)]
+    if not text.strip() and not files:
+        return None
+
+    user_id = msg.get('user', 'unknown')
+    ts = msg.get('ts', '')
+    ts_human = msg.get('ts_human') or datetime.fromtimestamp(float(ts or 0)).strftime('%Y-%m-%d %H:%M:%S')
+    anchor = 'm' + ts.replace('.', '')
+    if avatars.has(user_id):
+        src = html.escape(os.path.relpath(avatars.paths[user_id], page_dir))
+        avatar = f'<img class="avatar" src="{src}" alt="">'
+    else:
+        avatar = '<div class="avatar"></div>'
+
+    out = [f'<div class="msg" id="{anchor}">{avatar}<div>',
+           f'<div><span class="name">{html.escape(user_map.get(user_id, user_id))}</span>'
+           f'<span class="time"><a href="#{anchor}">{html.escape(ts_human)}</a></span></div>']
+    if text.strip():
+        out.append(f'<div class="text">{text_html(text, user_map)}</div>')
+    if files:
+        out.append('<ul class="files">')
+        for file_info in files:
+            name = html.escape(file_info.get('name') or file_info.get('id') or 'file')
+            local_path, permalink = file_links.resolve(file_info)
+            if local_path:
+                slack_link = f' <a class="missing" href="{html.escape(permalink)}">(Slack)</a>' if permalink else ''
+                out.append(f'<li><a href="{html.escape(os.path.relpath(local_path, page_dir))}">{name}</a>{slack_link}</li>')
+            elif permalink:
+                out.append(f'<li><a href="{html.escape(permalink)}">{name}</a> <span class="missing">(not downloaded)</span></li>')
+            else:
+                out.append(f'<li class="missing">{name}</li>')
+        out.append('</ul>')
+    out.append('</div></div>')
+    return ''.join(out)
+
+
+def page_html(title, nav, body):
+    return (f'<!DOCTYPE html>\n<html lang="en"><head><meta charset="utf-8">'
+            f'<meta name="viewport" content="width=device-width, initial-scale=1">'
+            f'<title>{html.escape(title)}</title><link rel="stylesheet" href="{nav["style"]}"></head>\n'
+            f'<body><h1>{html.escape(title)}</h1><nav>{nav["links"]}</nav>\n{body}\n<nav>{nav["links"]}</nav></body></html>\n')
+
+
+def write_if_changed(path, content):
+    """Write content to path unless it already holds exactly that. Returns True if written."""
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == content:
+                return False
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    return True
+
+
+def group_by_period(messages, period):
+    """Messages grouped by date label, in date order."""
+    groups = {}
+    for msg in messages:
+        groups.setdefault(date_label(msg, period), []).append(msg)
+    return dict(sorted(groups.items()))
+
+
+def period_digest(messages, neighbours, render_digest, file_links):
+    """Hash of everything a period page depends on: its messages, prev/next links, file links and render inputs."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([RENDER_VERSION, neighbours, render_digest], sort_keys=True).encode('utf-8'))
+    for msg in messages:
+        digest.update(json.dumps(msg, sort_keys=True).encode('utf-8'))
+        # A file downloaded since the last run turns its entry into a local link
+        for file_info in msg.get('files') or []:
+            if isinstance(file_info, dict):
+                digest.update(json.dumps(file_links.resolve(file_info)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def render_channel_html(messages_json_path, output_dir, export_root, user_map, avatars, period='day', force=False):
+    """Write one HTML page per period of a channel, re-rendering only periods whose digest changed.
+
+    Returns (channel_name, period_count, rendered_count, message_count).
+    """
+    channel_dir = os.path.dirname(os.path.abspath(messages_json_path))
+    channel_name = os.path.basename(channel_dir)
+    page_dir = os.path.join(output_dir, channel_name)
+    os.makedirs(page_dir, exist_ok=True)
+    state_path = os.path.join(page_dir, STATE_FILE)
+    state = load_json(state_path) if os.path.exists(state_path) and not force else {}
+    pages = state.get('pages', {}) if state.get('period') == period else {}
+
+    # messages.json is oldest first, so each page reads oldest to newest
+    messages = load_json(messages_json_path)
+    groups = group_by_period(messages, period)
+    file_links = FileLinks(channel_dir, export_root)
+    # Users and avatars feed every page of the channel
+    render_digest = hashlib.sha256(json.dumps([sorted(user_map.items()), avatars.fingerprint()]).encode('utf-8')).hexdigest()
+
+    labels = list(groups)
+    rendered = 0
+    new_pages = {}
+    for i, label in enumerate(labels):
+        neighbours = [labels[i - 1] if i else None, labels[i + 1] if i + 1 < len(labels) else None]
+        digest = period_digest(groups[label], neighbours, render_digest, file_links)
+        new_pages[label] = {'digest': digest, 'messages': len(groups[label])}
+        page_path = os.path.join(page_dir, f'{label}.html')
+        if pages.get(label, {}).get('digest') == digest and os.path.exists(page_path):
+            continue
+        body = [message_html(msg, user_map, avatars, file_links, page_dir) for msg in groups[label]]
+        links = ['<a href="../index.html">All channels</a>', f'<a href="index.html">#{html.escape(channel_name)}</a>']
+        if neighbours[0]:
+            links.append(f'<a href="{neighbours[0]}.html">&larr; {neighbours[0]}</a>')
+        if neighbours[1]:
+            links.append(f'<a href="{neighbours[1]}.html">{neighbours[1]} &rarr;</a>')
+        nav = {'style': '../style.css', 'links': ' '.join(links)}
+        write_if_changed(page_path, page_html(f'#{channel_name} {label}', nav, '\n'.join(b for b in body if b)))
+        rendered += 1
+
+    # Drop pages for periods that no longer have messages
+    for label in set(pages) - set(new_pages):
+        page_path = os.path.join(page_dir, f'{label}.html')
+        if os.path.exists(page_path):
+            os.remove(page_path)
+
+    items = '\n'.join(f'<li><a href="{label}.html">{label}</a> ({new_pages[label]["messages"]})</li>' for label in reversed(labels))
+    nav = {'style': '../style.css', 'links': '<a href="../index.html">All channels</a>'}
+    write_if_changed(os.path.join(page_dir, 'index.html'), page_html(f'#{channel_name}', nav, f'<ul class="periods">\n{items}\n</ul>'))
+    with open(state_path, 'w', encoding='utf-8') as f:
+        json.dump({'period': period, 'pages': new_pages}, f, indent=2)
+    logging.info(f'#{channel_name}: {rendered} of {len(labels)} pages rendered')
+    return channel_name, len(labels), rendered, len(messages)
+
+
+def write_site_index(output_dir, channels):
+    items = '\n'.join(f'<li><a href="{html.escape(name)}/index.html">#{html.escape(name)}</a> '
+                      f'({message_count} messages, {period_count} pages)</li>'
+                      for name, period_count, _, message_count in sorted(channels))
+    nav = {'style': 'style.css', 'links': ''}
+    write_if_changed(os.path.join(output_dir, 'style.css'), STYLE)
+    write_if_changed(os.path.join(output_dir, 'index.html'), page_html('Slack archive', nav, f'<ul>\n{items}\n</ul>'))
+
+
+# Per-process resources, loaded once by _init_html_worker
+_html_job = None
+
+
+def _init_html_worker(user_map, avatars_path, options):
+    global _html_job
+    _html_job = (user_map, AvatarRegistry(avatars_path), options)
+
+
+def _render_html_channel(messages_json_path):
+    user_map, avatars, options = _html_job
+    return render_channel_html(messages_json_path, user_map=user_map, avatars=avatars, **options)
+
+
+def main(export_root, output_dir, period='day', users_path=None, avatars_path=None, jobs=None, force=False):
+    """Render every channel under export_root into a static HTML archive in output_dir, in parallel.
+
+    Returns the list of messages.json files that failed.
+    """
+    export_root = os.path.abspath(export_root)
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    paths = [path for path in find_messages_files(export_root) if not os.path.abspath(path).startswith(output_dir + os.sep)]
+    if not paths:
+        logging.warning(f'No messages.json files found under {export_root}')
+        return []
+    users = load_json(users_path or os.path.join(export_root, 'users.json'))
+    user_map = {user['id']: user['name'] for user in users}
+    avatars_path = os.path.abspath(avatars_path or os.path.join(export_root, 'avatars'))
+    options = {'output_dir': output_dir, 'export_root': export_root, 'period': period, 'force': force}
+
+    jobs = min(jobs or os.cpu_count() or 1, len(paths))
+    logging.info(f'Rendering {len(paths)} channels with {jobs} worker processes')
+    channels = []
+    failed = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=_init_html_worker, initargs=(user_map, avatars_path, options)) as executor:
+        futures = {executor.submit(_render_html_channel, path): path for path in paths}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                channels.append(future.result())
+            except Exception as e:
+                logging.error(f'Failed to render {futures[future]}: {e}')
+                failed.append(futures[future])
+    write_site_index(output_dir, channels)
+    rendered = sum(channel[2] for channel in channels)
+    logging.info(f'HTML archive written to {output_dir}: {rendered} pages rendered, {len(failed)} channels failed')
+    return failed
+
+
+def cli(argv=None, prog=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog=prog, description='Render Slack channel exports as a static HTML archive.')
+    parser.add_argument('export_root', help='Export root containing one directory per channel with messages.json')
+    parser.add_argument('--output-dir', default='html_archive', help='Directory to write the archive to (default: html_archive)')
+    parser.add_argument('--period', choices=['day', 'month'], default='day', help='Write one page per channel per day or per month')
+    parser.add_argument('--users', help='Path to users.json (default: <export_root>/users.json)')
+    parser.add_argument('--avatars', help='Avatars directory (default: <export_root>/avatars)')
+    parser.add_argument('--jobs', type=int, help='Worker processes (default: number of cores)')
+    parser.add_argument('--force', action='store_true', help='Re-render every page, ignoring the saved state')
+    args = parser.parse_args(argv)
+    failed = main(args.export_root, args.output_dir, args.period, args.users, args.avatars, args.jobs, args.force)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(cli())
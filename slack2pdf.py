@@ -1,19 +1,23 @@
 import json
 import os
 from datetime import datetime
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, legal, A4, A3, A2, A1, A0, A5
-from reportlab.lib.units import inch
-from PIL import Image
 import sys
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 import re
+import collections
+import concurrent.futures
+import contextlib
+from array import array
+import functools
+import hashlib
 import io
-import qrcode
-from reportlab.lib.utils import ImageReader
 import logging
 import random
+import time
+import tracemalloc
+
+# reportlab, qrcode and pypdf are imported where they are first needed, so
+# importing this module (or running --help) doesn't pay for them.
+inch = 72.0  # points, as reportlab.lib.units.inch
 
 logging.basicConfig(level=logging.INFO)
 
@@ -52,8 +56,75 @@ AVATAR_SIZE = 0.4 * inch
 LINE_HEIGHT = 8
 FONT_SIZE = 7
 
+class PhaseProfiler:
+    """Wall time, call counts and peak traced memory per named phase, for --profile.
+
+    Disabled by default; phase() then returns a shared no-op context so the
+    instrumented hot paths cost next to nothing.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.seconds = collections.defaultdict(float)
+        self.calls = collections.defaultdict(int)
+        self.peak_bytes = collections.defaultdict(int)
+        self.overall_peak_bytes = 0
+        self.started_at = None
+
+    def start(self):
+        self.enabled = True
+        self.started_at = time.perf_counter()
+        tracemalloc.start()
+
+    def phase(self, name):
+        if not self.enabled:
+            return _NO_PHASE
+        return _ProfiledPhase(self, name)
+
+    def report(self):
+        """Return {'total_seconds', 'peak_bytes', 'phases': {name: {seconds, calls, peak_bytes}}}."""
+        total = time.perf_counter() - self.started_at
+        phases = {name: {'seconds': self.seconds[name], 'calls': self.calls[name], 'peak_bytes': self.peak_bytes[name]} for name in self.seconds}
+        phases['other'] = {'seconds': max(0.0, total - sum(self.seconds.values())), 'calls': 0, 'peak_bytes': 0}
+        peak = max(self.overall_peak_bytes, tracemalloc.get_traced_memory()[1]) if tracemalloc.is_tracing() else self.overall_peak_bytes
+        return {'total_seconds': total, 'peak_bytes': peak, 'phases': phases}
+
+    def log_report(self):
+        report = self.report()
+        logging.info(f"Profile: {report['total_seconds']:.2f}s total, peak traced memory {report['peak_bytes'] / 2**20:.1f} MB")
+        for name, phase in sorted(report['phases'].items(), key=lambda item: -item[1]['seconds']):
+            logging.info(f"  {name:<12} {phase['seconds']:9.3f}s {phase['calls']:9d} calls  peak {phase['peak_bytes'] / 2**20:8.1f} MB")
+        return report
+
+
+class _ProfiledPhase:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        # Fold the peak so far into the overall peak, then measure this phase's own
+        profiler = self.profiler
+        profiler.overall_peak_bytes = max(profiler.overall_peak_bytes, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        profiler = self.profiler
+        profiler.seconds[self.name] += time.perf_counter() - self.start
+        profiler.calls[self.name] += 1
+        peak = tracemalloc.get_traced_memory()[1]
+        profiler.peak_bytes[self.name] = max(profiler.peak_bytes[self.name], peak)
+        profiler.overall_peak_bytes = max(profiler.overall_peak_bytes, peak)
+        return False
+
+
+_NO_PHASE = contextlib.nullcontext()
+PROFILER = PhaseProfiler()
+
+
 def load_json(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
+    with PROFILER.phase('json load'), open(file_path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
 
@@ -61,63 +132,211 @@ def ts_to_human(ts):
     return ts  # Already human readable in JSON
 
 
-def draw_wrapped_text(c, text, x, y, max_width, line_height, font_name="Helvetica", font_size=FONT_SIZE):
-    words = text.split(' ')
-    line = ''
-    c.setFont(font_name, font_size)
+# Word widths keyed by (font_name, font_size); widths are additive for the
+# base-14 and TTF fonts we use, so a line's width is the sum of its words.
+_WORD_WIDTHS = {}
+
+
+def word_width(word, font_name, font_size):
+    widths = _WORD_WIDTHS.get((font_name, font_size))
+    if widths is None:
+        widths = _WORD_WIDTHS[(font_name, font_size)] = {}
+    width = widths.get(word)
+    if width is None:
+        from reportlab.pdfbase import pdfmetrics
+        width = widths[word] = pdfmetrics.stringWidth(word, font_name, font_size)
+    return width
+
+
+def layout_runs(runs, max_width, font_name, bold_font_name, font_size):
+    """Greedily break text runs into lines that fit max_width, measuring each word once.
+
+    Returns a list of lines, each a list of [x_offset, font_name, text] fragments.
+    """
+    space_width = word_width(' ', font_name, font_size)
+    # Split runs into words; a word may span runs, e.g. '*bold*,' is a bold and a plain fragment
+    words = []
+    word = []
+    for run in runs:
+        run_font = bold_font_name if run.kind == BOLD else font_name
+        for i, part in enumerate(run.text.split(' ')):
+            if i:
+                words.append(word)
+                word = []
+            if part:
+                word.append((run_font, part))
+    words.append(word)
+
+    lines = []
+    line = []
+    line_width = 0
+    sep = ''
     for word in words:
-        test_line = line + word + ' '
-        if c.stringWidth(test_line, font_name, font_size) < max_width:
-            line = test_line
-        else:
-            c.drawString(x, y, line.strip())
-            y -= line_height
-            line = word + ' '
+        if not word and not line:
+            continue
+        widths = [word_width(text, font, font_size) for font, text in word]
+        width = sum(widths) + space_width
+        if line and line_width + width >= max_width:
+            lines.append(line)
+            line = []
+            line_width = 0
+            sep = ''
+        x = line_width
+        for (font, text), w in zip(word, widths):
+            if line and line[-1][1] == font:
+                line[-1][2] += sep + text
+            else:
+                line.append([x, font, text])
+            sep = ''
+            x += w
+        line_width += width
+        sep += ' '
     if line:
-        c.drawString(x, y, line.strip())
+        lines.append(line)
+    return lines
+
+
+def layout_text_lines(text, max_width, font_name, font_size):
+    return layout_runs([TextRun(TEXT, text, None)], max_width, font_name, font_name, font_size)
+
+
+def draw_text_lines(c, lines, x, y, line_height, font_size=FONT_SIZE):
+    current_font = None
+    for line in lines:
+        for offset, font, text in line:
+            if font != current_font:
+                c.setFont(font, font_size)
+                current_font = font
+            c.drawString(x + offset, y, text)
         y -= line_height
     return y
 
 
-def draw_user_key_page(c, users, avatars_dir, page_width, page_height, margin, avatar_size, line_height, normal_font_name="Helvetica"):
-    c.showPage()
-    c.setFont(normal_font_name, FONT_SIZE)
-    c.drawString(margin, page_height - margin, "User Key")
-
-    y = page_height - margin - 30
+def draw_wrapped_text(c, text, x, y, max_width, line_height, font_name="Helvetica", font_size=FONT_SIZE):
+    lines = layout_text_lines(text, max_width, font_name, font_size)
+    return draw_text_lines(c, lines, x, y, line_height, font_size)
+
+
+class AvatarRegistry:
+    """Avatar images resolved once per avatars directory and drawn as shared form XObjects.
+
+    Each avatar is decoded at most once and embedded once per canvas; every
+    later draw is a reference to the same form, so PDF size does not grow with
+    the number of messages.
+    """
+
+    EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+    def __init__(self, avatars_dir):
+        self.avatars_dir = avatars_dir
+        self.paths = {}
+        self._images = {}
+        self._fingerprint = None
+        try:
+            filenames = os.listdir(avatars_dir)
+        except OSError:
+            logging.warning(f'Avatars directory not found: {avatars_dir}')
+            filenames = []
+        # Prefer .jpg over .jpeg over .png, matching the old per-message probe order
+        for ext in reversed(self.EXTENSIONS):
+            for filename in filenames:
+                stem, file_ext = os.path.splitext(filename)
+                if file_ext == ext:
+                    self.paths[stem] = os.path.join(avatars_dir, filename)
+        logging.info(f'Resolved {len(self.paths)} avatars in {avatars_dir}')
+
+    def has(self, key):
+        return key in self.paths
+
+    def fingerprint(self):
+        """Digest of the resolved avatar files, so cached output is invalidated when avatars change."""
+        if self._fingerprint is None:
+            digest = hashlib.sha256()
+            for key in sorted(self.paths):
+                stat = os.stat(self.paths[key])
+                digest.update(f'{key}:{self.paths[key]}:{stat.st_size}:{stat.st_mtime_ns}\n'.encode('utf-8'))
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def image(self, key):
+        """Return the decoded image for key, or None if missing or undecodable."""
+        if key not in self._images:
+            reader = None
+            path = self.paths.get(key)
+            if path:
+                from reportlab.lib.utils import ImageReader
+                try:
+                    reader = ImageReader(path)
+                    reader.getRGBData()
+                except Exception as e:
+                    logging.warning(f'Could not decode avatar {path}: {e}')
+                    reader = None
+            self._images[key] = reader
+        return self._images[key]
+
+    def draw(self, c, key, x, y, size):
+        """Draw the avatar for key with its lower-left corner at (x, y). Returns False if there is none."""
+        reader = self.image(key)
+        if reader is None:
+            return False
+        form_name = 'avatar_' + re.sub(r'\W', '_', f'{key}_{size:.2f}')
+        if not c.hasForm(form_name):
+            c.beginForm(form_name, 0, 0, size, size)
+            c.drawImage(reader, 0, 0, size, size, mask='auto')
+            c.endForm()
+        c.saveState()
+        c.translate(x, y)
+        c.doForm(form_name)
+        c.restoreState()
+        return True
+
+
+def grid_rows_per_page(first_y, min_y, row_height):
+    """Rows of a two-column listing that fit between first_y and min_y."""
+    return max(1, int((first_y - min_y) // row_height) + 1)
+
+
+def grid_page_count(count, rows_per_page):
+    return -(-count // (2 * rows_per_page))
+
+
+def user_key_rows_per_page(page_height, margin, avatar_size):
+    return grid_rows_per_page(page_height - margin - 30, margin + avatar_size, avatar_size + 15)
+
+
+def user_key_page_count(user_count, page_height, margin, avatar_size):
+    return max(1, grid_page_count(user_count, user_key_rows_per_page(page_height, margin, avatar_size)))
+
+
+def draw_user_key_page(c, users, avatars, page_width, page_height, margin, avatar_size, line_height, normal_font_name="Helvetica", new_page=None):
+    new_page = new_page or c.showPage
+    first_y = page_height - margin - 30
+    per_page = 2 * user_key_rows_per_page(page_height, margin, avatar_size)
     x_left = margin
     x_right = margin + (page_width - 2 * margin) / 2
-    c.setFont(normal_font_name, FONT_SIZE)
 
-    col = 0
+    def start_page():
+        new_page()
+        c.setFont(normal_font_name, FONT_SIZE)
+        c.drawString(margin, page_height - margin, "User Key")
 
-    for user in users:
-        if col == 0 and y < margin + avatar_size:
-            c.showPage()
-            c.setFont(normal_font_name, FONT_SIZE)
-            c.drawString(margin, page_height - margin, "User Key")
-            y = page_height - margin - 30
+    if not users:
+        start_page()
+
+    for i, user in enumerate(users):
+        slot = i % per_page
+        if slot == 0:
+            start_page()
 
         user_id = user.get('id', 'unknown')
         real_name = user.get('real_name', '')
         display_name = user.get('name', '')
 
-        x = x_left if col == 0 else x_right
+        x = x_left if slot % 2 == 0 else x_right
+        y = first_y - (slot // 2) * (avatar_size + 15)
 
         # Draw avatar
-        avatar_path = None
-        for ext in ['.jpg', '.jpeg', '.png']:
-            path = os.path.join(avatars_dir, f'{user_id}{ext}')
-            if os.path.isfile(path):
-                avatar_path = path
-                break
-        if avatar_path:
-            try:
-                c.drawImage(avatar_path, x, y - avatar_size, avatar_size, avatar_size, mask='auto')
-            except Exception:
-                c.setFillColorRGB(0, 0, 0)
-                c.rect(x, y - avatar_size, avatar_size, avatar_size, fill=1)
-        else:
+        if not avatars.draw(c, user_id, x, y - avatar_size, avatar_size):
             c.setFillColorRGB(0, 0, 0)
             c.rect(x, y - avatar_size, avatar_size, avatar_size, fill=1)
 
@@ -126,128 +345,201 @@ def draw_user_key_page(c, users, avatars_dir, page_width, page_height, margin, a
         c.drawString(text_x, y - 10, f'{real_name} ({display_name})')
         c.drawString(text_x, y - 25, f'User ID: {user_id}')
 
-        if col == 1:
-            y -= avatar_size + 15
 
-        col = (col + 1) % 2
-
-    # If last row was single column, add some space
-    if col == 1:
-        y -= avatar_size + 15
+# Insert zero-width space after special URL chars to improve wrapping
+URL_BREAKS = str.maketrans({ch: ch + '\u200b' for ch in '/.|-_?=&'})
 
 
 def insert_breaks_in_url(text):
-    # Insert zero-width space after special URL chars to improve wrapping
-    special_chars = ['/', '.', '|', '-', '_', '?', '=', '&']
-    for ch in special_chars:
-        text = text.replace(ch, ch + '\u200b')
-    return text
-
-
-def replace_user_mentions(text, user_map):
-    import re
-    # Replace user mentions
-    pattern = re.compile(r'<@([A-Z0-9]+)>')
-    def replacer(match):
-        user_id = match.group(1)
-        return '@' + user_map.get(user_id, 'unknown')
-    text = pattern.sub(replacer, text)
-
-    # Replace Slack-style URLs <url|display> with clean filename
-    slack_url_pattern = re.compile(r'<([^|>]+)\|([^>]+)>')
-    def slack_url_replacer(match):
-        display = match.group(2)
-        # Extract filename by removing trailing non-filename chars
-        filename = display.split('/')[-1]
-        filename = re.sub(r'[^\w\d\.\-]+$', '', filename)
-        return filename
-    text = slack_url_pattern.sub(slack_url_replacer, text)
-
-    # Replace plain URLs with 'URL'
-    url_pattern = re.compile(r'https?://\S+')
-    text = url_pattern.sub('URL', text)
-
-    return text
-
-
-def replace_urls_in_text(text):
-    import re
-    logging.debug(f'replace_urls_in_text called with: {text}')
-    # Match Slack-style URLs like <url|display>
-    slack_url_pattern = re.compile(r'<([^|>]+)\|([^>]+)>')
-    matches = slack_url_pattern.findall(text)
-    for match in matches:
-        logging.debug(f'Replacing Slack-style URL: <{match[0]}|{match[1]}>')
-    def slack_url_replacer(m):
-        display = m.group(2)
-        filename = display.split('/')[-1]
-        filename = re.sub(r'[^\x00-\x7F]+$', '', filename)  # Remove trailing non-ASCII chars
-        return filename
-    text = slack_url_pattern.sub(slack_url_replacer, text)
-
-    # Replace plain URLs with 'URL'
-    url_pattern = re.compile(r'https?://\S+')
-    matches = url_pattern.findall(text)
-    for match in matches:
-        logging.debug(f'Replacing plain URL: {match}')
-    text = url_pattern.sub('URL', text)
-
-    return text
-
-
-def draw_qr_code(c, data, x, y, size):
-    qr = qrcode.QRCode(box_size=2, border=1)
+    return text.translate(URL_BREAKS)
+
+
+# Kinds of text runs produced by tokenize_mrkdwn
+TEXT = 'text'
+BOLD = 'bold'
+ITALIC = 'italic'
+STRIKE = 'strike'
+CODE = 'code'
+MENTION = 'mention'
+CHANNEL = 'channel'
+LINK = 'link'
+URL = 'url'
+
+# A run of message text; target holds the user/channel id or URL behind mentions and links
+TextRun = collections.namedtuple('TextRun', 'kind text target')
+
+# All Slack markup recognised in a single scan, tried left to right
+MRKDWN_PATTERN = re.compile(r'''
+    <@(?P<user>[A-Z0-9]+)(?:\|[^>]*)?>
+  | <\#(?P<channel>[A-Z0-9]+)(?:\|(?P<channel_name>[^>]*))?>
+  | <!(?P<special>[^|>]+)(?:\|(?P<special_label>[^>]*))?>
+  | <(?P<link>[^|>\s]+)\|(?P<label>[^>]+)>
+  | <(?P<bare_link>https?://[^|>\s]+)>
+  | (?P<url>https?://[^\s<>]+)
+  | ```(?P<pre>[\s\S]+?)```
+  | `(?P<code>[^`\n]+)`
+  | (?<![\w*])\*(?P<bold>[^*\n]+?)\*(?![\w*])
+  | (?<![\w_])_(?P<italic>[^_\n]+?)_(?![\w_])
+  | (?<![\w~])~(?P<strike>[^~\n]+?)~(?![\w~])
+  | &(?P<entity>amp|lt|gt);
+''', re.VERBOSE)
+
+HTML_ENTITIES = {'amp': '&', 'lt': '<', 'gt': '>'}
+TRAILING_NON_FILENAME = re.compile(r'[^\w\d\.\-]+$')
+URL_TRAILING_PUNCTUATION = '.,;:!?)'
+
+
+def trim_url(url):
+    """Strip sentence punctuation from the end of a bare URL, keeping a ) that closes a ( in it."""
+    while url[-1] in URL_TRAILING_PUNCTUATION:
+        if url[-1] == ')' and url.count('(') >= url.count(')'):
+            break
+        url = url[:-1]
+    return url
+
+
+def _mrkdwn_run(m, user_map):
+    if m.group('user'):
+        user_id = m.group('user')
+        return TextRun(MENTION, '@' + user_map.get(user_id, 'unknown'), user_id)
+    if m.group('channel'):
+        return TextRun(CHANNEL, '#' + (m.group('channel_name') or m.group('channel')), m.group('channel'))
+    if m.group('special'):
+        return TextRun(MENTION, m.group('special_label') or '@' + m.group('special'), None)
+    if m.group('link'):
+        # Show a clean filename for Slack-style <url|display> links
+        filename = TRAILING_NON_FILENAME.sub('', m.group('label').split('/')[-1])
+        return TextRun(LINK, filename, m.group('link'))
+    if m.group('bare_link'):
+        return TextRun(URL, 'URL', m.group('bare_link'))
+    if m.group('url'):
+        return TextRun(URL, 'URL', trim_url(m.group('url')))
+    if m.group('pre') is not None:
+        return TextRun(CODE, m.group('pre'), None)
+    for kind in (CODE, BOLD, ITALIC, STRIKE):
+        if m.group(kind):
+            return TextRun(kind, m.group(kind), None)
+    return TextRun(TEXT, HTML_ENTITIES[m.group('entity')], None)
+
+
+def _append_text(runs, text):
+    if runs and runs[-1].kind == TEXT:
+        runs[-1] = TextRun(TEXT, runs[-1].text + text, None)
+    else:
+        runs.append(TextRun(TEXT, text, None))
+
+
+def tokenize_mrkdwn(text, user_map):
+    """Split Slack message text into TextRuns in one pass over the string."""
+    runs = []
+    pos = 0
+    for m in MRKDWN_PATTERN.finditer(text):
+        if m.start() > pos:
+            _append_text(runs, text[pos:m.start()])
+        run = _mrkdwn_run(m, user_map)
+        if run.kind == TEXT:
+            _append_text(runs, run.text)
+        else:
+            runs.append(run)
+        pos = m.end()
+        if m.group('url'):
+            # Punctuation trimmed off a bare URL stays in the text
+            pos = m.start('url') + len(run.target)
+    if pos < len(text):
+        _append_text(runs, text[pos:])
+    return runs
+
+
+def run_urls(runs):
+    """Return the distinct web URLs behind links in runs, in order of appearance."""
+    return list(dict.fromkeys(run.target for run in runs if run.kind in (LINK, URL) and run.target.startswith(('http://', 'https://'))))
+
+
+@functools.lru_cache(maxsize=4096)
+def qr_module_runs(data):
+    """Return (module_count, runs) for data's QR code, where runs are (row, col, length) of dark modules."""
+    import qrcode
+    qr = qrcode.QRCode(border=1)
     qr.add_data(data)
     qr.make(fit=True)
-    img = qr.make_image(fill='black', back_color='white')
-    img_buffer = io.BytesIO()
-    img.save(img_buffer, format='PNG')
-    img_buffer.seek(0)
-    c.drawImage(ImageReader(img_buffer), x, y - size, size, size)
+    matrix = qr.get_matrix()
+    runs = []
+    for row, modules in enumerate(matrix):
+        col = 0
+        while col < len(modules):
+            if modules[col]:
+                start = col
+                while col < len(modules) and modules[col]:
+                    col += 1
+                runs.append((row, start, col - start))
+            else:
+                col += 1
+    return len(matrix), tuple(runs)
 
 
-def draw_file_index_page(c, files, page_width, page_height, margin_left, margin_bottom, line_height, normal_font_name="Helvetica"):
-    c.showPage()
-    c.setFont(normal_font_name, FONT_SIZE + 2)
+def draw_qr_code(c, data, x, y, size):
+    # One vector form per URL and size, shared by every page that shows it
+    form_name = f'qr_{hashlib.sha1(data.encode("utf-8")).hexdigest()[:16]}_{size:.2f}'.replace('.', '_')
+    if not c.hasForm(form_name):
+        count, runs = qr_module_runs(data)
+        module = size / count
+        c.beginForm(form_name, 0, 0, size, size)
+        c.setFillColorRGB(1, 1, 1)
+        c.rect(0, 0, size, size, stroke=0, fill=1)
+        c.setFillColorRGB(0, 0, 0)
+        path = c.beginPath()
+        for row, col, length in runs:
+            path.rect(col * module, size - (row + 1) * module, length * module, module)
+        c.drawPath(path, stroke=0, fill=1)
+        c.endForm()
+    c.saveState()
+    c.translate(x, y - size)
+    c.doForm(form_name)
+    c.restoreState()
+
+
+def listing_rows_per_page(page_height, margin_bottom, line_height):
+    # Listings use the bottom margin for the top as well
+    return grid_rows_per_page(page_height - margin_bottom - 30, margin_bottom + line_height, line_height)
+
+
+def listing_page_count(count, page_height, margin_bottom, line_height):
+    return grid_page_count(count, listing_rows_per_page(page_height, margin_bottom, line_height))
+
+
+def draw_listing_pages(c, title, entries, page_width, page_height, margin_left, margin_bottom, line_height, normal_font_name="Helvetica", new_page=None):
+    """Draw entries in two columns under title, continuing onto as many pages as needed."""
+    new_page = new_page or c.showPage
     margin_top = margin_bottom  # Use same margin for top as bottom for consistency
-    c.drawString(margin_left, page_height - margin_top, "File Index")
-
-    y = page_height - margin_top - 30
+    first_y = page_height - margin_top - 30
+    per_page = 2 * listing_rows_per_page(page_height, margin_bottom, line_height)
     x_left = margin_left
     x_right = margin_left + (page_width - 2 * margin_left) / 2
-    c.setFont(normal_font_name, FONT_SIZE)
-
-    col = 0
-    file_index = 0
-    
-    while file_index < len(files):
-        # Check if we need a new page
-        if y < margin_bottom + line_height:
-            c.showPage()
+
+    for i, entry in enumerate(entries):
+        slot = i % per_page
+        if slot == 0:
+            new_page()
             c.setFont(normal_font_name, FONT_SIZE + 2)
-            c.drawString(margin_left, page_height - margin_top, "File Index (continued)")
-            y = page_height - margin_top - 30
-            c.setFont(normal_font_name, FONT_SIZE - 2)
-            col = 0
-        
-        x = x_left if col == 0 else x_right
-        c.drawString(x, y, files[file_index])
-        file_index += 1
-        
-        if col == 1:
-            y -= line_height
-
-        col = (col + 1) % 2
-    
-    # If last row was single column, add some space
-    if col == 1:
-        y -= line_height
+            c.drawString(margin_left, page_height - margin_top, title if i == 0 else f"{title} (continued)")
+            c.setFont(normal_font_name, FONT_SIZE)
+        x = x_left if slot % 2 == 0 else x_right
+        c.drawString(x, first_y - (slot // 2) * line_height, entry)
+
+
+def draw_file_index_page(c, files, page_width, page_height, margin_left, margin_bottom, line_height, normal_font_name="Helvetica", new_page=None):
+    draw_listing_pages(c, "File Index", files, page_width, page_height, margin_left, margin_bottom, line_height, normal_font_name, new_page)
+
+
+def draw_toc_pages(c, toc_entries, page_width, page_height, margin_left, margin_bottom, line_height, normal_font_name="Helvetica", new_page=None):
+    entries = [f'{label}  {page_num}' for label, page_num in toc_entries]
+    draw_listing_pages(c, "Contents", entries, page_width, page_height, margin_left, margin_bottom, line_height, normal_font_name, new_page)
 
 
-def draw_page_number_and_channel(c, page_num, page_width, margin_bottom, normal_font_name, font_size, channel_name, page_height, margin_top):
+def draw_page_number_and_channel(c, page_num, page_width, margin_bottom, normal_font_name, font_size, channel_name, page_height, margin_top, page_count=None):
     # Draw page number at bottom center
     c.setFont(normal_font_name, font_size)
-    page_num_text = f"{page_num}"
+    page_num_text = f"{page_num} of {page_count}" if page_count else f"{page_num}"
     text_width = c.stringWidth(page_num_text, normal_font_name, font_size)
     x = (page_width - text_width) / 2
     y = margin_bottom + font_size * 1.5
@@ -261,19 +553,7 @@ def draw_page_number_and_channel(c, page_num, page_width, margin_bottom, normal_
 
 
 def estimate_wrapped_text_height(c, text, max_width, line_height, font_name, font_size):
-    words = text.split(' ')
-    line = ''
-    lines = 0
-    for word in words:
-        test_line = line + word + ' '
-        if c.stringWidth(test_line, font_name, font_size) < max_width:
-            line = test_line
-        else:
-            lines += 1
-            line = word + ' '
-    if line:
-        lines += 1
-    return lines * line_height
+    return len(layout_text_lines(text, max_width, font_name, font_size)) * line_height
 
 
 def parse_page_size(page_size_name):
@@ -289,187 +569,699 @@ def parse_page_size(page_size_name):
     return (page_size_in[0] * inch, page_size_in[1] * inch)
 
 
-def main(messages_json_path, page_size_name='letter', normal_font_path=None, bold_font_path=None, margin_top=inch, margin_bottom=inch, margin_left=inch, margin_right=inch, output_dir=None):
-    PAGE_WIDTH, PAGE_HEIGHT = parse_page_size(page_size_name)
-    page_size = (PAGE_WIDTH, PAGE_HEIGHT)
+# Page geometry and fonts shared by the layout and render passes
+PageSettings = collections.namedtuple('PageSettings', 'page_width page_height margin_top margin_bottom margin_left margin_right normal_font_name bold_font_name')
+
+
+def layout_message(msg, user_map, settings):
+    """Measure one message. Returns (lines, file_names, urls, mentions, height), or None if it is not drawn."""
+    if msg.get('type') != 'message':
+        return None
+
+    text = msg.get('text')
+    file_names = []
+    if msg.get('files'):
+        file_names = [f.get('name', 'unknown') for f in msg['files'] if isinstance(f, dict)]
+        # Ensure file names are ASCII only
+        file_names = [name.encode('ascii', errors='ignore').decode('ascii') for name in file_names]
+        logging.debug(f"Found file names: {file_names}")
+    # If no text, but files exist, show only file references
+    if (not text or not text.strip()) and file_names:
+        text = ''  # No main text, only files
+    elif not text or not text.strip():
+        return None
+
+    # Scan the Slack markup once; the runs carry both display text and real URLs
+    with PROFILER.phase('normalize'):
+        runs = tokenize_mrkdwn(text, user_map) if text else []
+        urls = run_urls(runs)
+        mentions = [run.target for run in runs if run.kind == MENTION and run.target]
+
+    text_x = settings.margin_left + AVATAR_SIZE + 5
+    max_text_width = settings.page_width - settings.margin_right - text_x
+    if urls:
+        # Keep the text clear of the QR code column
+        max_text_width -= AVATAR_SIZE + 5
+    # Break the text into lines once; the same lines are measured and drawn
+    with PROFILER.phase('measure'):
+        lines = layout_runs(runs, max_text_width, settings.normal_font_name, settings.bold_font_name, FONT_SIZE)
+
+    height = 25  # header and spacing
+    height += len(lines) * LINE_HEIGHT
+    height += len(file_names) * LINE_HEIGHT
+    height += 10  # bottom spacing
+    if urls:
+        height = max(height, 3 + len(urls) * (AVATAR_SIZE + 5) + 10)
+    return lines, file_names, urls, mentions, height
+
+
+class MessagePlan:
+    """Page and position of every drawn message, computed before anything is drawn.
+
+    Positions live in flat arrays indexed by plan slot; the laid-out lines are
+    kept so the render pass never measures text again.
+    """
+
+    def __init__(self):
+        self.message_index = array('i')
+        self.page = array('i')
+        self.y = array('d')
+        self.lines = []
+        self.file_names = []
+        self.urls = []
+        self.page_count = 0
+        self.files = set()
+        # Ids of users who wrote or were mentioned in a planned message
+        self.participants = set()
+        # First body page (0-based) of each date, in document order
+        self.dates = {}
+
+    def __len__(self):
+        return len(self.message_index)
+
+
+def date_label(msg, granularity):
+    """Return the message's date as 'YYYY', 'YYYY-MM' or 'YYYY-MM-DD' for granularity year, month or day."""
+    ts_human = msg.get('ts_human')
+    if not ts_human:
+        ts_human = datetime.fromtimestamp(float(msg.get('ts', 0))).strftime('%Y-%m-%d')
+    return ts_human[:{'year': 4, 'month': 7}.get(granularity, 10)]
+
+
+class MessagePlanner:
+    """Incremental layout pass: places messages one at a time into a MessagePlan."""
+
+    def __init__(self, user_map, settings, toc=None):
+        self.user_map = user_map
+        self.settings = settings
+        self.toc = toc
+        self.plan = MessagePlan()
+        self.top = settings.page_height - settings.margin_top
+        self.bottom = settings.margin_bottom + FONT_SIZE * 2
+        self.page = 0
+        self.y = self.top
+
+    def measure(self, msg):
+        return layout_message(msg, self.user_map, self.settings)
+
+    def next_page(self, laid_out):
+        """Page a measured message would land on if placed next."""
+        height = laid_out[-1]
+        # Page break BEFORE the message, unless it already starts a page
+        if self.y - height < self.bottom and self.y < self.top:
+            return self.page + 1
+        return self.page
+
+    def place(self, index, msg, laid_out):
+        lines, file_names, urls, mentions, height = laid_out
+        page = self.next_page(laid_out)
+        if page != self.page:
+            self.page = page
+            self.y = self.top
+
+        plan = self.plan
+        plan.message_index.append(index)
+        plan.page.append(page)
+        plan.y.append(self.y)
+        plan.lines.append(lines)
+        plan.file_names.append(file_names)
+        plan.urls.append(urls)
+        # Authors and mentioned users make up the channel's user key
+        plan.participants.add(msg.get('user', 'unknown'))
+        plan.participants.update(mentions)
+        for f in msg.get('files') or []:
+            if isinstance(f, dict) and f.get('name'):
+                file_name = f['name'].encode('ascii', errors='ignore').decode('ascii')
+                if file_name:
+                    plan.files.add(file_name)
+        if self.toc:
+            plan.dates.setdefault(date_label(msg, self.toc), page)
+
+        # Next message starts below the text, or below the QR codes if they run longer
+        advance = 2.8 * FONT_SIZE + (len(lines) + len(file_names)) * LINE_HEIGHT + 10
+        if urls:
+            advance = max(advance, 3 + len(urls) * (AVATAR_SIZE + 5) + 5)
+        self.y -= advance
+
+    def finish(self):
+        self.plan.page_count = self.page + 1
+        return self.plan
+
+
+def plan_messages(messages, user_map, settings, toc=None):
+    """Layout pass: place each message on a page and collect the file and participant indexes."""
+    planner = MessagePlanner(user_map, settings, toc)
+    for index, msg in enumerate(messages):
+        laid_out = planner.measure(msg)
+        if laid_out is not None:
+            planner.place(index, msg, laid_out)
+    return planner.finish()
+
+
+class Pager:
+    """Turns pages and stamps each finished one with the channel name and "page X of Y".
+
+    With stamp=False pages are left bare, for output that is numbered after
+    stitching; each page's drawing is then wrapped in saveState/restoreState
+    so the stamp appended later starts from the default graphics state.
+    """
+
+    def __init__(self, c, settings, channel_name, page_count, stamp=True):
+        self.c = c
+        self.settings = settings
+        self.channel_name = channel_name
+        self.page_count = page_count
+        self.stamp = stamp
+        self.page_num = 0
+
+    def new_page(self):
+        if self.page_num:
+            self.finish_page()
+            self.c.showPage()
+        self.page_num += 1
+        if not self.stamp:
+            self.c.saveState()
+
+    def finish_page(self):
+        if not self.stamp:
+            self.c.restoreState()
+            return
+        settings = self.settings
+        draw_page_number_and_channel(self.c, self.page_num, settings.page_width, settings.margin_bottom, settings.normal_font_name, FONT_SIZE, self.channel_name, settings.page_height, settings.margin_top, self.page_count)
+
+
+def draw_message(c, msg, lines, file_names, urls, y, settings, user_map, avatars):
+    margin_left = settings.margin_left
+    text_x = margin_left + AVATAR_SIZE + 5
+    user_id = msg.get('user', 'unknown')
+    username = user_map.get(user_id, 'Unknown User')
+    ts_human = ts_to_human(msg.get('ts_human', 'Unknown Time'))
+
+    # Draw avatar
+    avatar_key = user_id
+    if user_id == "U08B6KZJ4":
+        # Hardcoded avatars for this user
+        existing_keys = [key for key in ("U62S2LGFK", "U08B6KZJ4", "drunk_clown", "U0FR0H27Q") if avatars.has(key)]
+        avatar_key = random.choice(existing_keys) if existing_keys else None
+    with PROFILER.phase('images'):
+        if not avatars.draw(c, avatar_key, margin_left, y - AVATAR_SIZE - 3, AVATAR_SIZE):  # -10 moves it further down
+            c.setFillColorRGB(0, 0, 0)
+            c.rect(margin_left, y - AVATAR_SIZE - 8, AVATAR_SIZE, AVATAR_SIZE, fill=1)
 
-    # Register fonts if provided
+    if user_id == 'U08B6KZJ4':
+        # here's a list of names, pick one
+        villain_names = ["Astaroth", "Nyx", "Zaxxon", "Voldymor", "Zoltron", "Zebulon", "Thorne", "Snidely", "Cruella", "Mojo", "Ratso", "Cruntolimeu", "Hexadreadcimal", "Viperina", "Jinque", "Zorton", "Malbeced", "Draco", "Scarabella", "Venomina", "Clawdia", "Grumbleton", "Slinko", "Druenna", "Morgul", "Tricksy", "Cankle", "Cackles", "Drusilda", "Dank Druid", "Fizzlewick", "Gloomsworth", "Malarkus", "Nefaria", "Zombina", "Snivelston", "Velsneer"]
+        # pick a random villain name
+        username = random.choice(villain_names)
+
+    # Draw username and timestamp
+    c.setFont(settings.bold_font_name, FONT_SIZE)
+    c.drawString(text_x, y - 8, f'{username} [{ts_human}]')
+
+    # Draw message text
+    text_y = y - 2.8 * FONT_SIZE
+    if lines:
+        text_y = draw_text_lines(c, lines, text_x, text_y, LINE_HEIGHT, font_size=FONT_SIZE)
+    # Draw file references (never wrapped or altered)
+    if file_names:
+        c.setFont(settings.normal_font_name, FONT_SIZE)
+        for name in file_names:
+            c.drawString(text_x, text_y, f'FILE: {name}')
+            text_y -= LINE_HEIGHT
+
+    # Optionally draw QR code for URLs
+    if urls:
+        qr_code_x = settings.page_width - settings.margin_right - AVATAR_SIZE
+        qr_code_y = y - 3
+        with PROFILER.phase('qr codes'):
+            for url in urls:
+                draw_qr_code(c, url, qr_code_x, qr_code_y, AVATAR_SIZE)
+                qr_code_y -= AVATAR_SIZE + 5  # Stack QR codes if multiple
+
+
+def render_messages(c, messages, plan, settings, user_map, avatars, pager):
+    """Render pass: draw every planned message at its precomputed page and position."""
+    current_page = -1
+    for slot in range(len(plan)):
+        if plan.page[slot] != current_page:
+            pager.new_page()
+            current_page = plan.page[slot]
+        msg = messages[plan.message_index[slot]]
+        draw_message(c, msg, plan.lines[slot], plan.file_names[slot], plan.urls[slot], plan.y[slot], settings, user_map, avatars)
+    if current_page == -1:
+        pager.new_page()
+
+
+# Font files behind the registered custom font names, part of segment cache keys
+_FONT_FILES = {}
+
+
+def register_fonts(normal_font_path=None, bold_font_path=None):
+    """Register the custom TTF fonts, if any, and return (normal_font_name, bold_font_name)."""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
     if normal_font_path:
         pdfmetrics.registerFont(TTFont('CustomNormal', normal_font_path))
         normal_font_name = 'CustomNormal'
+        _FONT_FILES[normal_font_name] = os.path.abspath(normal_font_path)
     else:
         normal_font_name = 'Helvetica'
 
     if bold_font_path:
         pdfmetrics.registerFont(TTFont('CustomBold', bold_font_path))
         bold_font_name = 'CustomBold'
+        _FONT_FILES[bold_font_name] = os.path.abspath(bold_font_path)
     else:
         bold_font_name = 'Helvetica-Bold'
+    return normal_font_name, bold_font_name
 
-    messages = load_json(messages_json_path)
-    users = load_json(users_file)
-
-    user_map = {user['id']: user['name'] for user in users}
 
+def output_pdf_path_for(messages_json_path, page_size_name, output_dir=None):
     # Use parent directory name of messages.json for output PDF name and channel name
     parent_dir = os.path.basename(os.path.dirname(os.path.abspath(messages_json_path)))
     output_pdf_name = f'slack_transcript_{parent_dir}_{page_size_name}.pdf'
-    channel_name = parent_dir
 
     # If output_dir is specified, use it for the output PDF path
     if output_dir:
         os.makedirs(output_dir, exist_ok=True)
-        output_pdf_path = os.path.join(output_dir, output_pdf_name)
-    else:
-        output_pdf_path = output_pdf_name
+        return os.path.join(output_dir, output_pdf_name)
+    return output_pdf_name
 
-    page_num = 1
-    c = canvas.Canvas(output_pdf_path, pagesize=page_size)
-    y = PAGE_HEIGHT - margin_top
-    logging.info(f'Generating PDF transcript: {output_pdf_path}')
-    for msg in messages:
-        if msg.get('type') != 'message':
-            continue
 
-        text = msg.get('text')
-        file_names = []
-        if msg.get('files'):
-            file_names = [f.get('name', 'unknown') for f in msg['files'] if isinstance(f, dict)]
-            # Ensure file names are ASCII only
-            file_names = [name.encode('ascii', errors='ignore').decode('ascii') for name in file_names]
-            logging.debug(f"Found file names: {file_names}")
-        # If no text, but files exist, show only file references
-        if (not text or not text.strip()) and file_names:
-            text = ''  # No main text, only files
-        elif not text or not text.strip():
-            continue
-        # If both text and files, keep text as is
-        # File references will be drawn separately
-
-        user_id = msg.get('user', 'unknown')
-        username = user_map.get(user_id, 'Unknown User')
-        ts_human = ts_to_human(msg.get('ts_human', 'Unknown Time'))
-        # Do NOT overwrite text here!
-
-        # Replace user mentions and URLs in main text only
-        logging.debug(f"Before URL replacement: {text}")
-        text = replace_user_mentions(text, user_map)
-        text = replace_urls_in_text(text)
-        logging.debug(f"After URL replacement: {text}")
-
-        # Estimate message height
-        text_x = margin_left + AVATAR_SIZE + 5
-        max_text_width = PAGE_WIDTH - margin_right - text_x
-        message_height = 25  # header and spacing
-        if text:
-            message_height += estimate_wrapped_text_height(c, text, max_text_width, LINE_HEIGHT, normal_font_name, FONT_SIZE)
-        if file_names:
-            message_height += len(file_names) * LINE_HEIGHT
-        message_height += 10  # bottom spacing
-
-        # Check for page break BEFORE drawing
-        if y - message_height < margin_bottom + FONT_SIZE * 2:
-            draw_page_number_and_channel(c, page_num, PAGE_WIDTH, margin_bottom, normal_font_name, FONT_SIZE, channel_name, PAGE_HEIGHT, margin_top)
-            c.showPage()
-            page_num += 1
-            y = PAGE_HEIGHT - margin_top
+def render_channel(messages_json_path, settings, page_size_name, users, user_map, avatars, output_dir=None, toc=None, segment_cache=None, volume_pages=None, volume_by=None):
+    """Lay out and render one channel's messages.json with already-loaded users, fonts and avatars."""
+    if segment_cache:
+        return render_channel_segmented(messages_json_path, settings, page_size_name, users, user_map, avatars, output_dir, toc, segment_cache)
+    if volume_pages or volume_by:
+        return render_channel_volumes(messages_json_path, settings, page_size_name, users, user_map, avatars, output_dir, toc, volume_pages, volume_by)
 
-        # Draw avatar
-        avatar_path = None
-        if user_id == "U08B6KZJ4":
-            # Hardcoded filenames for this user
-            hardcoded_files = [
-                os.path.join(avatars_dir, "U62S2LGFK.jpg"),
-                os.path.join(avatars_dir, "U08B6KZJ4.jpg"),
-                os.path.join(avatars_dir, "drunk_clown.jpg"),
-                os.path.join(avatars_dir, "U0FR0H27Q.jpg"),
-            ]
-            existing_files = [path for path in hardcoded_files if os.path.isfile(path)]
-            if existing_files:
-                avatar_path = random.choice(existing_files)
-        else:
-            for ext in ['.jpg', '.jpeg', '.png']:
-                path = os.path.join(avatars_dir, f'{user_id}{ext}')
-                if os.path.isfile(path):
-                    avatar_path = path
-                    break
-        if avatar_path:
-            try:
-                c.drawImage(avatar_path, margin_left, y - AVATAR_SIZE - 3, AVATAR_SIZE, AVATAR_SIZE, mask='auto')  # -10 moves it further down
-            except Exception:
-                c.setFillColorRGB(0, 0, 0)
-                c.rect(margin_left, y - AVATAR_SIZE - 8, AVATAR_SIZE, AVATAR_SIZE, fill=1)
-        else:
-            c.setFillColorRGB(0, 0, 0)
-            c.rect(margin_left, y - AVATAR_SIZE - 8, AVATAR_SIZE, AVATAR_SIZE, fill=1)
+    messages = load_json(messages_json_path)
+    channel_name = os.path.basename(os.path.dirname(os.path.abspath(messages_json_path)))
+    output_pdf_path = output_pdf_path_for(messages_json_path, page_size_name, output_dir)
+
+    # Layout pass: every page and position is known before drawing starts
+    plan = plan_messages(messages, user_map, settings, toc)
+    render_document(output_pdf_path, channel_name, messages, plan, settings, users, user_map, avatars, toc)
+    return output_pdf_path
+
+
+def new_canvas(target, page_width, page_height):
+    from reportlab import rl_config
+    from reportlab.pdfgen import canvas
+    # Plain Flate streams: smaller than ASCII85, and far cheaper for pypdf to decode when stitching segments
+    rl_config.useA85 = 0
+    return canvas.Canvas(target, pagesize=(page_width, page_height))
+
+
+def render_document(output_pdf_path, channel_name, messages, plan, settings, users, user_map, avatars, toc=None):
+    """Render pass: contents, planned messages, file index and user key, saved to output_pdf_path."""
+    PAGE_WIDTH, PAGE_HEIGHT = settings.page_width, settings.page_height
+    margin_bottom, margin_left = settings.margin_bottom, settings.margin_left
+    normal_font_name = settings.normal_font_name
+
+    all_files = sorted(plan.files)
+    key_users = participant_users(users, plan.participants)
+    toc_page_count = listing_page_count(len(plan.dates), PAGE_HEIGHT, margin_bottom, LINE_HEIGHT) if toc else 0
+    file_index_page_count = listing_page_count(len(all_files), PAGE_HEIGHT, margin_bottom, LINE_HEIGHT)
+    key_page_count = user_key_page_count(len(key_users), PAGE_HEIGHT, margin_left, AVATAR_SIZE)
+    page_count = toc_page_count + plan.page_count + file_index_page_count + key_page_count
+
+    c = new_canvas(output_pdf_path, PAGE_WIDTH, PAGE_HEIGHT)
+    pager = Pager(c, settings, channel_name, page_count)
+    logging.info(f'Generating PDF transcript: {output_pdf_path} ({page_count} pages)')
+    if toc:
+        toc_entries = [(label, toc_page_count + page + 1) for label, page in plan.dates.items()]
+        draw_toc_pages(c, toc_entries, PAGE_WIDTH, PAGE_HEIGHT, margin_left, margin_bottom, LINE_HEIGHT, normal_font_name, pager.new_page)
+    render_messages(c, messages, plan, settings, user_map, avatars, pager)
 
-        if user_id == 'U08B6KZJ4':
-            # here's a list of names, pick one
-            villain_names = ["Astaroth", "Nyx", "Zaxxon", "Voldymor", "Zoltron", "Zebulon", "Thorne", "Snidely", "Cruella", "Mojo", "Ratso", "Cruntolimeu", "Hexadreadcimal", "Viperina", "Jinque", "Zorton", "Malbeced", "Draco", "Scarabella", "Venomina", "Clawdia", "Grumbleton", "Slinko", "Druenna", "Morgul", "Tricksy", "Cankle", "Cackles", "Drusilda", "Dank Druid", "Fizzlewick", "Gloomsworth", "Malarkus", "Nefaria", "Zombina", "Snivelston", "Velsneer"]
-            # pick a random villain name
-            username = random.choice(villain_names)
+    # Draw the file index page
+    if all_files:
+        draw_file_index_page(c, all_files, PAGE_WIDTH, PAGE_HEIGHT, margin_left, margin_bottom, LINE_HEIGHT, normal_font_name, pager.new_page)
 
-        # Draw username and timestamp
-        c.setFont(bold_font_name, FONT_SIZE)
-        c.drawString(margin_left + AVATAR_SIZE + 5, y - 8, f'{username} [{ts_human}]')
+    # Draw user key page
+    draw_user_key_page(c, key_users, avatars, PAGE_WIDTH, PAGE_HEIGHT, margin_left, AVATAR_SIZE, LINE_HEIGHT, normal_font_name, pager.new_page)
+    pager.finish_page()
+
+    with PROFILER.phase('save'):
+        c.save()
+    logging.info(f'PDF transcript generated: {output_pdf_path}')
 
-        # Draw message text
-        c.setFont(normal_font_name, FONT_SIZE)
-        text_y = y - 2.8 * FONT_SIZE
-        if text:
-            text_y = draw_wrapped_text(c, text, text_x, text_y, max_text_width, LINE_HEIGHT, font_name=normal_font_name, font_size=FONT_SIZE)
-        # Draw file references (never wrapped or altered)
-        if file_names:
-            for name in file_names:
-                c.drawString(text_x, text_y, f'FILE: {name}')
-                text_y -= LINE_HEIGHT
-
-        # Optionally draw QR code for URLs
-        url_pattern = re.compile(r'(https?://\S+)')
-        urls = url_pattern.findall(text)
-        if urls:
-            qr_code_size = AVATAR_SIZE
-            qr_code_x = PAGE_WIDTH - margin_right - qr_code_size
-            qr_code_y = y - AVATAR_SIZE
-            for url in urls:
-                draw_qr_code(c, url, qr_code_x, qr_code_y, qr_code_size)
-                qr_code_y -= qr_code_size + 5  # Stack QR codes if multiple
 
-        # Update y position for next message
-        y = text_y - 10
+# Leading whitespace and separators between array elements
+_JSON_SEPARATORS = re.compile(r'[\s,]*')
 
-    # Draw file index page
-    draw_page_number_and_channel(c, page_num, PAGE_WIDTH, margin_bottom, normal_font_name, FONT_SIZE, channel_name, PAGE_HEIGHT, margin_top)
-    
-    # Collect all file names from messages
-    all_files = []
+
+def iter_json_array(path, chunk_size=1 << 20):
+    """Yield the elements of a top-level JSON array file one at a time, without loading the whole file."""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f'{path} does not contain a JSON array')
+        pos = 1
+        eof = False
+        while True:
+            pos = _JSON_SEPARATORS.match(buffer, pos).end()
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            try:
+                if pos >= len(buffer):
+                    raise json.JSONDecodeError('Need more data', buffer, pos)
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield item
+
+
+def render_channel_volumes(messages_json_path, settings, page_size_name, users, user_map, avatars, output_dir=None, toc=None, volume_pages=None, volume_by=None):
+    """Stream a channel into volume PDFs of at most volume_pages message pages, or one per volume_by period.
+
+    Messages are read incrementally and each volume is rendered and saved as soon
+    as it is complete, so memory stays bounded by the size of one volume.
+    """
+    channel_name = os.path.basename(os.path.dirname(os.path.abspath(messages_json_path)))
+    base_path, ext = os.path.splitext(output_pdf_path_for(messages_json_path, page_size_name, output_dir))
+    volume_paths = []
+
+    def flush(volume_messages, planner):
+        output_pdf_path = f'{base_path}_vol{len(volume_paths) + 1:03d}{ext}'
+        render_document(output_pdf_path, f'{channel_name} ({len(volume_paths) + 1})', volume_messages, planner.finish(), settings, users, user_map, avatars, toc)
+        volume_paths.append(output_pdf_path)
+
+    volume_messages = []
+    planner = MessagePlanner(user_map, settings, toc)
+    period = None
+    for msg in iter_json_array(messages_json_path):
+        laid_out = planner.measure(msg)
+        if laid_out is None:
+            continue
+        msg_period = date_label(msg, volume_by) if volume_by else None
+        starts_volume = volume_messages and (
+            (volume_by and msg_period != period) or
+            (volume_pages and planner.next_page(laid_out) >= volume_pages)
+        )
+        if starts_volume:
+            flush(volume_messages, planner)
+            volume_messages = []
+            planner = MessagePlanner(user_map, settings, toc)
+        period = msg_period
+        planner.place(len(volume_messages), msg, laid_out)
+        volume_messages.append(msg)
+    if volume_messages or not volume_paths:
+        flush(volume_messages, planner)
+    logging.info(f'{channel_name}: wrote {len(volume_paths)} volumes')
+    return volume_paths
+
+
+# Bump when the cached segment PDFs or metadata change shape
+SEGMENT_FORMAT = 4
+# Digest of the inputs of the last stitched PDF, kept in each channel's cache directory
+STITCH_FILE = 'stitched.json'
+
+
+def month_segments(messages):
+    """Group chronologically ordered messages into consecutive (month, messages) segments."""
+    segments = []
     for msg in messages:
-        if msg.get('type') == 'message' and msg.get('files'):
-            for f in msg.get('files', []):
-                if isinstance(f, dict) and f.get('name'):
-                    file_name = f.get('name', '').encode('ascii', errors='ignore').decode('ascii')
-                    if file_name and file_name not in all_files:
-                        all_files.append(file_name)
-    
-    # Sort files alphabetically
-    all_files.sort()
-    
-    # Draw the file index page
-    if all_files:
-        draw_file_index_page(c, all_files, PAGE_WIDTH, PAGE_HEIGHT, margin_left, margin_bottom, LINE_HEIGHT, normal_font_name)
-        page_num += 1
-    
-    # Draw user key page
-    draw_page_number_and_channel(c, page_num, PAGE_WIDTH, margin_bottom, normal_font_name, FONT_SIZE, channel_name, PAGE_HEIGHT, margin_top)
-    draw_user_key_page(c, users, avatars_dir, PAGE_WIDTH, PAGE_HEIGHT, margin_left, AVATAR_SIZE, LINE_HEIGHT, normal_font_name)
+        month = date_label(msg, 'month')
+        if not segments or segments[-1][0] != month:
+            segments.append((month, []))
+        segments[-1][1].append(msg)
+    return segments
+
+
+def participant_users(users, participants):
+    """Users from users.json who took part in the transcript, in users.json order."""
+    return [user for user in users if user.get('id') in participants]
+
 
+def segment_user_names(messages, user_map):
+    """The user_map entries a segment shows: its authors and the users it mentions."""
+    user_ids = set()
+    for msg in messages:
+        user_ids.add(msg.get('user', 'unknown'))
+        for m in MRKDWN_PATTERN.finditer(msg.get('text') or ''):
+            if m.group('user'):
+                user_ids.add(m.group('user'))
+    return sorted((user_id, user_map.get(user_id)) for user_id in user_ids)
+
+
+def render_options_digest(settings, page_size_name, avatars, toc):
+    """Digest of everything besides the messages and their users that affects how a segment renders."""
+    options = {
+        'format': SEGMENT_FORMAT,
+        'settings': list(settings),
+        'page_size': page_size_name,
+        'fonts': [_FONT_FILES.get(settings.normal_font_name), _FONT_FILES.get(settings.bold_font_name)],
+        'avatars': avatars.fingerprint(),
+        'toc': toc,
+    }
+    return hashlib.sha256(json.dumps(options, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def render_segment(pdf_path, messages, settings, user_map, avatars, toc=None):
+    """Render one segment's message pages, unnumbered, and return its metadata."""
+    plan = plan_messages(messages, user_map, settings, toc)
+    meta = {
+        'page_count': plan.page_count if len(plan) else 0,
+        'dates': plan.dates,
+        'files': sorted(plan.files),
+        'participants': sorted(plan.participants),
+    }
+    if len(plan):
+        temp_path = pdf_path + '.tmp'
+        c = new_canvas(temp_path, settings.page_width, settings.page_height)
+        pager = Pager(c, settings, None, None, stamp=False)
+        render_messages(c, messages, plan, settings, user_map, avatars, pager)
+        pager.finish_page()
+        with PROFILER.phase('save'):
+            c.save()
+        os.replace(temp_path, pdf_path)
+    return meta
+
+
+def render_pages_to_memory(settings, draw):
+    """Run draw(c, new_page) on a fresh unstamped canvas and return the PDF bytes."""
+    buffer = io.BytesIO()
+    c = new_canvas(buffer, settings.page_width, settings.page_height)
+    pager = Pager(c, settings, None, None, stamp=False)
+    draw(c, pager.new_page)
+    pager.finish_page()
     c.save()
-    logging.info(f'PDF transcript generated: {output_pdf_path}')
+    return buffer.getvalue()
+
+
+def stamp_pages(writer, stamps):
+    """Add each stamp page's content on top of the matching page of writer.
+
+    Cheaper than pypdf's merge_page, which parses and rewrites every page's
+    content: the stamp's content stream is appended to the page's /Contents
+    and its fonts are added to the page's resources under names of their own.
+    """
+    from pypdf.generic import ArrayObject, DictionaryObject, NameObject
+    fonts = {}
+    for page, stamp in zip(writer.pages, stamps):
+        contents = stamp.raw_get('/Contents').clone(writer)
+        stream = contents.get_object()
+        data = stream.get_data()
+        resources = page['/Resources']
+        if '/Font' not in resources:
+            resources[NameObject('/Font')] = DictionaryObject()
+        page_fonts = resources['/Font']
+        for name, font in stamp['/Resources']['/Font'].items():
+            stamp_name = NameObject(f'/Stamp{name[1:]}')
+            if font.idnum not in fonts:
+                fonts[font.idnum] = font.clone(writer)
+            page_fonts[stamp_name] = fonts[font.idnum]
+            data = data.replace(f'{name} '.encode('latin-1'), f'{stamp_name} '.encode('latin-1'))
+        stream.set_data(data)
+        page_contents = page.raw_get('/Contents')
+        if isinstance(page_contents.get_object(), ArrayObject):
+            page[NameObject('/Contents')] = ArrayObject([*page_contents.get_object(), contents])
+        else:
+            page[NameObject('/Contents')] = ArrayObject([page_contents, contents])
 
 
-if __name__ == '__main__':
+def render_channel_segmented(messages_json_path, settings, page_size_name, users, user_map, avatars, output_dir=None, toc=None, cache_dir='.slack2pdf_cache'):
+    """Render a channel from cached per-month segments, re-rendering only segments whose input changed.
+
+    Each segment is keyed by a hash of its messages and the render options. The
+    final PDF is stitched from the segment PDFs with fresh front and back
+    matter, then every page is stamped with its final number.
+    """
+    try:
+        import pypdf
+    except ImportError:
+        raise RuntimeError('Segment caching requires pypdf (pip install pypdf)')
+    PAGE_WIDTH, PAGE_HEIGHT = settings.page_width, settings.page_height
+    margin_bottom, margin_left = settings.margin_bottom, settings.margin_left
+    normal_font_name = settings.normal_font_name
+
+    messages = load_json(messages_json_path)
+    channel_name = os.path.basename(os.path.dirname(os.path.abspath(messages_json_path)))
+    output_pdf_path = output_pdf_path_for(messages_json_path, page_size_name, output_dir)
+    channel_cache = os.path.join(cache_dir, f'{channel_name}_{page_size_name}')
+    os.makedirs(channel_cache, exist_ok=True)
+    options_digest = render_options_digest(settings, page_size_name, avatars, toc)
+
+    segments = []
+    used = set()
+    rendered = 0
+    for month, segment in month_segments(messages):
+        segment_digest = hashlib.sha256(options_digest.encode('utf-8'))
+        segment_digest.update(json.dumps(segment, sort_keys=True).encode('utf-8'))
+        # Only the names this segment shows, so users.json changes elsewhere keep it cached
+        segment_digest.update(json.dumps(segment_user_names(segment, user_map)).encode('utf-8'))
+        key = f'{month}_{segment_digest.hexdigest()[:24]}'
+        pdf_path = os.path.join(channel_cache, f'{key}.pdf')
+        meta_path = os.path.join(channel_cache, f'{key}.json')
+        meta = load_json(meta_path) if os.path.exists(meta_path) else None
+        if meta is None or (meta['page_count'] and not os.path.exists(pdf_path)):
+            meta = render_segment(pdf_path, segment, settings, user_map, avatars, toc)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            rendered += 1
+        used.update((f'{key}.pdf', f'{key}.json'))
+        segments.append((pdf_path, meta))
+    # Drop segments that no longer match any month of the channel
+    used.add(STITCH_FILE)
+    for name in os.listdir(channel_cache):
+        if name not in used:
+            os.remove(os.path.join(channel_cache, name))
+    logging.info(f'{channel_name}: rendered {rendered} of {len(segments)} segments, reused the rest from {channel_cache}')
+
+    all_files = sorted(set().union(*(meta['files'] for _, meta in segments)))
+    key_users = participant_users(users, set().union(*(meta['participants'] for _, meta in segments)))
+    # The stitched PDF depends only on the segments and the users in the user key
+    stitch_digest = hashlib.sha256(json.dumps([options_digest, sorted(used), key_users, output_pdf_path], sort_keys=True).encode('utf-8')).hexdigest()
+    stitch_path = os.path.join(channel_cache, STITCH_FILE)
+    if os.path.exists(output_pdf_path) and os.path.exists(stitch_path) and load_json(stitch_path).get('digest') == stitch_digest:
+        logging.info(f'PDF transcript unchanged: {output_pdf_path}')
+        return output_pdf_path
+    toc_entries = []
+    if toc:
+        toc_page_count = listing_page_count(sum(len(meta['dates']) for _, meta in segments), PAGE_HEIGHT, margin_bottom, LINE_HEIGHT)
+        page_offset = toc_page_count
+        for _, meta in segments:
+            for label, page in meta['dates'].items():
+                if not toc_entries or toc_entries[-1][0] != label:
+                    toc_entries.append((label, page_offset + page + 1))
+            page_offset += meta['page_count']
+
+    def draw_back_matter(c, new_page):
+        if all_files:
+            draw_file_index_page(c, all_files, PAGE_WIDTH, PAGE_HEIGHT, margin_left, margin_bottom, LINE_HEIGHT, normal_font_name, new_page)
+        draw_user_key_page(c, key_users, avatars, PAGE_WIDTH, PAGE_HEIGHT, margin_left, AVATAR_SIZE, LINE_HEIGHT, normal_font_name, new_page)
+
+    writer = pypdf.PdfWriter()
+    if toc_entries:
+        def draw_front_matter(c, new_page):
+            draw_toc_pages(c, toc_entries, PAGE_WIDTH, PAGE_HEIGHT, margin_left, margin_bottom, LINE_HEIGHT, normal_font_name, new_page)
+        writer.append(io.BytesIO(render_pages_to_memory(settings, draw_front_matter)))
+    for pdf_path, meta in segments:
+        if meta['page_count']:
+            writer.append(pdf_path)
+    writer.append(io.BytesIO(render_pages_to_memory(settings, draw_back_matter)))
+
+    # Fix up page numbers: stamp every stitched page with its final "X of Y"
+    page_count = len(writer.pages)
+    stamps = io.BytesIO()
+    c = new_canvas(stamps, PAGE_WIDTH, PAGE_HEIGHT)
+    for page_num in range(1, page_count + 1):
+        draw_page_number_and_channel(c, page_num, PAGE_WIDTH, margin_bottom, normal_font_name, FONT_SIZE, channel_name, PAGE_HEIGHT, settings.margin_top, page_count)
+        c.showPage()
+    c.save()
+    stamp_pages(writer, pypdf.PdfReader(stamps).pages)
+    # Avatars and QR forms are embedded once per segment; share identical copies
+    writer.compress_identical_objects()
+    with PROFILER.phase('save'), open(output_pdf_path, 'wb') as f:
+        writer.write(f)
+    with open(stitch_path, 'w', encoding='utf-8') as f:
+        json.dump({'digest': stitch_digest}, f)
+    logging.info(f'PDF transcript generated: {output_pdf_path} ({page_count} pages)')
+    return output_pdf_path
+
+
+def main(messages_json_path, page_size_name='letter', normal_font_path=None, bold_font_path=None, margin_top=inch, margin_bottom=inch, margin_left=inch, margin_right=inch, output_dir=None, toc=None, segment_cache=None, volume_pages=None, volume_by=None):
+    PAGE_WIDTH, PAGE_HEIGHT = parse_page_size(page_size_name)
+    normal_font_name, bold_font_name = register_fonts(normal_font_path, bold_font_path)
+    settings = PageSettings(PAGE_WIDTH, PAGE_HEIGHT, margin_top, margin_bottom, margin_left, margin_right, normal_font_name, bold_font_name)
+
+    users = load_json(users_file)
+    user_map = {user['id']: user['name'] for user in users}
+    avatars = AvatarRegistry(avatars_dir)
+
+    render_channel(messages_json_path, settings, page_size_name, users, user_map, avatars, output_dir, toc, segment_cache, volume_pages, volume_by)
+
+
+def find_messages_files(root_dir):
+    """Return every messages.json under root_dir, largest first."""
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        if 'messages.json' in filenames:
+            paths.append(os.path.join(dirpath, 'messages.json'))
+    # Start the biggest channels first so one giant channel doesn't become the tail
+    paths.sort(key=os.path.getsize, reverse=True)
+    return paths
+
+
+# Per-process resources for batch mode, loaded once by _init_batch_worker
+_batch_job = None
+
+
+def _init_batch_worker(users, page_size_name, normal_font_path, bold_font_path, margins, render_options):
+    global _batch_job
+    page_width, page_height = parse_page_size(page_size_name)
+    normal_font_name, bold_font_name = register_fonts(normal_font_path, bold_font_path)
+    settings = PageSettings(page_width, page_height, *margins, normal_font_name, bold_font_name)
+    user_map = {user['id']: user['name'] for user in users}
+    _batch_job = ((settings, page_size_name, users, user_map, AvatarRegistry(avatars_dir)), render_options)
+
+
+def _render_batch_channel(messages_json_path):
+    resources, render_options = _batch_job
+    return render_channel(messages_json_path, *resources, **render_options)
+
+
+def main_batch(root_dir, page_size_name='letter', normal_font_path=None, bold_font_path=None, margin_top=inch, margin_bottom=inch, margin_left=inch, margin_right=inch, jobs=None, **render_options):
+    """Render every messages.json under root_dir in a process pool sized to the cores.
+
+    render_options are passed through to render_channel (output_dir, toc, segment_cache, ...).
+    """
+    paths = find_messages_files(root_dir)
+    if not paths:
+        logging.warning(f'No messages.json files found under {root_dir}')
+        return
+    users = load_json(users_file)
+    jobs = min(jobs or os.cpu_count() or 1, len(paths))
+    logging.info(f'Rendering {len(paths)} channels with {jobs} worker processes')
+
+    margins = (margin_top, margin_bottom, margin_left, margin_right)
+    init_args = (users, page_size_name, normal_font_path, bold_font_path, margins, render_options)
+    failed = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=_init_batch_worker, initargs=init_args) as executor:
+        # Submitted largest first; the pool hands them out in that order
+        futures = {executor.submit(_render_batch_channel, path): path for path in paths}
+        for future in concurrent.futures.as_completed(futures):
+            path = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                logging.error(f'Failed to render {path}: {e}')
+                failed.append(path)
+    logging.info(f'Batch finished: {len(paths) - len(failed)} rendered, {len(failed)} failed')
+    return failed
+
+
+def cli(argv=None, prog=None):
     import argparse
-    parser = argparse.ArgumentParser(description='Generate Slack messages PDF transcript.')
+    parser = argparse.ArgumentParser(prog=prog, description='Generate Slack messages PDF transcript.')
     parser.add_argument('messages_json', nargs='?', default=messages_file, help='Path to messages.json file')
     parser.add_argument('--page-size', default='A4', help='Page size for PDF output (e.g. A4, LETTER, or custom WxH in inches, e.g. 6x9)')
     parser.add_argument('--normal-font', help='Path to TTF file for normal font')
@@ -479,6 +1271,33 @@ if __name__ == '__main__':
     parser.add_argument('--margin-left', type=float, default=1.0, help='Left margin in inches')
     parser.add_argument('--margin-right', type=float, default=1.0, help='Right margin in inches')
     parser.add_argument('--output-dir', help='Directory to save the output PDF')
-    args = parser.parse_args()
+    parser.add_argument('--toc', choices=['day', 'month'], help='Add a table of contents with an entry per day or month')
+    parser.add_argument('--segment-cache', metavar='DIR', help='Cache rendered month segments in DIR and re-render only changed months (requires pypdf)')
+    parser.add_argument('--volume-pages', type=int, metavar='N', help='Stream the channel into volumes of at most N message pages each')
+    parser.add_argument('--volume-by', choices=['year', 'month'], help='Stream the channel into one volume per year or month')
+    parser.add_argument('--profile', action='store_true', help='Report time and peak memory per rendering phase')
+    parser.add_argument('--profile-output', metavar='FILE', help='Also write the --profile report to FILE as JSON')
+    parser.add_argument('--batch', metavar='ROOT', help='Render every messages.json found under ROOT in parallel')
+    parser.add_argument('--jobs', type=int, help='Worker processes for --batch (default: number of cores)')
+    args = parser.parse_args(argv)
+    if args.segment_cache and (args.volume_pages or args.volume_by):
+        parser.error('--segment-cache cannot be combined with --volume-pages or --volume-by')
+    if (args.profile or args.profile_output) and args.batch:
+        parser.error('--profile profiles a single channel and cannot be combined with --batch')
+    if args.profile or args.profile_output:
+        PROFILER.start()
+
+    render_options = dict(output_dir=args.output_dir, toc=args.toc, segment_cache=args.segment_cache, volume_pages=args.volume_pages, volume_by=args.volume_by)
+    if args.batch:
+        failed = main_batch(args.batch, args.page_size, args.normal_font, args.bold_font, args.margin_top * inch, args.margin_bottom * inch, args.margin_left * inch, args.margin_right * inch, args.jobs, **render_options)
+        return 1 if failed else 0
+    main(args.messages_json, args.page_size, args.normal_font, args.bold_font, args.margin_top * inch, args.margin_bottom * inch, args.margin_left * inch, args.margin_right * inch, **render_options)
+    if PROFILER.enabled:
+        report = PROFILER.log_report()
+        if args.profile_output:
+            with open(args.profile_output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+
 
-    main(args.messages_json, args.page_size, args.normal_font, args.bold_font, args.margin_top * inch, args.margin_bottom * inch, args.margin_left * inch, args.margin_right * inch, args.output_dir)
+if __name__ == '__main__':
+    sys.exit(cli())
@@ -4,79 +4,123 @@ import time
 import json
 import requests
 from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timezone
 import sys
-import ssl
-import urllib.error
 import argparse
+import statistics
+import hashlib
+import heapq
+from retry_policy import ApiBudget, RetryPolicy
+from api_cache import RECORD, REPLAY, ApiCache
+import queue
+import threading
 
 
-# ensure logging is configured once, before any logging calls
-logging.basicConfig(
-    level=logging.INFO,
-    format="[%(asctime)s] %(levelname)s: %(message)s",
-    handlers=[logging.StreamHandler(sys.stdout)],
-    force=True,  # Python 3.8+ ensures reconfiguration
-)
+def build_parser(prog=None):
+    # command line args (add --root-dir, --dry-run, --skip-users)
+    parser = argparse.ArgumentParser(prog=prog, description="SlackExporterForOmata")
+    parser.add_argument("--output-dir", help="Directory where export data will be saved", default=os.getcwd())
+    parser.add_argument("--export-config", help="Path to export_config.json", default=None)
+    parser.add_argument("--dry-run", action="store_true", help="Fetch and log but don't write messages (files still downloaded).")
+    parser.add_argument("--skip-users", action="store_true", help="Skip fetching users and avatars.")
+    parser.add_argument("--root-dir", help="Root directory for the export", default=os.getcwd())
+    parser.add_argument("--messages-only", action="store_true", help="Only export messages, skip files and other data.")
+    parser.add_argument("--exclude-archived", action="store_true", help="Skip archived channels when discovering the bot's channels.")
+    parser.add_argument("--max-retries", type=int, default=10, help="Attempts per Slack call on transient errors before giving up (default: 10).")
+    parser.add_argument("--call-deadline", type=float, default=900, help="Seconds a single Slack call may spend retrying (default: 900).")
+    parser.add_argument("--channel-deadline", type=float, default=None, help="Seconds a channel may spend backing off from errors before its calls give up (default: no limit).")
+    parser.add_argument("--no-deltas", action="store_true", help="Don't write a delta bundle for this run under deltas/.")
+    parser.add_argument("--watch", action="store_true", help="Keep running and poll channels by recent activity instead of exporting once.")
+    parser.add_argument("--min-interval", type=float, default=180, help="Watch mode: shortest time between polls of a busy channel, in seconds (default: 180).")
+    parser.add_argument("--max-interval", type=float, default=4 * 3600, help="Watch mode: longest time between polls of a dormant channel, in seconds (default: 14400).")
+    parser.add_argument("--api-budget", type=float, default=40, help="Watch mode: Slack calls allowed per minute across all channels (default: 40).")
+    parser.add_argument("--channel-refresh", type=float, default=3600, help="Watch mode: seconds between refreshes of the channel list (default: 3600).")
+    parser.add_argument("--delta-interval", type=float, default=3600, help="Watch mode: seconds covered by each delta bundle (default: 3600).")
+    parser.add_argument("--reconcile-days", type=float, default=0, help="Re-fetch the last N days of each backfilled channel to pick up edits, deletions and reactions (default: off).")
+    parser.add_argument("--repair", action="store_true", help="Scan backfilled channels for gaps in their history and re-fetch only those windows.")
+    parser.add_argument("--gap-factor", type=float, default=50, help="Repair: a gap is suspicious when longer than this many times the channel's median gap (default: 50).")
+    parser.add_argument("--min-gap-hours", type=float, default=24, help="Repair: ignore gaps shorter than this many hours (default: 24).")
+    parser.add_argument("--max-repair-windows", type=int, default=25, help="Repair: most windows to re-fetch per channel per run (default: 25).")
+    parser.add_argument("--projection", choices=["full", "standard", "lean"], default="full", help="Fields kept in messages.json: full (as returned by Slack), standard (no blocks or user_profile, trimmed file objects) or lean (core fields only, compact JSON). Raw payloads go to <channel>/raw/ unless full.")
+    parser.add_argument("--redownload-list", help="Re-download the files listed in a redownload.json written by verify_files.py, then exit.")
+    parser.add_argument("--record-api", metavar="DIR", help="Save every conversations/users API response under DIR so the run can be replayed.")
+    parser.add_argument("--replay-api", metavar="DIR", help="Serve API responses from a --record-api directory instead of calling Slack. Files and avatars are not downloaded.")
+    parser.add_argument("--download-workers", type=int, default=4, help="Threads downloading files while history is fetched (default: 4).")
+    return parser
 
-# parse command line args (add --root-dir, --dry-run, --skip-users)
-parser = argparse.ArgumentParser(description="SlackExporterForOmata")
-parser.add_argument("--output-dir", help="Directory where export data will be saved", default=os.getcwd())
-parser.add_argument("--export-config", help="Path to export_config.json", default=None)
-parser.add_argument("--dry-run", action="store_true", help="Fetch and log but don't write messages (files still downloaded).")
-parser.add_argument("--skip-users", action="store_true", help="Skip fetching users and avatars.")
-parser.add_argument("--root-dir", help="Root directory for the export", default=os.getcwd())
-parser.add_argument("--messages-only", action="store_true", help="Only export messages, skip files and other data.")
-args = parser.parse_args()
-
-# Use new arguments
-ROOT_DIR = os.path.abspath(args.root_dir)
-EXPORT_CONFIG_PATH = args.export_config
-DRY_RUN = args.dry_run
-SKIP_USERS = args.skip_users
-os.makedirs(ROOT_DIR, exist_ok=True)
+# Module state, set by configure(). Importing this module has no side effects;
+# call configure() (or cli()) before using the functions that talk to Slack or write the archive.
+args = None
+ROOT_DIR = os.getcwd()
+EXPORT_CONFIG_PATH = None
+DRY_RUN = False
+SKIP_USERS = False
+PROJECTION = "full"
+CHECKPOINT_FILE = None
+SLACK_BOT_TOKEN = None
+client = None
+RETRY_POLICY = RetryPolicy()
+# download_file writes into <prefix>XXXX<suffix> and renames it; verify_files.py matches the same pattern
+DOWNLOAD_TEMP_PREFIX = ".part-"
+DOWNLOAD_TEMP_SUFFIX = ".part"
 
-def out_path(*parts):
-    """Return an absolute path under the configured ROOT_DIR."""
-    return os.path.join(ROOT_DIR, *parts)
+def configure(argv=None, prog=None):
+    """Parse the command line (sys.argv when argv is None) and set up logging, the output directory, the Slack client and the retry policy."""
+    global args, ROOT_DIR, EXPORT_CONFIG_PATH, DRY_RUN, SKIP_USERS, PROJECTION, CHECKPOINT_FILE, SLACK_BOT_TOKEN, client, RETRY_POLICY
+    # ensure logging is configured once, before any logging calls
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[%(asctime)s] %(levelname)s: %(message)s",
+        handlers=[logging.StreamHandler(sys.stdout)],
+        force=True,  # Python 3.8+ ensures reconfiguration
+    )
+    parser = build_parser(prog)
+    args = parser.parse_args(argv)
+    if args.record_api and args.replay_api:
+        parser.error("--record-api and --replay-api can't be used together")
+    if args.replay_api and args.watch:
+        parser.error("--replay-api can't be used with --watch")
+    if args.replay_api:
+        # Replays rebuild the message archive without touching the network
+        args.messages_only = True
 
-# global checkpoint file placed under ROOT_DIR
-CHECKPOINT_FILE = out_path("exported_channels.json")
+    ROOT_DIR = os.path.abspath(args.root_dir)
+    EXPORT_CONFIG_PATH = args.export_config
+    DRY_RUN = args.dry_run
+    SKIP_USERS = args.skip_users
+    PROJECTION = args.projection
+    os.makedirs(ROOT_DIR, exist_ok=True)
+    # global checkpoint file placed under ROOT_DIR
+    CHECKPOINT_FILE = out_path("exported_channels.json")
 
-# Load environment variables from .env
-load_dotenv()
-SLACK_BOT_TOKEN = os.getenv('SLACK_BOT_TOKEN')
+    # Load environment variables from .env
+    load_dotenv()
+    SLACK_BOT_TOKEN = os.getenv('SLACK_BOT_TOKEN')
+    client = WebClient(token=SLACK_BOT_TOKEN)
 
-client = WebClient(token=SLACK_BOT_TOKEN)
+    # Calls that give up (permanent errors, exhausted retries, deadlines) are recorded in api_errors.json
+    RETRY_POLICY = RetryPolicy(
+        max_attempts=args.max_retries,
+        call_deadline=args.call_deadline,
+        channel_deadline=args.channel_deadline,
+        errors_path=out_path("api_errors.json"),
+        cache=ApiCache(args.record_api, RECORD) if args.record_api else ApiCache(args.replay_api, REPLAY) if args.replay_api else None,
+    )
+    return args
+
+def out_path(*parts):
+    """Return an absolute path under the configured ROOT_DIR."""
+    return os.path.join(ROOT_DIR, *parts)
 
 def robust_api_call(api_func, *args, **kwargs):
     method_name = api_func.__name__
     channel_id = kwargs.get('channel') or (args[0] if args else None)
-    retry_count = 0
-    while True:
-        try:
-            logging.info(f"Calling {method_name} for channel: {channel_id if channel_id else ''}")
-            result = api_func(*args, **kwargs)
-            logging.info(f"Success: {method_name} for channel: {channel_id if channel_id else ''}")
-            return result
-        except SlackApiError as e:
-            if e.response['error'] == 'ratelimited':
-                retry_after = int(e.response.headers.get('Retry-After', 30))
-                logging.warning(f"Rate limited on {method_name} for channel: {channel_id if channel_id else ''}. Sleeping for {retry_after} seconds...")
-                time.sleep(retry_after)
-            else:
-                logging.error(f"Slack API error in {method_name} for channel: {channel_id if channel_id else ''}: {e}")
-                return None
-        except (ssl.SSLEOFError, urllib.error.URLError, requests.exceptions.RequestException) as net_err:
-            retry_count += 1
-            wait_time = min(60, 5 * retry_count)
-            logging.error(f"Network error in {method_name} for channel: {channel_id if channel_id else ''}: {net_err}. Retrying in {wait_time} seconds...")
-            time.sleep(wait_time)
-        except Exception as ex:
-            logging.error(f"Unexpected error in {method_name} for channel: {channel_id if channel_id else ''}: {ex}")
-            return None
+    logging.info(f"Calling {method_name} for channel: {channel_id if channel_id else ''}")
+    result = RETRY_POLICY.call(api_func, *args, **kwargs)
+    if result is not None:
+        logging.info(f"Success: {method_name} for channel: {channel_id if channel_id else ''}")
+    return result
 
 def list_channels():
     channels = []
@@ -91,6 +135,36 @@ def list_channels():
             break
     return channels
 
+# users.conversations results for this run, keyed by exclude_archived
+_member_channels_cache = {}
+
+def list_member_channels(exclude_archived=False):
+    """Return the public and private channels the bot belongs to.
+
+    Pages through users.conversations, which only returns the bot's own
+    memberships, instead of every channel in the workspace. Results are
+    cached for the rest of the run. Returns None, and caches nothing, if
+    paging stopped on an error, so a partial listing is never mistaken for
+    the full one.
+    """
+    if exclude_archived in _member_channels_cache:
+        return _member_channels_cache[exclude_archived]
+    channels = []
+    cursor = None
+    while True:
+        response = robust_api_call(client.users_conversations, types="public_channel,private_channel", exclude_archived=exclude_archived, limit=1000, cursor=cursor)
+        if not response:
+            logging.warning(f"Listing the bot's channels stopped early after {len(channels)} channels.")
+            return None
+        for channel in response['channels']:
+            channel.setdefault('is_member', True)
+        channels.extend(response['channels'])
+        cursor = response.get('response_metadata', {}).get('next_cursor')
+        if not cursor:
+            break
+    _member_channels_cache[exclude_archived] = channels
+    return channels
+
 def fetch_messages(channel_id, limit=10):
     response = robust_api_call(client.conversations_history, channel=channel_id, limit=limit)
     if response:
@@ -110,11 +184,13 @@ def fetch_all_users():
             break
     return users
 
-def save_users_and_avatars(users, output_dir="avatars"):
+def save_users_and_avatars(users, output_dir="avatars", download_avatars=True):
     avatar_root = out_path(output_dir)
     os.makedirs(avatar_root, exist_ok=True)
     with open(out_path("users.json"), "w") as f:
         json.dump(users, f, indent=2)
+    if not download_avatars:
+        return
     for user in users:
         profile = user.get('profile', {})
         image_url = profile.get('image_512') or profile.get('image_192')
@@ -128,6 +204,83 @@ def save_users_and_avatars(users, output_dir="avatars"):
             except Exception as e:
                 logging.error(f"Failed to download avatar for {user['id']}: {e}")
 
+# --projection profiles, narrowest first, and the fields the narrower two keep
+PROJECTIONS = ('lean', 'standard', 'full')
+STANDARD_DROPPED_FIELDS = ('blocks', 'user_profile')
+LEAN_MESSAGE_FIELDS = (
+    'type', 'subtype', 'ts', 'ts_human', 'user', 'bot_id', 'username', 'text', 'thread_ts', 'parent_user_id',
+    'reply_count', 'reply_users_count', 'latest_reply', 'edited', 'reactions', 'files',
+)
+PROJECTED_FILE_FIELDS = {
+    'standard': (
+        'id', 'name', 'title', 'mimetype', 'filetype', 'pretty_type', 'user', 'size', 'created', 'timestamp', 'mode',
+        'is_external', 'url_private', 'url_private_download', 'permalink', 'permalink_public', 'original_w', 'original_h',
+    ),
+    # Everything download_file and the renderers need
+    'lean': ('id', 'name', 'mimetype', 'filetype', 'size', 'created', 'timestamp', 'url_private', 'permalink'),
+}
+
+def _is_thumbnail_key(key):
+    # thumb_<N> and thumb_video URLs are kept for thumbnail_only download policies
+    return key == 'thumb_video' or (key.startswith('thumb_') and key[6:].isdigit())
+
+def saved_profile(msg):
+    """The narrowest projection profile msg could have been saved under."""
+    if all(key in LEAN_MESSAGE_FIELDS for key in msg):
+        return 'lean'
+    if not any(key in msg for key in STANDARD_DROPPED_FIELDS):
+        return 'standard'
+    return 'full'
+
+def project_message(msg, profile):
+    """Return msg reduced to the fields of the given projection profile."""
+    if profile == 'full':
+        return msg
+    if profile == 'lean':
+        projected = {key: msg[key] for key in LEAN_MESSAGE_FIELDS if key in msg}
+    else:
+        projected = {key: value for key, value in msg.items() if key not in STANDARD_DROPPED_FIELDS}
+    if projected.get('files'):
+        fields = PROJECTED_FILE_FIELDS[profile]
+        projected['files'] = [{key: value for key, value in f.items() if key in fields or _is_thumbnail_key(key)} if isinstance(f, dict) else f
+                              for f in projected['files']]
+    return projected
+
+def store_raw_messages(channel_name, batch):
+    """Keep Slack's unprojected payloads in <channel>/raw/<YYYY-MM>.json, keyed by ts (latest fetch wins)."""
+    by_month = {}
+    for msg in batch:
+        month = datetime.fromtimestamp(float(msg['ts'])).strftime('%Y-%m')
+        by_month.setdefault(month, []).append(msg)
+    raw_dir = out_path(channel_name, "raw")
+    os.makedirs(raw_dir, exist_ok=True)
+    for month, messages in by_month.items():
+        path = os.path.join(raw_dir, f"{month}.json")
+        stored = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                stored = json.load(f)
+        for msg in messages:
+            stored[msg['ts']] = msg
+        with open(path + ".tmp", "w") as f:
+            json.dump(stored, f, separators=(',', ':'))
+        os.replace(path + ".tmp", path)
+
+def project_page(channel_name, batch):
+    """Apply the --projection profile to a page of history, keeping the raw payloads on the side."""
+    if PROJECTION == 'full':
+        return batch
+    if not DRY_RUN:
+        store_raw_messages(channel_name, batch)
+    return [project_message(msg, PROJECTION) for msg in batch]
+
+def write_messages_json(messages, f):
+    # Lean archives are written compactly; the others stay pretty-printed
+    if PROJECTION == 'lean':
+        json.dump(messages, f, separators=(',', ':'))
+    else:
+        json.dump(messages, f, indent=2)
+
 def load_exported_channels(checkpoint_file="exported_channels.json"):
     if os.path.exists(checkpoint_file):
         with open(checkpoint_file, "r") as f:
@@ -183,7 +336,7 @@ def save_channel_messages_batch(channel_name, new_batch):
     merged_sorted = [all_msgs[ts] for ts in sorted(all_msgs, key=lambda t: float(t))]
     if not DRY_RUN:
         with open(path, "w") as f:
-            json.dump(merged_sorted, f, indent=2)
+            write_messages_json(merged_sorted, f)
         logging.info(f"Saved {len(merged_sorted)} total messages to {path}")
     else:
         logging.info(f"[DRY RUN] Would save {len(merged_sorted)} total messages to {path}")
@@ -205,7 +358,7 @@ def fetch_all_messages(channel_id, channel_name, latest_saved_ts=None):
         start_time = time.time()
         if not response:
             break
-        batch = response['messages']
+        batch = project_page(channel_name, response['messages'])
         if not batch:
             logging.info(f"No more messages in batch for {channel_name}.")
             break
@@ -218,7 +371,7 @@ def fetch_all_messages(channel_id, channel_name, latest_saved_ts=None):
         logging.info(f"Total messages fetched for {channel_name}: {total_fetched}")
         cursor = response.get('response_metadata', {}).get('next_cursor')
         elapsed = time.time() - start_time
-        if elapsed < 1.2:
+        if elapsed < 1.2 and not args.replay_api:
             time.sleep(1.2 - elapsed)
         if not cursor:
             break
@@ -226,9 +379,88 @@ def fetch_all_messages(channel_id, channel_name, latest_saved_ts=None):
     messages.sort(key=lambda m: float(m['ts']))
     return messages
 
-def download_file(file_info, token, output_dir):
+# Download workers share the per-channel manifest/index files and pick target paths concurrently
+_download_lock = threading.RLock()
+_reserved_paths = set()
+
+def _path_taken(path):
+    """True if path exists on disk or another worker is already downloading to it."""
+    return os.path.exists(path) or path in _reserved_paths
+
+def _matches_types(file_info, patterns):
+    """True if the file's filetype or mimetype matches one of patterns ("mp4", "video/quicktime" or a "video/" prefix)."""
+    filetype = (file_info.get('filetype') or '').lower()
+    mimetype = (file_info.get('mimetype') or '').lower()
+    for pattern in patterns:
+        pattern = pattern.lower()
+        if pattern in (filetype, mimetype) or (pattern.endswith('/') and mimetype.startswith(pattern)):
+            return True
+    return False
+
+def thumbnail_url(file_info, max_size=1024):
+    """URL of the largest thumb_<N> no bigger than max_size (else the smallest), or a video's poster frame."""
+    sizes = sorted((int(key[6:]), key) for key in file_info if key.startswith('thumb_') and key[6:].isdigit() and file_info[key])
+    if sizes:
+        fitting = [key for size, key in sizes if size <= max_size]
+        return file_info[fitting[-1] if fitting else sizes[0][1]]
+    return file_info.get('thumb_video')
+
+def download_decision(file_info, policy):
+    """Return ('full', url), ('thumbnail', url) or ('skipped', reason) for a file under a download policy.
+
+    policy is the download_policy block of export_config.json:
+      max_size_mb       skip files larger than this
+      include_types     only download files matching one of these filetypes/mimetypes
+      exclude_types     never download files matching these (checked first)
+      thumbnail_only    true, or a list of "image"/"video": save Slack's thumbnail instead
+      thumbnail_size    largest thumb_<N> to use (default 1024)
+    """
+    if not policy:
+        return 'full', file_info.get('url_private')
+    if policy.get('exclude_types') and _matches_types(file_info, policy['exclude_types']):
+        return 'skipped', 'excluded type'
+    if policy.get('include_types') and not _matches_types(file_info, policy['include_types']):
+        return 'skipped', 'type not included'
+    thumbnail_kinds = policy.get('thumbnail_only')
+    if thumbnail_kinds is True:
+        thumbnail_kinds = ['image', 'video']
+    if thumbnail_kinds and (file_info.get('mimetype') or '').split('/')[0] in thumbnail_kinds:
+        url = thumbnail_url(file_info, policy.get('thumbnail_size', 1024))
+        return ('thumbnail', url) if url else ('skipped', 'no thumbnail')
+    max_size_mb = policy.get('max_size_mb')
+    if max_size_mb and (file_info.get('size') or 0) > max_size_mb * 1024 * 1024:
+        return 'skipped', f'larger than {max_size_mb:g} MB'
+    return 'full', file_info.get('url_private')
+
+def record_skipped_file(file_info, output_dir, reason):
+    """Note a file the download policy skipped in the channel's manifest, so it can be fetched later."""
+    file_id = file_info.get('id') or file_info.get('name')
+    with _download_lock:
+        manifest_path = os.path.join(os.path.dirname(output_dir), "manifest.json")
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r") as mf:
+                manifest = json.load(mf)
+        # Keep copies downloaded before the policy was set
+        if manifest.get(file_id, {}).get("saved_path"):
+            return
+        manifest[file_id] = {
+            "original_name": file_info.get('name'),
+            "ts": file_info.get('created') or file_info.get('timestamp') or None,
+            "id": file_id,
+            "skipped": reason,
+            "size": file_info.get('size'),
+            "mimetype": file_info.get('mimetype'),
+        }
+        with open(manifest_path, "w") as mf:
+            json.dump(manifest, mf, indent=2)
+    logging.info(f"SKIPPED BY DOWNLOAD POLICY ({reason}): {file_info.get('name')} in {output_dir}")
+
+def download_file(file_info, token, output_dir, policy=None):
     """
     Save file preserving the original filename in output_dir.
+    - Files the download policy skips are only recorded in the manifest; with
+      thumbnail_only, Slack's thumbnail is saved as <name>.thumb<ext> instead.
     - If no collision: save as output_dir/<original_name>
     - If collision: create a timestamp-named subdirectory and save there as <original_name>
     - If collision still exists in the timestamp subdir, append a numeric suffix.
@@ -248,37 +480,25 @@ def download_file(file_info, token, output_dir):
         logging.warning(f"Skipping file with missing URL in {output_dir}")
         return None
 
+    variant, url_or_reason = download_decision(file_info, policy)
+    if variant == 'skipped':
+        record_skipped_file(file_info, output_dir, url_or_reason)
+        return None
+    url = url_or_reason
+
     # preserve original filename (sanitized)
     orig_name = file_info.get('name') or file_info.get('id') or "file"
     safe_name = re.sub(r'[\\/*?:"<>|]', "_", orig_name)
+    if variant == 'thumbnail':
+        safe_name = f"{safe_name}.thumb{os.path.splitext(url.split('?')[0])[1]}"
 
     # Get file timestamp for comparison
     file_ts = str(file_info.get('created') or file_info.get('timestamp') or "")
     file_id = file_info.get('id') or safe_name
 
-    # Always check manifest for duplicates, regardless of file existence
-    manifest_path = os.path.join(os.path.dirname(output_dir), "manifest.json")
-    if os.path.exists(manifest_path):
-        with open(manifest_path, "r") as mf:
-            try:
-                manifest = json.load(mf)
-            except Exception:
-                manifest = {}
-        for entry in manifest.values():
-            # Compare id, name, and timestamp
-            if (
-                entry.get("original_name") == orig_name and
-                str(entry.get("ts")) == file_ts and
-                entry.get("id", None) == file_id
-            ):
-                logging.info(f"IGNORED VIA MANIFEST duplicate file: {orig_name} with ts {file_ts} and id {file_id} in {output_dir}")
-                return None
-
-    candidate_path = os.path.join(output_dir, safe_name)
-
-    # Check for duplicate: same name and same timestamp
-    if os.path.exists(candidate_path):
-        # Try to read manifest for timestamp comparison
+    # Pick the target path under the lock so concurrent workers never choose the same one
+    with _download_lock:
+        # Always check manifest for duplicates, regardless of file existence
         manifest_path = os.path.join(os.path.dirname(output_dir), "manifest.json")
         if os.path.exists(manifest_path):
             with open(manifest_path, "r") as mf:
@@ -287,31 +507,24 @@ def download_file(file_info, token, output_dir):
                 except Exception:
                     manifest = {}
             for entry in manifest.values():
-                # Compare both name and timestamp
-                if entry.get("original_name") == orig_name and str(entry.get("ts")) == file_ts:
-                    logging.info(f"IGNORED duplicate file: {orig_name} with ts {file_ts} in {output_dir}")
+                # Skipped files, or a thumbnail when the full file is wanted, don't count; a full copy satisfies a thumbnail request
+                if entry.get("skipped") or (variant == 'full' and entry.get("variant", "full") != 'full'):
+                    continue
+                # Compare id, name, and timestamp
+                if (
+                    entry.get("original_name") == orig_name and
+                    str(entry.get("ts")) == file_ts and
+                    entry.get("id", None) == file_id
+                ):
+                    logging.info(f"IGNORED VIA MANIFEST duplicate file: {orig_name} with ts {file_ts} and id {file_id} in {output_dir}")
                     return None
-    # If no collision, save directly in output_dir
-    if not os.path.exists(candidate_path):
-        target_dir = output_dir
-        final_path = candidate_path
-    else:
-        # Collision: choose a timestamp-like subdirectory name
-        if file_info.get('created'):
-            ts_key = str(file_info.get('created'))
-        elif file_info.get('timestamp'):
-            ts_key = str(file_info.get('timestamp'))
-        elif file_info.get('id'):
-            ts_key = str(file_info.get('id'))
-        else:
-            ts_key = str(int(time.time()))
-        subdir_name = ts_key.replace('.', '_')
-        target_dir = os.path.join(output_dir, subdir_name)
-        os.makedirs(target_dir, exist_ok=True)
-        final_path = os.path.join(target_dir, safe_name)
-        # Check for duplicate in subdir: same name and same timestamp
-        manifest_path = os.path.join(os.path.dirname(output_dir), "manifest.json")
-        if os.path.exists(final_path):
+
+        candidate_path = os.path.join(output_dir, safe_name)
+
+        # Check for duplicate: same name and same timestamp
+        if _path_taken(candidate_path):
+            # Try to read manifest for timestamp comparison
+            manifest_path = os.path.join(os.path.dirname(output_dir), "manifest.json")
             if os.path.exists(manifest_path):
                 with open(manifest_path, "r") as mf:
                     try:
@@ -319,155 +532,337 @@ def download_file(file_info, token, output_dir):
                     except Exception:
                         manifest = {}
                 for entry in manifest.values():
-                    if entry.get("original_name") == orig_name and str(entry.get("ts")) == file_ts and entry.get("dir") == os.path.relpath(target_dir, output_dir):
-                        logging.info(f"IGNORED duplicate file in subdir: {orig_name} with ts {file_ts} in {target_dir}")
+                    # Compare both name and timestamp
+                    if not entry.get("skipped") and entry.get("original_name") == orig_name and str(entry.get("ts")) == file_ts:
+                        logging.info(f"IGNORED duplicate file: {orig_name} with ts {file_ts} in {output_dir}")
                         return None
-            # If collision still exists in subdir, suffix numerically
-            base, ext = os.path.splitext(safe_name)
-            i = 1
-            while True:
-                candidate = f"{i}_{base}{ext}"
-                candidate_path = os.path.join(target_dir, candidate)
-                if not os.path.exists(candidate_path):
-                    final_path = candidate_path
-                    break
-                i += 1
+        # If no collision, save directly in output_dir
+        if not _path_taken(candidate_path):
+            target_dir = output_dir
+            final_path = candidate_path
+        else:
+            # Collision: choose a timestamp-like subdirectory name
+            if file_info.get('created'):
+                ts_key = str(file_info.get('created'))
+            elif file_info.get('timestamp'):
+                ts_key = str(file_info.get('timestamp'))
+            elif file_info.get('id'):
+                ts_key = str(file_info.get('id'))
+            else:
+                ts_key = str(int(time.time()))
+            subdir_name = ts_key.replace('.', '_')
+            target_dir = os.path.join(output_dir, subdir_name)
+            os.makedirs(target_dir, exist_ok=True)
+            final_path = os.path.join(target_dir, safe_name)
+            # Check for duplicate in subdir: same name and same timestamp
+            manifest_path = os.path.join(os.path.dirname(output_dir), "manifest.json")
+            if _path_taken(final_path):
+                if os.path.exists(manifest_path):
+                    with open(manifest_path, "r") as mf:
+                        try:
+                            manifest = json.load(mf)
+                        except Exception:
+                            manifest = {}
+                    for entry in manifest.values():
+                        if entry.get("original_name") == orig_name and str(entry.get("ts")) == file_ts and entry.get("dir") == os.path.relpath(target_dir, output_dir):
+                            logging.info(f"IGNORED duplicate file in subdir: {orig_name} with ts {file_ts} in {target_dir}")
+                            return None
+                # If collision still exists in subdir, suffix numerically
+                base, ext = os.path.splitext(safe_name)
+                i = 1
+                while True:
+                    candidate = f"{i}_{base}{ext}"
+                    candidate_path = os.path.join(target_dir, candidate)
+                    if not _path_taken(candidate_path):
+                        final_path = candidate_path
+                        break
+                    i += 1
+        _reserved_paths.add(final_path)
 
     headers = {"Authorization": f"Bearer {token}"}
     try:
         resp = requests.get(url, headers=headers, timeout=30, stream=True)
         if resp.status_code == 200:
             # atomic write into target directory
-            with tempfile.NamedTemporaryFile(delete=False, dir=target_dir) as tf:
+            with tempfile.NamedTemporaryFile(delete=False, dir=target_dir, prefix=DOWNLOAD_TEMP_PREFIX, suffix=DOWNLOAD_TEMP_SUFFIX) as tf:
                 for chunk in resp.iter_content(chunk_size=8192):
                     if chunk:
                         tf.write(chunk)
                 temp_path = tf.name
             shutil.move(temp_path, final_path)
             logging.info(f"Downloaded file to {final_path}")
-            # update manifest (idempotent, non-blocking)
-            try:
-                manifest_path = os.path.join(os.path.dirname(output_dir), "manifest.json")
-                manifest = {}
-                if os.path.exists(manifest_path):
-                    with open(manifest_path, "r") as mf:
-                        manifest = json.load(mf)
-                file_id = file_info.get('id') or safe_name
-                manifest[file_id] = {
-                    "saved_path": os.path.relpath(final_path, output_dir),
-                    "original_name": orig_name,
-                    "dir": os.path.relpath(target_dir, output_dir),
-                    "ts": file_info.get('created') or file_info.get('timestamp') or None,
-                    "id": file_id
-                }
-                with open(manifest_path, "w") as mf:
-                    json.dump(manifest, mf, indent=2)
-            except Exception:
-                # manifest failure shouldn't block the download
-                pass
+            with _download_lock:
+                # update manifest (idempotent, non-blocking)
+                try:
+                    manifest_path = os.path.join(os.path.dirname(output_dir), "manifest.json")
+                    manifest = {}
+                    if os.path.exists(manifest_path):
+                        with open(manifest_path, "r") as mf:
+                            manifest = json.load(mf)
+                    file_id = file_info.get('id') or safe_name
+                    previous = manifest.get(file_id, {})
+                    # Never replace a saved full copy with a thumbnail
+                    if not (variant == 'thumbnail' and previous.get("saved_path") and previous.get("variant", "full") == 'full'):
+                        manifest[file_id] = {
+                            "saved_path": os.path.relpath(final_path, output_dir),
+                            "original_name": orig_name,
+                            "dir": os.path.relpath(target_dir, output_dir),
+                            "ts": file_info.get('created') or file_info.get('timestamp') or None,
+                            "id": file_id
+                        }
+                        if variant == 'thumbnail':
+                            manifest[file_id]["variant"] = "thumbnail"
+                        with open(manifest_path, "w") as mf:
+                            json.dump(manifest, mf, indent=2)
+                except Exception:
+                    # manifest failure shouldn't block the download
+                    pass
+
+                # append an entry to downloaded_files.json with filepath and timestamps
+                try:
+                    index_path = os.path.join(os.path.dirname(output_dir), "downloaded_files.json")
+                    entries = []
+                    if os.path.exists(index_path):
+                        with open(index_path, "r") as idxf:
+                            try:
+                                entries = json.load(idxf)
+                                if not isinstance(entries, list):
+                                    entries = []
+                            except Exception:
+                                entries = []
+                    # determine raw_ts and actual_ts
+                    raw_ts = None
+                    actual_ts = None
+                    if file_info.get('created') is not None:
+                        raw_ts = str(int(file_info.get('created')))
+                        actual_ts = f"{int(file_info.get('created'))}.000000"
+                    elif file_info.get('timestamp') is not None:
+                        try:
+                            actual_ts = str(file_info.get('timestamp'))
+                            raw_ts = str(int(float(actual_ts)))
+                        except Exception:
+                            actual_ts = str(file_info.get('timestamp'))
+                            raw_ts = actual_ts.split('.')[0]
+                    else:
+                        # fallback to current time
+                        now = time.time()
+                        raw_ts = str(int(now))
+                        actual_ts = f"{int(now)}.000000"
 
-            # append an entry to downloaded_files.json with filepath and timestamps
+                    entry = {
+                        # make filepath relative to the configured ROOT_DIR (not CWD)
+                        "filepath": os.path.relpath(final_path, start=ROOT_DIR),
+                        "raw_ts": raw_ts,
+                        "actual_ts": actual_ts,
+                        "permalink": file_info.get('permalink'),
+                        "permalink_public": file_info.get('url')
+                    }
+                    entries.append(entry)
+                    with open(index_path, "w") as idxf:
+                        json.dump(entries, idxf, indent=2)
+                except Exception:
+                    # indexing failure should not break download
+                    pass
+
+            return final_path
+        else:
+            # Handled below, so the failure lands in errors.json like any other
+            raise RuntimeError(f"HTTP {resp.status_code}")
+    except Exception as e:
+        logging.error(f"Error downloading file {orig_name}: {e}")
+        with _download_lock:
             try:
-                index_path = os.path.join(os.path.dirname(output_dir), "downloaded_files.json")
-                entries = []
-                if os.path.exists(index_path):
-                    with open(index_path, "r") as idxf:
+                errors_path = os.path.join(os.path.dirname(output_dir), "errors.json")
+                errors = []
+                if os.path.exists(errors_path):
+                    with open(errors_path, "r") as ef:
                         try:
-                            entries = json.load(idxf)
-                            if not isinstance(entries, list):
-                                entries = []
+                            errors = json.load(ef)
+                            if not isinstance(errors, list):
+                                errors = []
                         except Exception:
-                            entries = []
-                # determine raw_ts and actual_ts
-                raw_ts = None
-                actual_ts = None
+                            errors = []
+                # determine timestamps
                 if file_info.get('created') is not None:
                     raw_ts = str(int(file_info.get('created')))
                     actual_ts = f"{int(file_info.get('created'))}.000000"
                 elif file_info.get('timestamp') is not None:
+                    actual_ts = str(file_info.get('timestamp'))
                     try:
-                        actual_ts = str(file_info.get('timestamp'))
                         raw_ts = str(int(float(actual_ts)))
                     except Exception:
-                        actual_ts = str(file_info.get('timestamp'))
                         raw_ts = actual_ts.split('.')[0]
                 else:
-                    # fallback to current time
                     now = time.time()
                     raw_ts = str(int(now))
                     actual_ts = f"{int(now)}.000000"
-
+                # intended path if available
+                intended = None
+                if 'final_path' in locals():
+                    intended = os.path.relpath(final_path)
+                elif 'candidate_path' in locals():
+                    intended = os.path.relpath(candidate_path)
                 entry = {
-                    # make filepath relative to the configured ROOT_DIR (not CWD)
-                    "filepath": os.path.relpath(final_path, start=ROOT_DIR),
+                    "name": orig_name,
+                    "id": file_info.get('id'),
+                    "url": url,
+                    "intended_path": intended,
                     "raw_ts": raw_ts,
                     "actual_ts": actual_ts,
-                    "permalink": file_info.get('permalink'),
-                    "permalink_public": file_info.get('url')
+                    "error": str(e),
+                    "attempted_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
                 }
-                entries.append(entry)
-                with open(index_path, "w") as idxf:
-                    json.dump(entries, idxf, indent=2)
+                if 'resp' in locals() and resp.status_code != 200:
+                    entry["http_status"] = resp.status_code
+                errors.append(entry)
+                with open(errors_path, "w") as ef:
+                    json.dump(errors, ef, indent=2)
             except Exception:
-                # indexing failure should not break download
                 pass
-
-            return final_path
-        else:
-            logging.warning(f"Failed to download file {orig_name}: HTTP {resp.status_code}")
-            return None
-    except Exception as e:
-        logging.error(f"Error downloading file {orig_name}: {e}")
-        try:
-            errors_path = os.path.join(os.path.dirname(output_dir), "errors.json")
-            errors = []
-            if os.path.exists(errors_path):
-                with open(errors_path, "r") as ef:
-                    try:
-                        errors = json.load(ef)
-                        if not isinstance(errors, list):
-                            errors = []
-                    except Exception:
-                        errors = []
-            # determine timestamps
-            if file_info.get('created') is not None:
-                raw_ts = str(int(file_info.get('created')))
-                actual_ts = f"{int(file_info.get('created'))}.000000"
-            elif file_info.get('timestamp') is not None:
-                actual_ts = str(file_info.get('timestamp'))
-                try:
-                    raw_ts = str(int(float(actual_ts)))
-                except Exception:
-                    raw_ts = actual_ts.split('.')[0]
-            else:
-                now = time.time()
-                raw_ts = str(int(now))
-                actual_ts = f"{int(now)}.000000"
-            # intended path if available
-            intended = None
-            if 'final_path' in locals():
-                intended = os.path.relpath(final_path)
-            elif 'candidate_path' in locals():
-                intended = os.path.relpath(candidate_path)
-            entry = {
-                "name": orig_name,
-                "id": file_info.get('id'),
-                "url": url,
-                "intended_path": intended,
-                "raw_ts": raw_ts,
-                "actual_ts": actual_ts,
-                "error": str(e),
-                "attempted_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
-            }
-            errors.append(entry)
-            with open(errors_path, "w") as ef:
-                json.dump(errors, ef, indent=2)
-        except Exception:
-            pass
         return None
+    finally:
+        with _download_lock:
+            _reserved_paths.discard(final_path)
 
-def load_export_config(config_file=None):
-    """Load export_config.json. If config_file is not absolute, resolve under ROOT_DIR."""
+class FileDownloadQueue:
+    """Downloads a channel's files on worker threads while its history is still being paged.
+
+    Every queued file is recorded in <channel>/pending_downloads.json until its
+    download finishes (or fails and lands in errors.json), so files left over
+    from an interrupted run are queued again when the channel is next exported.
+    """
+
+    def __init__(self, channel_name, token, workers=4, policy=None):
+        self.channel_name = channel_name
+        self.token = token
+        self.policy = policy
+        self.files_dir = out_path(channel_name, 'files')
+        self.pending_path = out_path(channel_name, 'pending_downloads.json')
+        self.queue = queue.Queue()
+        self.pending = {}
+        self.downloaded = 0
+        # {id, name, path} of every file saved by this queue, for the run's delta bundle
+        self.downloaded_files = []
+        if os.path.exists(self.pending_path):
+            with open(self.pending_path, "r") as f:
+                self.pending = json.load(f)
+        self.threads = [threading.Thread(target=self._work, name=f"download-{channel_name}-{i}", daemon=True) for i in range(max(1, workers))]
+        for thread in self.threads:
+            thread.start()
+        if self.pending:
+            logging.info(f"Resuming {len(self.pending)} unfinished downloads for {channel_name}")
+            for file_info in self.pending.values():
+                self.queue.put(file_info)
+
+    def _save_pending(self):
+        # Callers hold _download_lock
+        os.makedirs(os.path.dirname(self.pending_path), exist_ok=True)
+        tmp_path = self.pending_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.pending, f, indent=2)
+        os.replace(tmp_path, self.pending_path)
+
+    def add(self, messages):
+        """Queue the files attached to messages, skipping ones already queued."""
+        new_files = []
+        with _download_lock:
+            for msg in messages:
+                for file_info in msg.get('files', []):
+                    file_id = file_info.get('id') or file_info.get('name')
+                    if DRY_RUN:
+                        logging.info(f"[DRY RUN] Would download file: {file_info.get('name')}")
+                    elif file_id and file_id not in self.pending:
+                        self.pending[file_id] = file_info
+                        new_files.append(file_info)
+            if new_files:
+                self._save_pending()
+        for file_info in new_files:
+            self.queue.put(file_info)
+
+    def _work(self):
+        while True:
+            file_info = self.queue.get()
+            if file_info is None:
+                self.queue.task_done()
+                return
+            try:
+                saved_path = download_file(file_info, self.token, self.files_dir, self.policy)
+                if saved_path:
+                    with _download_lock:
+                        self.downloaded += 1
+                        self.downloaded_files.append({
+                            "id": file_info.get('id'),
+                            "name": file_info.get('name'),
+                            "path": os.path.relpath(saved_path, ROOT_DIR),
+                        })
+            except Exception as e:
+                logging.error(f"Download worker error for {file_info.get('name')}: {e}")
+            finally:
+                with _download_lock:
+                    self.pending.pop(file_info.get('id') or file_info.get('name'), None)
+                    self._save_pending()
+                self.queue.task_done()
+
+    def close(self):
+        """Wait for every queued download to finish and stop the workers. Returns the number downloaded."""
+        self.queue.join()
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        with _download_lock:
+            if not self.pending and os.path.exists(self.pending_path):
+                os.remove(self.pending_path)
+        return self.downloaded
+
+def forget_download(channel_name, file_id, rel_path=None):
+    """Drop a file from the channel's manifest and downloaded_files.json and delete the bad copy, so it is downloaded again."""
+    with _download_lock:
+        manifest_path = out_path(channel_name, "manifest.json")
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+            if manifest.pop(file_id, None) is not None:
+                with open(manifest_path, "w") as f:
+                    json.dump(manifest, f, indent=2)
+        if not rel_path:
+            return
+        index_path = out_path(channel_name, "downloaded_files.json")
+        if os.path.exists(index_path):
+            with open(index_path, "r") as f:
+                entries = json.load(f)
+            kept = [entry for entry in entries if entry.get('filepath') != rel_path]
+            if len(kept) != len(entries):
+                with open(index_path, "w") as f:
+                    json.dump(kept, f, indent=2)
+        if os.path.isfile(out_path(rel_path)):
+            os.remove(out_path(rel_path))
+
+def redownload_files(list_path):
+    """Download again every file in a re-download list written by verify_files.py."""
+    with open(list_path, "r") as f:
+        entries = json.load(f)
+    by_channel = {}
+    for entry in entries:
+        if not (entry.get('file') or {}).get('url_private'):
+            logging.warning(f"Can't re-download {entry.get('name')} in {entry.get('channel')}: no Slack file metadata in messages.json")
+            continue
+        by_channel.setdefault(entry['channel'], []).append(entry)
+    total = 0
+    for channel_name, channel_entries in by_channel.items():
+        if not DRY_RUN:
+            for entry in channel_entries:
+                forget_download(channel_name, entry['id'], entry.get('path'))
+        # Listed files are fetched in full, including ones the download policy skipped
+        downloads = FileDownloadQueue(channel_name, SLACK_BOT_TOKEN, args.download_workers)
+        downloads.add([{'files': [entry['file'] for entry in channel_entries]}])
+        count = downloads.close()
+        total += count
+        logging.info(f"Re-downloaded {count} of {len(channel_entries)} files for {channel_name}.")
+    logging.info(f"Re-downloaded {total} files from {list_path}.")
+
+def _read_export_config(config_file=None):
+    """Load export_config.json as a dict, or None. If config_file is not absolute, resolve under ROOT_DIR."""
     if config_file is None:
         config_file = EXPORT_CONFIG_PATH or out_path("export_config.json")
     else:
@@ -475,11 +870,26 @@ def load_export_config(config_file=None):
             config_file = out_path(config_file)
     if os.path.exists(config_file):
         with open(config_file, "r") as f:
-            data = json.load(f)
-            return set(data.get("channel_ids", []))
+            return json.load(f)
     return None
 
-def fetch_messages_newer(channel_id, channel_name, latest_saved_ts):
+def load_export_config(config_file=None):
+    """Channel ids listed in export_config.json, or None."""
+    data = _read_export_config(config_file)
+    if data is not None:
+        return set(data.get("channel_ids", []))
+    return None
+
+def load_download_policy(config_file=None):
+    """The download_policy block of export_config.json, or None to download every file in full."""
+    data = _read_export_config(config_file)
+    return (data or {}).get("download_policy") or None
+
+def fetch_messages_newer(channel_id, channel_name, latest_saved_ts, on_page=None):
+    """Fetch messages newer than latest_saved_ts.
+
+    Returns (messages, complete); complete is False if paging stopped on an error.
+    """
     messages = []
     cursor = None
     unique_timestamps = set()
@@ -488,8 +898,9 @@ def fetch_messages_newer(channel_id, channel_name, latest_saved_ts):
         start_time = time.time()
         response = robust_api_call(client.conversations_history, channel=channel_id, limit=1000, cursor=cursor, oldest=latest_saved_ts)
         if not response:
-            break
-        batch = response['messages']
+            logging.warning(f"Paging NEWER messages for {channel_name} stopped early after {len(messages)} messages.")
+            return messages, False
+        batch = project_page(channel_name, response['messages'])
         if not batch:
             logging.info(f"No more newer messages in batch for {channel_name}.")
             break
@@ -498,25 +909,35 @@ def fetch_messages_newer(channel_id, channel_name, latest_saved_ts):
         logging.info(f"Fetched {len(batch)} newer messages for {channel_name}. Batch ts range: {batch_ts[-1]} to {batch_ts[0]}")
         logging.info(f"Unique newer timestamps so far: {len(unique_timestamps)}")
         messages += batch
+        if on_page:
+            on_page(batch)
         cursor = response.get('response_metadata', {}).get('next_cursor')
         elapsed = time.time() - start_time
-        if elapsed < 1.2:
+        if elapsed < 1.2 and not args.replay_api:
             time.sleep(1.2 - elapsed)
         if not cursor:
             break
-    return messages
+    return messages, True
+
+def fetch_messages_older(channel_id, channel_name, oldest_saved_ts, oldest=None, on_page=None):
+    """Fetch messages older than oldest_saved_ts, and newer than oldest if given.
 
-def fetch_messages_older(channel_id, channel_name, oldest_saved_ts):
+    Returns (messages, complete); complete is False if paging stopped on an error.
+    """
     messages = []
     cursor = None
     unique_timestamps = set()
+    bounds = {'latest': oldest_saved_ts}
+    if oldest:
+        bounds['oldest'] = oldest
     while True:
-        logging.info(f"Fetching OLDER messages for {channel_name} with ts < {oldest_saved_ts}")
+        logging.info(f"Fetching OLDER messages for {channel_name} with ts < {oldest_saved_ts}" + (f" and ts > {oldest}" if oldest else ""))
         start_time = time.time()
-        response = robust_api_call(client.conversations_history, channel=channel_id, limit=1000, cursor=cursor, latest=oldest_saved_ts)
+        response = robust_api_call(client.conversations_history, channel=channel_id, limit=1000, cursor=cursor, **bounds)
         if not response:
-            break
-        batch = response['messages']
+            logging.warning(f"Paging OLDER messages for {channel_name} stopped early after {len(messages)} messages.")
+            return messages, False
+        batch = project_page(channel_name, response['messages'])
         if not batch:
             logging.info(f"No more older messages in batch for {channel_name}.")
             break
@@ -525,13 +946,15 @@ def fetch_messages_older(channel_id, channel_name, oldest_saved_ts):
         logging.info(f"Fetched {len(batch)} older messages for {channel_name}. Batch ts range: {batch_ts[-1]} to {batch_ts[0]}")
         logging.info(f"Unique older timestamps so far: {len(unique_timestamps)}")
         messages += batch
+        if on_page:
+            on_page(batch)
         cursor = response.get('response_metadata', {}).get('next_cursor')
         elapsed = time.time() - start_time
-        if elapsed < 1.2:
+        if elapsed < 1.2 and not args.replay_api:
             time.sleep(1.2 - elapsed)
         if not cursor:
             break
-    return messages
+    return messages, True
 
 def save_channel_messages_two_way(channel_name, older_messages, existing_messages, newer_messages):
     channel_dir = out_path(channel_name)
@@ -543,7 +966,7 @@ def save_channel_messages_two_way(channel_name, older_messages, existing_message
     all_messages = sorted(all_messages, key=lambda m: float(m['ts']))
     if not DRY_RUN:
         with open(path, "w") as f:
-            json.dump(list(all_messages), f, indent=2)
+            write_messages_json(list(all_messages), f)
         logging.info(f"Saved {len(all_messages)} total messages to {path}")
     else:
         logging.info(f"[DRY RUN] Would save {len(all_messages)} total messages to {path}")
@@ -556,7 +979,13 @@ def log_message_sample(msg):
     words = ' '.join(text.split()[:10])
     logging.info(f"  {dt}: {words}")
 
-def fetch_full_history(channel_id, channel_name):
+def fetch_full_history(channel_id, channel_name, latest=None, on_page=None):
+    """Page back through a channel's history, saving after every page.
+
+    latest resumes an interrupted backfill from the oldest ts already saved;
+    on_page(batch) is called once each page has been saved. Returns
+    (messages, complete); complete is False if paging stopped on an error.
+    """
     messages = []
     cursor = None
     unique_timestamps = set()
@@ -566,10 +995,15 @@ def fetch_full_history(channel_id, channel_name):
     while True:
         logging.info(f"Fetching ALL messages for {channel_name} (cursor: {cursor if cursor else 'start'})")
         start_time = time.time()
-        response = robust_api_call(client.conversations_history, channel=channel_id, limit=1000, cursor=cursor)
+        if latest:
+            response = robust_api_call(client.conversations_history, channel=channel_id, limit=1000, cursor=cursor, latest=latest)
+        else:
+            response = robust_api_call(client.conversations_history, channel=channel_id, limit=1000, cursor=cursor)
         if not response:
-            break
-        batch = response['messages']
+            logging.warning(f"Paging history for {channel_name} stopped early after {len(messages)} messages.")
+            messages.sort(key=lambda m: float(m['ts']))
+            return messages, False
+        batch = project_page(channel_name, response['messages'])
         if not batch:
             logging.info(f"No more messages in batch for {channel_name}.")
             break
@@ -603,114 +1037,499 @@ def fetch_full_history(channel_id, channel_name):
         merged_sorted = [all_msgs[ts] for ts in sorted(all_msgs, key=lambda t: float(t))]
         if not DRY_RUN:
             with open(path, "w") as f:
-                json.dump(merged_sorted, f, indent=2)
+                write_messages_json(merged_sorted, f)
             logging.info(f"Aggressively saved {len(merged_sorted)} total messages to {path}")
         else:
             logging.info(f"[DRY RUN] Would save {len(merged_sorted)} total messages to {path}")
+        if on_page:
+            on_page(batch)
         cursor = response.get('response_metadata', {}).get('next_cursor')
         elapsed = time.time() - start_time
-        if elapsed < 1.2:
+        if elapsed < 1.2 and not args.replay_api:
             time.sleep(1.2 - elapsed)
         if not cursor:
             break
     # Sort messages chronologically (oldest to newest)
     messages.sort(key=lambda m: float(m['ts']))
+    return messages, True
+
+def message_digest(msg):
+    return hashlib.sha1(json.dumps(msg, sort_keys=True).encode('utf-8')).hexdigest()
+
+def message_changed(saved, fresh):
+    """Whether fresh differs from the saved copy, ignoring a --projection switch since it was saved."""
+    profile = min(saved_profile(saved), PROJECTION, key=PROJECTIONS.index)
+    return message_digest(project_message(saved, profile)) != message_digest(project_message(fresh, profile))
+
+def diff_messages(before, fetched, deleted=()):
+    """Return (added, edited, deleted_ts) for the messages fetched this run against their saved copies in before.
+
+    Only the fetched messages are compared, so the cost follows the size of
+    the fetch rather than the channel's whole history.
+    """
+    if not fetched:
+        return [], [], sorted(deleted, key=float)
+    saved = {msg['ts']: msg for msg in before}
+    added = []
+    edited = []
+    for msg in {msg['ts']: msg for msg in fetched}.values():
+        saved_msg = saved.get(msg['ts'])
+        if saved_msg is None:
+            added.append(msg)
+        elif message_changed(saved_msg, msg):
+            edited.append(msg)
+    added.sort(key=lambda m: float(m['ts']))
+    edited.sort(key=lambda m: float(m['ts']))
+    return added, edited, sorted(deleted, key=float)
+
+class DeltaBundle:
+    """Per-run record of what changed, written to deltas/<run_id>/ for downstream consumers.
+
+    Each changed channel gets <channel_name>.json with its added, edited and
+    deleted messages and newly downloaded files. manifest.json lists the
+    channels in the bundle and is marked complete when the run finishes.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self.run_id = self.started_at.strftime("%Y%m%dT%H%M%SZ")
+        # Two runs in the same second get distinct bundles
+        suffix = 1
+        while os.path.exists(out_path("deltas", self.run_id)):
+            suffix += 1
+            self.run_id = f"{self.started_at.strftime('%Y%m%dT%H%M%SZ')}_{suffix}"
+        self.dir = out_path("deltas", self.run_id)
+        self.channels = {}
+        self.channels_checked = 0
+
+    def record_channel(self, channel_id, channel_name, before, fetched, deleted=(), files=()):
+        """Diff the messages fetched for a channel against its saved ones and write its delta if anything changed."""
+        self.channels_checked += 1
+        if not (fetched or deleted or files):
+            return
+        added, edited, deleted = diff_messages(before, fetched, deleted)
+        if not (added or edited or deleted or files):
+            return
+        delta = {
+            "run_id": self.run_id,
+            "channel_id": channel_id,
+            "channel_name": channel_name,
+            "added": added,
+            "edited": edited,
+            "deleted": deleted,
+            "files": list(files),
+        }
+        os.makedirs(self.dir, exist_ok=True)
+        with open(os.path.join(self.dir, f"{channel_name}.json"), "w") as f:
+            json.dump(delta, f, indent=2)
+        self.channels[channel_id] = {
+            "channel_name": channel_name,
+            "path": f"{channel_name}.json",
+            "added": len(added),
+            "edited": len(edited),
+            "deleted": len(deleted),
+            "files": len(delta["files"]),
+        }
+        logging.info(f"Delta for {channel_name}: {len(added)} added, {len(edited)} edited, {len(deleted)} deleted, {len(delta['files'])} files")
+        self.write_manifest(complete=False)
+
+    def write_manifest(self, complete=True):
+        os.makedirs(self.dir, exist_ok=True)
+        manifest = {
+            "run_id": self.run_id,
+            "started_at": self.started_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "finished_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ") if complete else None,
+            "complete": complete,
+            "channels_checked": self.channels_checked,
+            "channels": self.channels,
+        }
+        with open(os.path.join(self.dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+def load_channel_messages(channel_name):
+    path = out_path(channel_name, "messages.json")
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return []
+
+def export_channel(channel, exported, checkpoint_file, deltas=None):
+    """Backfill or incrementally update one channel and its files, updating the checkpoint.
+
+    Returns the channel's saved messages, oldest first.
+    """
+    channel_id = channel['id']
+    channel_name = channel['name']
+    path = out_path(channel_name, "messages.json")
+    channel_checkpoint = exported.get(channel_id, {})
+    backfilled = channel_checkpoint.get('backfilled', False)
+    # Files are downloaded while history pages are still arriving
+    downloads = None if args.messages_only else FileDownloadQueue(channel_name, SLACK_BOT_TOKEN, args.download_workers, load_download_policy())
+    # Always backfill if not done yet
+    if not backfilled:
+        resume_latest = channel_checkpoint.get('resume_latest')
+        if resume_latest:
+            logging.info(f"\nChannel: {channel_name} ({channel_id}) - Resuming backfill from messages older than {resume_latest}.")
+        else:
+            logging.info(f"\nChannel: {channel_name} ({channel_id}) - Performing full backfill.")
+        # A resumed backfill already has part of the history on disk
+        before = load_channel_messages(channel_name) if deltas else []
+
+        def on_history_page(batch, channel_id=channel_id, downloads=downloads):
+            if downloads:
+                downloads.add(batch)
+            # Pages arrive newest first; record how far back the saved history reaches
+            if not DRY_RUN:
+                exported[channel_id] = {'backfilled': False, 'resume_latest': batch[-1]['ts']}
+                with open(checkpoint_file, "w") as f:
+                    json.dump(exported, f, indent=2)
+
+        messages, complete = fetch_full_history(channel_id, channel_name, latest=resume_latest, on_page=on_history_page)
+        saved_messages = save_channel_messages_batch(channel_name, messages)
+        # Post-save verification: log any fetched message not saved
+        saved_ts_set = set(msg['ts'] for msg in saved_messages)
+        for msg in messages:
+            if msg['ts'] not in saved_ts_set:
+                ts = float(msg['ts'])
+                dt = datetime.fromtimestamp(ts)
+                text = msg.get('text', '')
+                words = ' '.join(text.split()[:10])
+                logging.warning(f"Fetched but NOT SAVED: {dt}: {words}")
+        if downloads:
+            files_dir = downloads.files_dir
+            file_count = downloads.close()
+        else:
+            logging.info(f"[SKIP FILES] Skipping file downloads for channel: {channel_name}")
+        # Only set backfilled after a save of the complete history; an aborted
+        # backfill keeps its resume_latest and carries on next run
+        if complete:
+            exported[channel_id] = {
+                'backfilled': True,
+                'latest_ts': saved_messages[-1]['ts'] if saved_messages else None
+            }
+        else:
+            logging.warning(f"Backfill of {channel_name} stopped early; it will resume on the next run.")
+        with open(checkpoint_file, "w") as f:
+            json.dump(exported, f, indent=2)
+        if deltas:
+            deltas.record_channel(channel_id, channel_name, before, messages, files=downloads.downloaded_files if downloads else ())
+        if downloads:
+            logging.info(f"Finished channel {channel_name}: {len(saved_messages)} messages, {file_count} files downloaded.")
+            logging.info(f"Messages JSON saved under {path}")
+            logging.info(f"Files downloaded under {files_dir}")
+        else:
+            logging.info(f"Finished channel {channel_name}: {len(saved_messages)} messages.")
+            logging.info(f"Messages JSON saved under {path}")
+        return saved_messages
+    # If already backfilled, only fetch newer messages
+    logging.info(f"\nChannel: {channel_name} ({channel_id}) - Already backfilled, checking for new messages.")
+    existing_messages = []
+    latest_saved_ts = None
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            existing_messages = json.load(f)
+        if existing_messages:
+            latest_saved_ts = existing_messages[-1]['ts']
+    # The checkpoint only advances after a complete fetch, so it never skips past a hole
+    latest_saved_ts = channel_checkpoint.get('latest_ts') or latest_saved_ts
+    if latest_saved_ts and args.reconcile_days:
+        return reconcile_channel(channel_id, channel_name, existing_messages, latest_saved_ts, args.reconcile_days, downloads, exported, checkpoint_file, deltas)
+    on_page = downloads.add if downloads else None
+    newer_messages, complete = fetch_messages_newer(channel_id, channel_name, latest_saved_ts, on_page=on_page) if latest_saved_ts else ([], True)
+    if newer_messages:
+        all_messages = existing_messages + newer_messages
+        all_messages = {msg['ts']: msg for msg in all_messages}.values()
+        all_messages = sorted(all_messages, key=lambda m: float(m['ts']))
+        save_channel_messages_batch(channel_name, list(all_messages))
+        # Also waits for downloads left pending by an interrupted run
+        file_count = downloads.close() if downloads else 0
+        if complete:
+            exported[channel_id]['latest_ts'] = all_messages[-1]['ts'] if all_messages else latest_saved_ts
+        else:
+            logging.warning(f"Fetching new messages for {channel_name} stopped early; the next run will fetch from {latest_saved_ts} again.")
+        with open(checkpoint_file, "w") as f:
+            json.dump(exported, f, indent=2)
+        logging.info(f"Updated channel {channel_name}: {len(all_messages)} messages, {file_count} new files downloaded.")
+    else:
+        all_messages = existing_messages
+        file_count = downloads.close() if downloads else 0
+        logging.info(f"No new messages for channel {channel_name}." + (f" {file_count} pending files downloaded." if file_count else ""))
+    if deltas:
+        deltas.record_channel(channel_id, channel_name, existing_messages, newer_messages, files=downloads.downloaded_files if downloads else ())
+    return all_messages
+
+def reconcile_messages(existing, fetched, window_start, complete):
+    """Apply a fresh fetch of everything after window_start to the saved messages.
+
+    Messages whose content changed (edits, reactions, reply counts) replace
+    the saved copy; saved messages in the window that Slack no longer returns
+    are dropped, but only if the fetch was complete. Returns
+    (messages, added, edited_count, deleted_ts).
+    """
+    fetched_by_ts = {msg['ts']: msg for msg in fetched}
+    messages = []
+    edited = 0
+    deleted = []
+    for msg in existing:
+        fresh = fetched_by_ts.pop(msg['ts'], None)
+        if fresh is not None:
+            # ts_human is added locally; keep it so it doesn't count as a change
+            if 'ts_human' in msg:
+                fresh['ts_human'] = msg['ts_human']
+            if message_changed(msg, fresh):
+                logging.info(f"EDITED:       {datetime.fromtimestamp(float(msg['ts']))}: {' '.join(fresh.get('text', '').split()[:10])}")
+                edited += 1
+                msg = fresh
+            messages.append(msg)
+        elif complete and float(msg['ts']) > float(window_start):
+            logging.info(f"DELETED:      {datetime.fromtimestamp(float(msg['ts']))}: {' '.join(msg.get('text', '').split()[:10])}")
+            deleted.append(msg['ts'])
+        else:
+            messages.append(msg)
+    added = sorted(fetched_by_ts.values(), key=lambda m: float(m['ts']))
+    messages = sorted(messages + added, key=lambda m: float(m['ts']))
+    return messages, added, edited, deleted
+
+def reconcile_channel(channel_id, channel_name, existing_messages, latest_saved_ts, days, downloads, exported, checkpoint_file, deltas=None):
+    """Re-fetch the last `days` days plus anything newer and write back only if something changed.
+
+    Returns the channel's messages after reconciliation.
+    """
+    reconcile_from = f"{min(float(latest_saved_ts), time.time() - days * 86400):.6f}"
+    logging.info(f"Reconciling {channel_name} from {datetime.fromtimestamp(float(reconcile_from))}")
+    on_page = None
+    if downloads:
+        # Files of messages already in the archive were queued when they were first fetched
+        existing_ts = {msg['ts'] for msg in existing_messages}
+        on_page = lambda batch: downloads.add([msg for msg in batch if msg['ts'] not in existing_ts])
+    fetched, complete = fetch_messages_newer(channel_id, channel_name, reconcile_from, on_page=on_page)
+    messages, added, edited, deleted = reconcile_messages(existing_messages, fetched, reconcile_from, complete)
+    if added or edited or deleted:
+        save_channel_messages_two_way(channel_name, [], messages, [])
+    file_count = downloads.close() if downloads else 0
+    if complete:
+        exported[channel_id]['latest_ts'] = messages[-1]['ts'] if messages else latest_saved_ts
+    else:
+        logging.warning(f"Reconciling {channel_name} stopped early; deletions were not applied and the next run will fetch from {latest_saved_ts} again.")
+    with open(checkpoint_file, "w") as f:
+        json.dump(exported, f, indent=2)
+    if deltas:
+        deltas.record_channel(channel_id, channel_name, existing_messages, fetched, deleted, downloads.downloaded_files if downloads else ())
+    logging.info(f"Reconciled channel {channel_name}: {len(added)} new, {edited} edited, {len(deleted)} deleted, {file_count} files downloaded.")
     return messages
 
-def main():
-    if not SKIP_USERS:
-        users = fetch_all_users()
-        save_users_and_avatars(users)
-    channels = list_channels()
-    logging.info(f"Found {len(channels)} channels.")
-    member_channels = [c for c in channels if c.get('is_member')]
+def find_gaps(messages, gap_factor=50, min_gap=86400):
+    """Return (oldest, latest) ts pairs around suspiciously long silences in a channel's saved history.
+
+    The channel's cadence is the median time between its messages; a gap
+    longer than gap_factor times that, and at least min_gap seconds, is
+    suspicious. Windows are returned longest first.
+    """
+    ts = sorted((msg['ts'] for msg in messages), key=float)
+    gaps = [(float(b) - float(a), a, b) for a, b in zip(ts, ts[1:])]
+    if not gaps:
+        return []
+    cadence = statistics.median(gap for gap, _, _ in gaps)
+    threshold = max(min_gap, gap_factor * cadence)
+    return [(a, b) for gap, a, b in sorted(gaps, reverse=True) if gap > threshold]
+
+def _window_verified(window, verified):
+    oldest, latest = window
+    for v_oldest, v_latest in verified:
+        if (v_oldest is None or (oldest is not None and float(oldest) >= float(v_oldest))) and float(latest) <= float(v_latest):
+            return True
+    return False
+
+def repair_channel(channel, exported, checkpoint_file, deltas=None, gap_factor=50, min_gap=86400, max_windows=25):
+    """Re-fetch only the suspicious windows of a backfilled channel and merge anything that was missing.
+
+    Checks the range before the first saved message and the longest gaps
+    against the channel's cadence. Windows that were fetched completely are
+    remembered in the checkpoint as verified_windows and not checked again.
+    """
+    channel_id = channel['id']
+    channel_name = channel['name']
+    checkpoint = exported.get(channel_id, {})
+    if not checkpoint.get('backfilled'):
+        logging.info(f"Skipping repair of {channel_name}: backfill not finished yet.")
+        return
+    messages = load_channel_messages(channel_name)
+    if not messages:
+        logging.info(f"Skipping repair of {channel_name}: no saved messages.")
+        return
+    verified = [tuple(window) for window in checkpoint.get('verified_windows', [])]
+    windows = []
+    first_ts = min((msg['ts'] for msg in messages), key=float)
+    created = channel.get('created')
+    # Anything between the channel's creation and the first saved message
+    if not created or float(created) < float(first_ts) - 1:
+        windows.append((str(created) if created else None, first_ts))
+    windows += find_gaps(messages, gap_factor, min_gap)
+    windows = [window for window in windows if not _window_verified(window, verified)][:max_windows]
+    if not windows:
+        logging.info(f"No unverified gaps in {channel_name}.")
+        return
+    logging.info(f"Repairing {channel_name}: checking {len(windows)} windows.")
+
+    downloads = None if args.messages_only else FileDownloadQueue(channel_name, SLACK_BOT_TOKEN, args.download_workers, load_download_policy())
+    recovered = []
+    for oldest, latest in windows:
+        found, complete = fetch_messages_older(channel_id, channel_name, latest, oldest=oldest, on_page=downloads.add if downloads else None)
+        if found:
+            logging.warning(f"Recovered {len(found)} missing messages in {channel_name} between {oldest or 'the start'} and {latest}.")
+            recovered += found
+        if complete:
+            verified.append((oldest, latest))
+    if recovered:
+        for msg in recovered:
+            msg['ts_human'] = datetime.fromtimestamp(float(msg['ts'])).strftime('%Y-%m-%d %H:%M:%S')
+        save_channel_messages_batch(channel_name, recovered)
+    file_count = downloads.close() if downloads else 0
+    if deltas:
+        deltas.record_channel(channel_id, channel_name, messages, recovered, files=downloads.downloaded_files if downloads else ())
+    if not DRY_RUN:
+        checkpoint['verified_windows'] = [list(window) for window in verified]
+        with open(checkpoint_file, "w") as f:
+            json.dump(exported, f, indent=2)
+    logging.info(f"Repaired {channel_name}: {len(recovered)} messages recovered, {file_count} files downloaded.")
+
+def select_channels():
+    """The bot's channels, narrowed to export_config.json if it lists any, or None if they couldn't all be listed."""
+    member_channels = list_member_channels(exclude_archived=args.exclude_archived)
+    if member_channels is None:
+        return None
+    logging.info(f"Found {len(member_channels)} channels the bot is a member of.")
     config_channel_ids = load_export_config()
     if config_channel_ids:
         member_channels = [c for c in member_channels if c['id'] in config_channel_ids]
         logging.info(f"Exporting from {len(member_channels)} channels specified in export_config.json.")
     else:
         logging.info(f"Exporting from {len(member_channels)} channels where bot is a member.")
+    return member_channels
+
+def poll_interval(messages, found_new, min_interval, max_interval, now=None):
+    """Seconds until a channel is polled again, shorter the busier it has been over the past week.
+
+    A channel that just had new messages is checked again after min_interval;
+    otherwise max_interval is divided by (1 + messages per day over the last
+    7 days), so a dormant channel waits max_interval and one with a few dozen
+    messages a day comes round every few minutes.
+    """
+    if found_new:
+        return min_interval
+    week_ago = (now or time.time()) - 7 * 86400
+    recent = 0
+    for msg in reversed(messages):
+        if float(msg['ts']) < week_ago:
+            break
+        recent += 1
+    return max(min_interval, min(max_interval, max_interval / (1 + recent / 7)))
+
+def watch():
+    """Keep the archive fresh, polling channels in order of when they are next due.
+
+    The client, channel list, checkpoints and polling schedule stay in memory.
+    Every Slack call is drawn from a shared per-minute budget, so busy
+    channels get polled more often without going over the API limits.
+    """
+    RETRY_POLICY.budget = ApiBudget(args.api_budget)
+    exported = load_exported_channels(CHECKPOINT_FILE)
+    channels = {}
+    schedule = []
+    next_refresh = 0
+    deltas = None
+    logging.info(f"Watching channels every {args.min_interval:g}-{args.max_interval:g}s within {args.api_budget:g} Slack calls per minute")
+    try:
+        while True:
+            now = time.time()
+            if now >= next_refresh:
+                # Pick up channels the bot has joined or left
+                _member_channels_cache.clear()
+                selected = select_channels()
+                if selected is None:
+                    # Keep polling the known channels and try the listing again soon
+                    next_refresh = now + min(args.channel_refresh, 60)
+                    logging.warning(f"Channel refresh failed; keeping {len(channels)} known channels and retrying in {next_refresh - now:.0f}s")
+                else:
+                    current = {c['id']: c for c in selected}
+                    for channel_id in current.keys() - channels.keys():
+                        heapq.heappush(schedule, (now, channel_id))
+                    channels = current
+                    next_refresh = now + args.channel_refresh
+            if deltas is None or now - deltas.started_at.timestamp() >= args.delta_interval:
+                if deltas and deltas.channels:
+                    deltas.write_manifest()
+                deltas = None if (DRY_RUN or args.no_deltas) else DeltaBundle()
+            if not schedule:
+                time.sleep(min(60, max(1, next_refresh - now)))
+                continue
+            due, channel_id = heapq.heappop(schedule)
+            if channel_id not in channels:
+                continue
+            if due > now:
+                heapq.heappush(schedule, (due, channel_id))
+                time.sleep(min(due - now, 60, max(1, next_refresh - now)))
+                continue
+            channel = channels[channel_id]
+            latest_before = exported.get(channel_id, {}).get('latest_ts')
+            try:
+                with RETRY_POLICY.channel(channel_id):
+                    messages = export_channel(channel, exported, CHECKPOINT_FILE, deltas)
+                found_new = exported.get(channel_id, {}).get('latest_ts') != latest_before
+                interval = poll_interval(messages, found_new, args.min_interval, args.max_interval)
+            except Exception as e:
+                # One broken channel must not stop the daemon
+                logging.error(f"Error polling {channel['name']}: {e}")
+                interval = min(args.max_interval, 4 * args.min_interval)
+            logging.info(f"Next poll of {channel['name']} in {interval:.0f}s")
+            heapq.heappush(schedule, (time.time() + interval, channel_id))
+    except KeyboardInterrupt:
+        logging.info("Stopping watch mode.")
+    finally:
+        if deltas and deltas.channels:
+            deltas.write_manifest()
+
+def main():
+    if args.redownload_list:
+        redownload_files(args.redownload_list)
+        return
+    if not SKIP_USERS:
+        users = fetch_all_users()
+        save_users_and_avatars(users, download_avatars=not args.replay_api)
+    if args.watch:
+        watch()
+        return
+    member_channels = select_channels()
+    if member_channels is None:
+        logging.error("Couldn't list the bot's channels; nothing was exported. Try again later.")
+        return
+    if args.repair:
+        exported = load_exported_channels(CHECKPOINT_FILE)
+        deltas = None if (DRY_RUN or args.no_deltas) else DeltaBundle()
+        for channel in member_channels:
+            with RETRY_POLICY.channel(channel['id']):
+                repair_channel(channel, exported, CHECKPOINT_FILE, deltas, args.gap_factor, args.min_gap_hours * 3600, args.max_repair_windows)
+        if deltas:
+            deltas.write_manifest()
+        return
     exported = load_exported_channels(CHECKPOINT_FILE)
     checkpoint_file = CHECKPOINT_FILE
+    deltas = None if (DRY_RUN or args.no_deltas) else DeltaBundle()
     for channel in member_channels:
-        channel_id = channel['id']
-        channel_name = channel['name']
-        path = out_path(channel_name, "messages.json")
-        channel_checkpoint = exported.get(channel_id, {})
-        backfilled = channel_checkpoint.get('backfilled', False)
-        # Always backfill if not done yet
-        if not backfilled:
-            logging.info(f"\nChannel: {channel_name} ({channel_id}) - Performing full backfill.")
-            messages = fetch_full_history(channel_id, channel_name)
-            saved_messages = save_channel_messages_batch(channel_name, messages)
-            # Post-save verification: log any fetched message not saved
-            saved_ts_set = set(msg['ts'] for msg in saved_messages)
-            for msg in messages:
-                if msg['ts'] not in saved_ts_set:
-                    ts = float(msg['ts'])
-                    dt = datetime.fromtimestamp(ts)
-                    text = msg.get('text', '')
-                    words = ' '.join(text.split()[:10])
-                    logging.warning(f"Fetched but NOT SAVED: {dt}: {words}")
-            if not args.messages_only:
-                files_dir = out_path(channel_name, 'files')
-                file_count = 0
-                for msg in saved_messages:
-                    for file_info in msg.get('files', []):
-                        if not DRY_RUN:
-                            download_file(file_info, SLACK_BOT_TOKEN, files_dir)
-                            file_count += 1
-                    else:
-                        logging.info(f"[DRY RUN] Would download file: {file_info.get('name')}")
-            else:
-                logging.info(f"[SKIP FILES] Skipping file downloads for channel: {channel_name}")
-            # Only set backfilled after successful save
-            exported[channel_id] = {
-                'backfilled': True,
-                'latest_ts': saved_messages[-1]['ts'] if saved_messages else None
-            }
-            with open(checkpoint_file, "w") as f:
-                json.dump(exported, f, indent=2)
-            if not args.messages_only and 'file_count' in locals():
-                logging.info(f"Finished channel {channel_name}: {len(saved_messages)} messages, {file_count} files downloaded.")
-                logging.info(f"Messages JSON saved under {path}")
-                logging.info(f"Files downloaded under {files_dir}")
-            else:
-                logging.info(f"Finished channel {channel_name}: {len(saved_messages)} messages.")
-                logging.info(f"Messages JSON saved under {path}")
+        # Retries for one channel share a budget so a broken channel can't stall the run
+        with RETRY_POLICY.channel(channel['id']):
+            export_channel(channel, exported, checkpoint_file, deltas)
+        if not args.replay_api:
             time.sleep(1)
-            continue
-        # If already backfilled, only fetch newer messages
-        logging.info(f"\nChannel: {channel_name} ({channel_id}) - Already backfilled, checking for new messages.")
-        existing_messages = []
-        latest_saved_ts = None
-        if os.path.exists(path):
-            with open(path, "r") as f:
-                existing_messages = json.load(f)
-            if existing_messages:
-                latest_saved_ts = existing_messages[-1]['ts']
-        newer_messages = fetch_messages_newer(channel_id, channel_name, latest_saved_ts) if latest_saved_ts else []
-        if newer_messages:
-            all_messages = existing_messages + newer_messages
-            all_messages = {msg['ts']: msg for msg in all_messages}.values()
-            all_messages = sorted(all_messages, key=lambda m: float(m['ts']))
-            save_channel_messages_batch(channel_name, list(all_messages))
-            files_dir = out_path(channel_name, 'files')
-            file_count = 0
-            for msg in newer_messages:
-                for file_info in msg.get('files', []):
-                    if not DRY_RUN:
-                        download_file(file_info, SLACK_BOT_TOKEN, files_dir)
-                        file_count += 1
-                    else:
-                        logging.info(f"[DRY RUN] Would download file: {file_info.get('name')}")
-            exported[channel_id]['latest_ts'] = all_messages[-1]['ts'] if all_messages else latest_saved_ts
-            with open(checkpoint_file, "w") as f:
-                json.dump(exported, f, indent=2)
-            logging.info(f"Updated channel {channel_name}: {len(all_messages)} messages, {file_count} new files downloaded.")
-        else:
-            logging.info(f"No new messages for channel {channel_name}.")
-        time.sleep(1)
+    if deltas:
+        deltas.write_manifest()
+        logging.info(f"Delta bundle for run {deltas.run_id}: {len(deltas.channels)} changed channels under {deltas.dir}")
+    if args.replay_api:
+        logging.info(f"Replayed {RETRY_POLICY.cache.hits} recorded responses; {RETRY_POLICY.cache.misses} calls had no recording.")
 
-if __name__ == "__main__":
+def cli(argv=None, prog=None):
+    configure(argv, prog)
     main()
+
+if __name__ == "__main__":
+    cli()
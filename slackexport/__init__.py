@@ -0,0 +1,44 @@
+"""Slack export tools as one package.
+
+The tools themselves are top-level modules (slack_exporter.py, slack2pdf.py,
+...), installed alongside this package by pyproject.toml, so the scripts keep
+working on their own. This package adds the unified `slackexport <command>`
+CLI and lazy access to the main entry points: `slackexport.render_pdf`
+imports slack2pdf, and with it reportlab, only when it is first used.
+"""
+import importlib
+
+# Public name -> (module, attribute)
+_EXPORTS = {
+    'configure_exporter': ('slack_exporter', 'configure'),
+    'export': ('slack_exporter', 'main'),
+    'fetch_all_users': ('export_users_metadata', 'fetch_all_users'),
+    'list_channels': ('export_channels_metadata', 'list_channels'),
+    'inspect_messages': ('inspect_messages_json', 'inspect_messages'),
+    'print_sample_messages': ('sample_messages_json', 'print_sample_messages'),
+    'count_messages_with_files': ('count_messages_with_files', 'count_messages_with_files'),
+    'render_pdf': ('slack2pdf', 'main'),
+    'render_pdf_batch': ('slack2pdf', 'main_batch'),
+    'render_html': ('slack2html', 'main'),
+    'resize_avatars': ('resize_avatars', 'resize_avatars'),
+    'export_dataset': ('export_parquet', 'main'),
+    'analyse': ('workspace_analytics', 'main'),
+    'verify_files': ('verify_files', 'main'),
+    'RetryPolicy': ('retry_policy', 'RetryPolicy'),
+    'ApiCache': ('api_cache', 'ApiCache'),
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    module_name, attribute = _EXPORTS[name]
+    value = getattr(importlib.import_module(module_name), attribute)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
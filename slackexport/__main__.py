@@ -0,0 +1,5 @@
+import sys
+
+from slackexport.cli import main
+
+sys.exit(main())
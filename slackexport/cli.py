@@ -0,0 +1,50 @@
+"""The `slackexport` command: one entry point that dispatches to the tool modules.
+
+Each command's module is imported only when that command runs, so
+`slackexport inspect` never loads reportlab or slack_sdk.
+"""
+import importlib
+import sys
+
+# Command -> (module with a cli(argv, prog) function, summary)
+COMMANDS = {
+    'export': ('slack_exporter', 'Export channel messages and files from Slack'),
+    'users': ('export_users_metadata', 'Export users.json and download avatars'),
+    'channels': ('export_channels_metadata', 'Export channels.json'),
+    'list-channels': ('list_channels_metadata', 'Print the channels and whether the bot is a member of each'),
+    'inspect': ('inspect_messages_json', 'Print the message count and time range of a messages.json'),
+    'sample': ('sample_messages_json', 'Print the first and last messages of a messages.json'),
+    'count-files': ('count_messages_with_files', 'Count messages with file attachments'),
+    'pdf': ('slack2pdf', 'Render messages.json files as PDF transcripts'),
+    'html': ('slack2html', 'Render the export as a static HTML archive'),
+    'avatars': ('resize_avatars', 'Resize downloaded avatars for the PDF renderer'),
+    'parquet': ('export_parquet', 'Convert the export into a Parquet/Arrow dataset'),
+    'analytics': ('workspace_analytics', 'Workspace activity analytics'),
+    'verify': ('verify_files', 'Verify downloaded files and write a re-download list'),
+    'benchmark': ('benchmark_slack2pdf', 'Benchmark slack2pdf on synthetic data'),
+}
+
+
+def usage():
+    width = max(len(name) for name in COMMANDS)
+    lines = ['usage: slackexport <command> [options]', '', 'commands:']
+    lines += [f'  {name.ljust(width)}  {summary}' for name, (_, summary) in COMMANDS.items()]
+    lines += ['', "Run 'slackexport <command> --help' for a command's options."]
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ('-h', '--help', 'help'):
+        print(usage())
+        return 0
+    command, rest = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f'slackexport: unknown command {command!r}\n\n{usage()}', file=sys.stderr)
+        return 2
+    module = importlib.import_module(COMMANDS[command][0])
+    return module.cli(rest, prog=f'slackexport {command}')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
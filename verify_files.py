@@ -0,0 +1,231 @@
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import sys
+
+logging.basicConfig(level=logging.INFO)
+
+CACHE_FILE = '.verify_cache.json'
+# Slack serves its sign-in page with HTTP 200 when a token can't read a file
+HTML_PREFIXES = (b'<!doctype html', b'<html')
+# slack_exporter.download_file writes to .part-XXXX.part and renames it when done
+DOWNLOAD_TEMP_PREFIX = '.part-'
+DOWNLOAD_TEMP_SUFFIX = '.part'
+
+
+def load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        logging.warning(f'Could not read {path}; ignoring it')
+        return default
+
+
+def hash_file(path):
+    """Return (sha256 hex digest, whether the file starts like an HTML page)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        head = f.read(1024)
+        digest.update(head)
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest(), head.lstrip().lower().startswith(HTML_PREFIXES)
+
+
+def find_channel_dirs(export_root):
+    """Every channel directory (messages.json plus a file manifest.json) under export_root, sorted by name."""
+    dirs = []
+    for dirpath, dirnames, filenames in os.walk(export_root):
+        # Delta bundles have a manifest.json of their own
+        if 'manifest.json' in filenames and 'messages.json' in filenames:
+            dirs.append(dirpath)
+            # A channel's files/ directory never holds another channel
+            dirnames[:] = [d for d in dirnames if d != 'files']
+    return sorted(dirs)
+
+
+def slack_files(channel_dir):
+    """{file id: file object} for every attachment in the channel's messages.json."""
+    files = {}
+    for msg in load_json(os.path.join(channel_dir, 'messages.json'), []):
+        for file_info in msg.get('files') or []:
+            if isinstance(file_info, dict) and file_info.get('id'):
+                files[file_info['id']] = file_info
+    return files
+
+
+def check_channel(channel_dir, export_root, include_undownloaded=False, include_skipped=False):
+    """Check a channel's files against its manifest and Slack's metadata without hashing.
+
+    Returns (problems, present, leftovers): re-download entries, (relative
+    path, file id, file object) for files that still need a content check, and
+    temporary files left behind by interrupted downloads.
+    """
+    channel = os.path.relpath(channel_dir, export_root)
+    files_dir = os.path.join(channel_dir, 'files')
+    manifest = load_json(os.path.join(channel_dir, 'manifest.json'), {})
+    files = slack_files(channel_dir)
+    problems = []
+    present = []
+
+    def problem(file_id, name, path, reason, detail=None):
+        entry = {'channel': channel, 'id': file_id, 'name': name, 'path': path, 'reason': reason}
+        if detail:
+            entry['detail'] = detail
+        entry['file'] = files.get(file_id)
+        problems.append(entry)
+
+    for file_id, entry in manifest.items():
+        if entry.get('skipped'):
+            # Left out by the exporter's download policy
+            if include_skipped:
+                problem(file_id, entry.get('original_name'), None, 'skipped', entry['skipped'])
+            continue
+        path = os.path.join(files_dir, entry.get('saved_path') or '')
+        rel_path = os.path.relpath(path, export_root)
+        file_info = files.get(file_id) or {}
+        if not entry.get('saved_path') or not os.path.isfile(path):
+            problem(file_id, entry.get('original_name'), rel_path, 'missing')
+            continue
+        size = os.path.getsize(path)
+        # Slack's size is the original's, not its thumbnail's
+        expected = file_info.get('size') if entry.get('variant', 'full') == 'full' else None
+        if expected is not None and size != int(expected):
+            problem(file_id, entry.get('original_name'), rel_path, 'truncated' if size < int(expected) else 'size_mismatch',
+                    f'{size} bytes on disk, Slack reports {expected}')
+            continue
+        present.append((rel_path, file_id, file_info))
+
+    # Downloads that failed outright
+    failed = set()
+    for error in load_json(os.path.join(channel_dir, 'errors.json'), []):
+        file_id = error.get('id')
+        if file_id and file_id not in manifest and file_id not in failed:
+            failed.add(file_id)
+            problem(file_id, error.get('name'), None, 'download_failed', error.get('error'))
+
+    if include_undownloaded:
+        reported = {entry['id'] for entry in problems}
+        for file_id, file_info in files.items():
+            if file_id not in manifest and file_id not in reported and file_info.get('url_private'):
+                problem(file_id, file_info.get('name'), None, 'not_downloaded')
+
+    # A download temp file that is still there never finished
+    saved = {os.path.normpath(entry.get('saved_path') or '') for entry in manifest.values()}
+    leftovers = []
+    for dirpath, _, filenames in os.walk(files_dir):
+        for name in filenames:
+            rel_path = os.path.relpath(os.path.join(dirpath, name), files_dir)
+            if name.startswith(DOWNLOAD_TEMP_PREFIX) and name.endswith(DOWNLOAD_TEMP_SUFFIX) and rel_path not in saved:
+                leftovers.append(os.path.join(dirpath, name))
+    return problems, present, leftovers
+
+
+def main(export_root, output_path=None, jobs=None, hash_files=True, include_undownloaded=False, remove_leftovers=False, include_skipped=False, rehash=False):
+    """Verify every channel's downloaded files and write the re-download list.
+
+    New or changed files are hashed and their SHA-256 recorded in the cache.
+    With rehash, unchanged files are hashed again and compared with the
+    recorded hash, which catches corruption that leaves size and mtime alone.
+    Returns the number of problems found.
+    """
+    export_root = os.path.abspath(export_root)
+    output_path = output_path or os.path.join(export_root, 'redownload.json')
+    cache_path = os.path.join(export_root, CACHE_FILE)
+    cache = load_json(cache_path, {})
+
+    problems = []
+    present = []
+    leftovers = []
+    channel_dirs = find_channel_dirs(export_root)
+    for channel_dir in channel_dirs:
+        channel_problems, channel_present, channel_leftovers = check_channel(channel_dir, export_root, include_undownloaded, include_skipped)
+        problems += channel_problems
+        present += [(channel_dir, *item) for item in channel_present]
+        leftovers += channel_leftovers
+    logging.info(f'Checked {len(channel_dirs)} channels: {len(present)} files present, {len(problems)} missing, truncated or failed')
+    for path in leftovers:
+        if remove_leftovers:
+            os.remove(path)
+            logging.info(f'Removed unfinished download {path}')
+        else:
+            logging.warning(f'Unfinished download left behind: {path} (remove with --remove-leftovers)')
+
+    if hash_files:
+        new_cache = {}
+        to_hash = []
+        recorded = {}
+        for channel_dir, rel_path, file_id, file_info in present:
+            stat = os.stat(os.path.join(export_root, rel_path))
+            cached = cache.get(rel_path)
+            if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns and cached.get('sha256'):
+                new_cache[rel_path] = cached
+                if not rehash:
+                    continue
+                recorded[rel_path] = cached['sha256']
+            else:
+                new_cache[rel_path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+            to_hash.append(rel_path)
+        logging.info(f'Hashing {len(to_hash) - len(recorded)} new or changed files and re-checking {len(recorded)} '
+                     f'({len(present) - len(to_hash)} cached)')
+        mismatched = set()
+        if to_hash:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+                paths = [os.path.join(export_root, rel_path) for rel_path in to_hash]
+                for rel_path, (sha256, is_html) in zip(to_hash, executor.map(hash_file, paths, chunksize=16)):
+                    if rel_path in recorded:
+                        # Keep the recorded hash so the file stays reported until it is replaced
+                        if sha256 != recorded[rel_path]:
+                            mismatched.add(rel_path)
+                    else:
+                        new_cache[rel_path].update(sha256=sha256, html=is_html)
+        for channel_dir, rel_path, file_id, file_info in present:
+            is_html_file = 'html' in (file_info.get('mimetype') or '') or file_info.get('filetype') == 'html'
+            reason = None
+            if rel_path in mismatched:
+                reason = 'hash_mismatch'
+            elif new_cache[rel_path]['html'] and not is_html_file:
+                reason = 'html_error_page'
+            if reason:
+                problems.append({'channel': os.path.relpath(channel_dir, export_root), 'id': file_id, 'name': file_info.get('name'),
+                                 'path': rel_path, 'reason': reason, 'file': file_info or None})
+        tmp_path = cache_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(new_cache, f)
+        os.replace(tmp_path, cache_path)
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(problems, f, indent=2)
+    counts = {}
+    for entry in problems:
+        counts[entry['reason']] = counts.get(entry['reason'], 0) + 1
+    summary = ', '.join(f'{count} {reason}' for reason, count in sorted(counts.items())) or 'no problems'
+    logging.info(f'{summary}; re-download list written to {output_path}')
+    return len(problems)
+
+
+def cli(argv=None, prog=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog=prog, description="Verify downloaded Slack files against each channel's manifest and write a re-download list.")
+    parser.add_argument('export_root', help='Export root containing one directory per channel')
+    parser.add_argument('--output', help='Where to write the re-download list (default: <export_root>/redownload.json)')
+    parser.add_argument('--jobs', type=int, help='Hashing processes (default: number of cores)')
+    parser.add_argument('--no-hash', action='store_true', help='Only check existence and size; skip hashing and the HTML error-page check')
+    parser.add_argument('--include-undownloaded', action='store_true', help='Also list files in messages.json that were never downloaded')
+    parser.add_argument('--include-skipped', action='store_true', help="Also list files the exporter's download policy skipped, to fetch them in full")
+    parser.add_argument('--rehash', action='store_true', help='Re-hash unchanged files too and report any whose content no longer matches the recorded hash')
+    parser.add_argument('--remove-leftovers', action='store_true', help='Delete temporary files left behind by interrupted downloads')
+    args = parser.parse_args(argv)
+    if args.rehash and args.no_hash:
+        parser.error('--rehash cannot be combined with --no-hash')
+    problem_count = main(args.export_root, args.output, args.jobs, not args.no_hash, args.include_undownloaded, args.remove_leftovers, args.include_skipped, args.rehash)
+    return 1 if problem_count else 0
+
+
+if __name__ == '__main__':
+    sys.exit(cli())
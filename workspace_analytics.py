@@ -0,0 +1,288 @@
+import concurrent.futures
+import csv
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+
+from slack2pdf import find_messages_files, load_json
+
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+
+class Activity:
+    """One row per message across the workspace, as parallel NumPy arrays.
+
+    users and channels hold the names; user and channel are int32 codes into them.
+    """
+
+    def __init__(self, ts, user, channel, file_count, file_bytes, users, channels):
+        self.ts = ts
+        self.user = user
+        self.channel = channel
+        self.file_count = file_count
+        self.file_bytes = file_bytes
+        self.users = users
+        self.channels = channels
+
+    def __len__(self):
+        return len(self.ts)
+
+
+def load_channel_arrays(messages_json_path):
+    """Read the fields analytics needs from one messages.json.
+
+    Returns (channel_name, ts, user_names, user_codes, file_count, file_bytes).
+    """
+    channel_name = os.path.basename(os.path.dirname(os.path.abspath(messages_json_path)))
+    messages = [msg for msg in load_json(messages_json_path) if 'ts' in msg]
+    ts = np.fromiter((float(msg['ts']) for msg in messages), dtype=np.float64, count=len(messages))
+    user_names, user_codes = np.unique(np.array([msg.get('user') or msg.get('bot_id') or 'unknown' for msg in messages], dtype=object), return_inverse=True)
+    file_count = np.zeros(len(messages), dtype=np.int32)
+    file_bytes = np.zeros(len(messages), dtype=np.int64)
+    for i, msg in enumerate(messages):
+        files = msg.get('files')
+        if files:
+            files = [f for f in files if isinstance(f, dict)]
+            file_count[i] = len(files)
+            file_bytes[i] = sum(int(f.get('size') or 0) for f in files)
+    return channel_name, ts, list(user_names), user_codes.astype(np.int32), file_count, file_bytes
+
+
+def load_export(export_root, jobs=None):
+    """Load every channel under export_root into an Activity, parsing channels in parallel."""
+    paths = find_messages_files(export_root)
+    jobs = min(jobs or os.cpu_count() or 1, max(1, len(paths)))
+    users = {}
+    parts = []
+    channels = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        for channel_name, ts, user_names, user_codes, file_count, file_bytes in executor.map(load_channel_arrays, paths):
+            # Map the channel's own user codes onto workspace-wide ones
+            remap = np.array([users.setdefault(name, len(users)) for name in user_names], dtype=np.int32)
+            channel_code = np.full(len(ts), len(channels), dtype=np.int32)
+            channels.append(channel_name)
+            parts.append((ts, remap[user_codes] if len(ts) else user_codes, channel_code, file_count, file_bytes))
+    return concat_activity(parts, list(users), channels)
+
+
+def load_dataset(dataset_dir):
+    """Load an export_parquet.py dataset, reading only the needed columns."""
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    fmt = 'parquet' if any(name.endswith('.parquet') for _, _, names in os.walk(dataset_dir) for name in names) else 'feather'
+    table = ds.dataset(dataset_dir, format=fmt, partitioning='hive').to_table(columns=['time', 'user', 'channel', 'file_count', 'file_bytes'])
+    user = pc.fill_null(table['user'], 'unknown').combine_chunks().dictionary_encode()
+    channel = table['channel'].combine_chunks().dictionary_encode()
+    ts = table['time'].combine_chunks().cast('int64').to_numpy() / 1e6
+    parts = [(ts, user.indices.to_numpy().astype(np.int32), channel.indices.to_numpy().astype(np.int32),
+              table['file_count'].to_numpy().astype(np.int32), table['file_bytes'].to_numpy().astype(np.int64))]
+    return concat_activity(parts, user.dictionary.to_pylist(), channel.dictionary.to_pylist())
+
+
+def concat_activity(parts, users, channels):
+    if not parts:
+        empty = np.zeros(0)
+        return Activity(empty, empty.astype(np.int32), empty.astype(np.int32), empty.astype(np.int32), empty.astype(np.int64), users, channels)
+    columns = [np.concatenate(column) for column in zip(*parts)]
+    return Activity(*columns, users, channels)
+
+
+def daily_index(ts, utc_offset_hours):
+    """Whole days since the epoch in the requested UTC offset."""
+    return np.floor_divide(ts + utc_offset_hours * 3600, 86400).astype(np.int64)
+
+
+def day_label(day):
+    return datetime.fromtimestamp(int(day) * 86400, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+def grouped_counts(keys, weights=None):
+    """Sparse counterpart of bincount: (unique keys, counts[, summed weights])."""
+    unique, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    if weights is None:
+        return unique, counts
+    return unique, counts, np.bincount(inverse, weights=weights, minlength=len(unique))
+
+
+def analyse(activity, utc_offset_hours=0, top=25):
+    """Compute every summary in one vectorized pass over the arrays."""
+    day = daily_index(activity.ts, utc_offset_hours)
+    first_day = int(day.min()) if len(day) else 0
+    day_offset = day - first_day
+    day_count = int(day_offset.max()) + 1 if len(day) else 0
+
+    daily_messages = np.bincount(day_offset, minlength=day_count)
+    daily_files = np.bincount(day_offset, weights=activity.file_count, minlength=day_count).astype(np.int64)
+    daily_bytes = np.bincount(day_offset, weights=activity.file_bytes, minlength=day_count).astype(np.int64)
+
+    # 1970-01-01 was a Thursday, so day 0 has weekday 3 (Monday = 0)
+    weekday = (day + 3) % 7
+    hour = np.floor_divide(np.mod(activity.ts + utc_offset_hours * 3600, 86400), 3600).astype(np.int64)
+    heatmap = np.bincount(weekday * 24 + hour, minlength=7 * 24).reshape(7, 24)
+
+    month = day.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    month_index, month_messages, month_files = grouped_counts(month, activity.file_count)
+    _, _, month_bytes = grouped_counts(month, activity.file_bytes)
+    months = np.datetime_as_string(month_index.astype('datetime64[M]'))
+
+    user_count = len(activity.users)
+    user_messages = np.bincount(activity.user, minlength=user_count)
+    user_files = np.bincount(activity.user, weights=activity.file_count, minlength=user_count).astype(np.int64)
+    user_bytes = np.bincount(activity.user, weights=activity.file_bytes, minlength=user_count).astype(np.int64)
+    top_users = np.argsort(-user_messages, kind='stable')[:top]
+
+    channel_count = len(activity.channels)
+    channel_messages = np.bincount(activity.channel, minlength=channel_count)
+    channel_bytes = np.bincount(activity.channel, weights=activity.file_bytes, minlength=channel_count).astype(np.int64)
+
+    channel_day, channel_day_messages, channel_day_bytes = grouped_counts(activity.channel.astype(np.int64) * max(day_count, 1) + day_offset, activity.file_bytes)
+    user_day, user_day_messages = grouped_counts(activity.user.astype(np.int64) * max(day_count, 1) + day_offset)
+
+    return {
+        'first_day': first_day,
+        'daily': (daily_messages, daily_files, daily_bytes),
+        'heatmap': heatmap,
+        'monthly': (months, month_messages, month_files.astype(np.int64), month_bytes.astype(np.int64)),
+        'users': (user_messages, user_files, user_bytes, top_users),
+        'channels': (channel_messages, channel_bytes),
+        'channel_daily': (channel_day // max(day_count, 1), channel_day % max(day_count, 1), channel_day_messages, channel_day_bytes.astype(np.int64)),
+        'user_daily': (user_day // max(day_count, 1), user_day % max(day_count, 1), user_day_messages),
+    }
+
+
+def write_csv(path, header, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def write_reports(activity, results, output_dir, user_names):
+    """Write summary.json and the CSV tables to output_dir."""
+    first_day = results['first_day']
+    daily_messages, daily_files, daily_bytes = results['daily']
+    months, month_messages, month_files, month_bytes = results['monthly']
+    user_messages, user_files, user_bytes, top_users = results['users']
+    channel_messages, channel_bytes = results['channels']
+    name = lambda user_id: user_names.get(user_id, user_id)
+
+    write_csv(os.path.join(output_dir, 'daily.csv'), ['date', 'messages', 'files', 'file_bytes'],
+              ((day_label(first_day + d), int(daily_messages[d]), int(daily_files[d]), int(daily_bytes[d])) for d in np.flatnonzero(daily_messages)))
+    channels, days, counts, sizes = results['channel_daily']
+    write_csv(os.path.join(output_dir, 'channel_daily.csv'), ['date', 'channel', 'messages', 'file_bytes'],
+              ((day_label(first_day + d), activity.channels[c], int(n), int(b)) for c, d, n, b in zip(channels, days, counts, sizes)))
+    users, days, counts = results['user_daily']
+    write_csv(os.path.join(output_dir, 'user_daily.csv'), ['date', 'user', 'name', 'messages'],
+              ((day_label(first_day + d), activity.users[u], name(activity.users[u]), int(n)) for u, d, n in zip(users, days, counts)))
+    write_csv(os.path.join(output_dir, 'hourly_heatmap.csv'), ['weekday'] + [f'{h:02d}' for h in range(24)],
+              ([WEEKDAYS[w]] + results['heatmap'][w].tolist() for w in range(7)))
+    write_csv(os.path.join(output_dir, 'monthly_attachments.csv'), ['month', 'messages', 'files', 'file_bytes'],
+              zip(months.tolist(), month_messages.tolist(), month_files.tolist(), month_bytes.tolist()))
+    top_posters = [{'user': activity.users[u], 'name': name(activity.users[u]), 'messages': int(user_messages[u]),
+                    'files': int(user_files[u]), 'file_bytes': int(user_bytes[u])} for u in top_users]
+    write_csv(os.path.join(output_dir, 'top_posters.csv'), ['user', 'name', 'messages', 'files', 'file_bytes'],
+              (list(poster.values()) for poster in top_posters))
+
+    summary = {
+        'messages': len(activity),
+        'files': int(activity.file_count.sum()),
+        'file_bytes': int(activity.file_bytes.sum()),
+        'users': int(np.count_nonzero(user_messages)),
+        'first_day': day_label(first_day) if len(activity) else None,
+        'last_day': day_label(first_day + len(daily_messages) - 1) if len(activity) else None,
+        'busiest_day': day_label(first_day + int(daily_messages.argmax())) if len(activity) else None,
+        'channels': {activity.channels[c]: {'messages': int(channel_messages[c]), 'file_bytes': int(channel_bytes[c])}
+                     for c in np.argsort(-channel_messages, kind='stable')},
+        'top_posters': top_posters,
+        'hourly_heatmap': {WEEKDAYS[w]: results['heatmap'][w].tolist() for w in range(7)},
+    }
+    with open(os.path.join(output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+
+
+def write_charts(activity, results, output_dir, user_names):
+    """Write PNG charts with matplotlib (optional dependency)."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    first_day = results['first_day']
+    daily_messages = results['daily'][0]
+    dates = np.arange(first_day, first_day + len(daily_messages)).astype('datetime64[D]')
+    fig, ax = plt.subplots(figsize=(12, 4))
+    ax.plot(dates, daily_messages, linewidth=0.8)
+    ax.set_title('Messages per day')
+    fig.tight_layout()
+    fig.savefig(os.path.join(output_dir, 'messages_per_day.png'), dpi=150)
+    plt.close(fig)
+
+    fig, ax = plt.subplots(figsize=(10, 3.5))
+    image = ax.imshow(results['heatmap'], aspect='auto', cmap='Blues')
+    ax.set_yticks(range(7), WEEKDAYS)
+    ax.set_xticks(range(24))
+    ax.set_title('Messages by weekday and hour')
+    fig.colorbar(image, ax=ax)
+    fig.tight_layout()
+    fig.savefig(os.path.join(output_dir, 'hourly_heatmap.png'), dpi=150)
+    plt.close(fig)
+
+    months, _, _, month_bytes = results['monthly']
+    fig, ax = plt.subplots(figsize=(12, 4))
+    ax.bar(range(len(months)), month_bytes / 1e6)
+    step = max(1, len(months) // 24)
+    ax.set_xticks(range(0, len(months), step), months[::step], rotation=90)
+    ax.set_ylabel('MB')
+    ax.set_title('Attachment volume per month')
+    fig.tight_layout()
+    fig.savefig(os.path.join(output_dir, 'attachments_per_month.png'), dpi=150)
+    plt.close(fig)
+
+    user_messages, _, _, top_users = results['users']
+    fig, ax = plt.subplots(figsize=(8, max(3, 0.3 * len(top_users))))
+    ax.barh([user_names.get(activity.users[u], activity.users[u]) for u in top_users][::-1], user_messages[top_users][::-1])
+    ax.set_title('Top posters')
+    fig.tight_layout()
+    fig.savefig(os.path.join(output_dir, 'top_posters.png'), dpi=150)
+    plt.close(fig)
+
+
+def main(export_root, output_dir, dataset=None, users_path=None, utc_offset=0.0, top=25, charts=False, jobs=None):
+    activity = load_dataset(dataset) if dataset else load_export(export_root, jobs)
+    if not len(activity):
+        logging.warning('No messages found')
+        return
+    logging.info(f'Loaded {len(activity)} messages from {len(activity.channels)} channels')
+    users_path = users_path or (os.path.join(export_root, 'users.json') if export_root else None)
+    user_names = {user['id']: user.get('real_name') or user['name'] for user in load_json(users_path)} if users_path and os.path.exists(users_path) else {}
+
+    os.makedirs(output_dir, exist_ok=True)
+    results = analyse(activity, utc_offset, top)
+    write_reports(activity, results, output_dir, user_names)
+    if charts:
+        write_charts(activity, results, output_dir, user_names)
+    logging.info(f'Analytics written to {output_dir}')
+
+
+def cli(argv=None, prog=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog=prog, description='Workspace activity analytics: messages per day, hourly heatmap, attachment volume and top posters.')
+    parser.add_argument('export_root', nargs='?', help='Export root containing one directory per channel with messages.json')
+    parser.add_argument('--dataset', help='Read an export_parquet.py dataset instead of the messages.json files')
+    parser.add_argument('--output-dir', default='analytics', help='Directory for the JSON/CSV summaries and charts (default: analytics)')
+    parser.add_argument('--users', help='Path to users.json for display names (default: <export_root>/users.json)')
+    parser.add_argument('--utc-offset', type=float, default=0.0, help='Hours to add to UTC when binning days and hours (e.g. -8)')
+    parser.add_argument('--top', type=int, default=25, help='Number of top posters to report (default 25)')
+    parser.add_argument('--charts', action='store_true', help='Also write PNG charts (requires matplotlib)')
+    parser.add_argument('--jobs', type=int, help='Worker processes for parsing messages.json files (default: number of cores)')
+    args = parser.parse_args(argv)
+    if not args.export_root and not args.dataset:
+        parser.error('give an export root or --dataset')
+    main(args.export_root, args.output_dir, args.dataset, args.users, args.utc_offset, args.top, args.charts, args.jobs)
+
+
+if __name__ == '__main__':
+    sys.exit(cli())